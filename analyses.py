@@ -0,0 +1,200 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient les tables d'analyse de la Partie I : les nombres d'occurrences de chaque mot, déjà
+# stockés par document dans la matrice TF-IDF, sont regroupés une fois par président pour que chaque
+# fonctionnalité du menu soit une simple lecture en mémoire au lieu d'une relecture des discours.
+# Le président et la date d'investiture de chaque discours viennent des métadonnées enregistrées dans l'index.
+import heapq
+from array import array
+from collections import Counter
+from tableaux import copier
+
+
+class AnalysesCorpus:
+    """
+    Nombres d'occurrences des mots regroupés par président, stockés ligne par ligne (format CSR) comme la matrice
+    TF-IDF : les mots du président p sont la tranche [indptr[p], indptr[p + 1]) des tableaux termes (identifiants
+    de termes, triés) et comptes (nombre d'occurrences dans l'ensemble de ses discours).
+    Pour chaque terme sont aussi gardés son plus grand score TF-IDF et le nombre de présidents qui l'emploient ; son
+    nombre d'occurrences dans chaque document est lu dans la matrice (voir MatriceTfIdf.comptes_transposes).
+    Ces tableaux sont sauvegardés dans le fichier d'index : seuls l'ordre chronologique et la liste des présidents,
+    qui ne dépendent que des métadonnées, sont recalculés au chargement.
+    """
+
+    def __init__(self, matrice, metadonnees, positions=None, tableaux=None, reprises=None):
+        """
+        Les tableaux peuvent être des array ou des memoryview sur un fichier d'index projeté en mémoire.
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+        metadonnees (list): Métadonnées de chaque document de la matrice (président, prénom, date d'investiture).
+        positions (IndexPositionnel): Index positionnel, pour compter les expressions de plusieurs mots, facultatif.
+        tableaux (tuple): Tableaux (indptr, termes, comptes, nb_presidents_terme, poids_max) déjà calculés pour ces
+        métadonnées (voir regrouper), facultatif.
+        reprises (dict): Lignes déjà regroupées de certains présidents (tableaux termes et comptes), par nom, reprises
+        telles quelles au lieu d'être recalculées (voir indexeur.Fusion.analyses), facultatif.
+        """
+        self.matrice = matrice
+        self.positions = positions
+        self.metadonnees = metadonnees
+        presidents_documents = [metadonnee['president'] for metadonnee in metadonnees]
+        self.presidents_documents = presidents_documents
+        # Documents du plus ancien au plus récent ; ceux sans date d'investiture viennent en dernier.
+        self.ordre_chronologique = sorted(range(matrice.nb_documents),
+                                          key=lambda doc: (metadonnees[doc]['date_investiture'] is None,
+                                                           metadonnees[doc]['date_investiture'] or '', matrice.documents[doc]))
+        self.rangs_chronologiques = array('i', [0] * matrice.nb_documents)
+        for rang, doc in enumerate(self.ordre_chronologique):
+            self.rangs_chronologiques[doc] = rang
+        self.presidents = list(dict.fromkeys(presidents_documents[doc] for doc in self.ordre_chronologique))    # Dans l'ordre de leur première investiture.
+        self.ids_presidents = {president: p for p, president in enumerate(self.presidents)}
+        self.documents_president = [[] for _ in self.presidents]
+        for doc, president in enumerate(presidents_documents):
+            self.documents_president[self.ids_presidents[president]].append(doc)
+        if tableaux is None:
+            tableaux = self.regrouper(reprises or {})
+        self.indptr, self.termes, self.comptes, self.nb_presidents_terme, self.poids_max = tableaux
+
+    def regrouper(self, reprises=None):
+        """
+        Regroupe par président les nombres d'occurrences des mots de la matrice et relève, pour chaque terme, son plus grand
+        score TF-IDF et le nombre de présidents qui l'emploient.
+        Paramètres:
+        reprises (dict): Lignes déjà regroupées de certains présidents, par nom (voir __init__), facultatif.
+        Retourne:
+        tuple: Tableaux (indptr, termes, comptes, nb_presidents_terme, poids_max).
+        """
+        matrice = self.matrice
+        reprises = reprises or {}
+        indptr, termes, comptes = array('q', [0]), array('i'), array('i')
+        for president, docs in zip(self.presidents, self.documents_president):
+            if president in reprises:
+                termes_president, comptes_president = reprises[president]
+                copier(termes, termes_president)
+                copier(comptes, comptes_president)
+            else:
+                comptage = {}    # Identifiant de terme -> occurrences dans les discours du président.
+                for doc in docs:
+                    for i in range(matrice.indptr[doc], matrice.indptr[doc + 1]):
+                        terme = matrice.indices[i]
+                        comptage[terme] = comptage.get(terme, 0) + matrice.comptes[i]
+                for terme in sorted(comptage):
+                    termes.append(terme)
+                    comptes.append(comptage[terme])
+            indptr.append(len(termes))
+
+        nb_presidents_terme = array('i', [0] * len(matrice))
+        for terme, nombre in Counter(termes).items():
+            nb_presidents_terme[terme] = nombre
+        # Plus grand score TF-IDF d'un terme : son plus grand nombre d'occurrences dans un document, fois son IDF (positif).
+        debuts, _ = matrice.transposer()
+        comptes_colonnes = matrice.comptes_transposes()
+        poids_max = array('d', (max(comptes_colonnes[debuts[terme]:debuts[terme + 1]], default=0) * matrice.idf[terme]
+                                for terme in range(len(matrice))))
+        return indptr, termes, comptes, nb_presidents_terme, poids_max
+
+    def comptage_president(self, president):
+        """
+        Retourne les nombres d'occurrences des mots employés par un président.
+        Paramètres:
+        president (str): Nom du président, tel qu'il figure dans les métadonnées.
+        Retourne:
+        dict: Dictionnaire associant chaque mot à son nombre d'occurrences, vide si le président est inconnu.
+        """
+        p = self.ids_presidents.get(president)
+        if p is None:
+            return {}
+        vocabulaire = self.matrice.vocabulaire
+        return {vocabulaire[self.termes[i]]: self.comptes[i] for i in range(self.indptr[p], self.indptr[p + 1])}
+
+    def _termes(self, mots):
+        return sorted({self.matrice.id_terme(mot) for mot in mots if mot in self.matrice})
+
+    def occurrences_documents(self, expressions):
+        """
+        Compte les occurrences d'un ensemble de mots ou d'expressions dans chaque document, en ne lisant que leurs postings.
+        Paramètres:
+        expressions (list): Mots recherchés, chacun donné sous forme de liste de mots : une liste de plusieurs mots
+        est une expression exacte, cherchée dans l'index positionnel.
+        Retourne:
+        dict: Dictionnaire associant l'identifiant de chaque document qui emploie au moins un des mots ou une des expressions
+        au total de leurs occurrences.
+        """
+        debuts, docs = self.matrice.transposer()
+        comptes = self.matrice.comptes_transposes()
+        occurrences = {}
+        for terme in self._termes([expression[0] for expression in expressions if len(expression) == 1]):
+            for i in range(debuts[terme], debuts[terme + 1]):
+                occurrences[docs[i]] = occurrences.get(docs[i], 0) + comptes[i]
+        for expression in expressions:
+            if len(expression) > 1:
+                if self.positions is None:
+                    raise ValueError("Un index positionnel est nécessaire pour chercher une expression de plusieurs mots.")
+                for doc, nombre in self.positions.occurrences_expression(expression).items():
+                    occurrences[doc] = occurrences.get(doc, 0) + nombre
+        return occurrences
+
+    def occurrences(self, mots, par_president=True):
+        """
+        Compte les occurrences d'un ensemble de mots ou d'expressions par président ou par document.
+        Paramètres:
+        mots (list): Mots recherchés, sous la forme attendue par occurrences_documents.
+        par_president (bool): Regroupe les documents d'un même président.
+        Retourne:
+        dict: Dictionnaire associant chaque président (ou nom de fichier) qui emploie au moins un des mots au total de
+        leurs occurrences, dans l'ordre chronologique.
+        """
+        par_document = self.occurrences_documents(mots)
+        occurrences = {}
+        for doc in self.ordre_chronologique:
+            if doc in par_document:
+                cle = self.presidents_documents[doc] if par_president else self.matrice.documents[doc]
+                occurrences[cle] = occurrences.get(cle, 0) + par_document[doc]
+        return occurrences
+
+    def premier_document(self, mots, dernier=False):
+        """
+        Trouve, dans l'ordre chronologique, le premier (ou le dernier) document qui emploie au moins un des mots.
+        Paramètres:
+        mots (list): Mots recherchés, sous la forme attendue par occurrences_documents.
+        dernier (bool): Cherche le document le plus récent au lieu du plus ancien.
+        Retourne:
+        int: Identifiant du document, ou None si aucun document n'emploie ces mots.
+        """
+        documents = self.occurrences_documents(mots)
+        if not documents:
+            return None
+        choisir = max if dernier else min
+        return choisir(documents, key=lambda doc: self.rangs_chronologiques[doc])
+
+    def mots_les_plus_repetes(self, president, k=20, seuil=0.0):
+        """
+        Sélectionne les k mots les plus employés par un président parmi ceux dont le plus grand score TF-IDF dépasse un seuil.
+        Paramètres:
+        president (str): Nom du président.
+        k (int): Nombre de mots à retourner.
+        seuil (float): Score TF-IDF qu'un mot doit dépasser dans au moins un document.
+        Retourne:
+        list: Couples (mot, nombre d'occurrences), du plus au moins employé, par ordre alphabétique à égalité.
+        """
+        p = self.ids_presidents.get(president)
+        if p is None:
+            return []
+        vocabulaire = self.matrice.vocabulaire
+        candidats = ((self.comptes[i], self.termes[i]) for i in range(self.indptr[p], self.indptr[p + 1])
+                     if self.poids_max[self.termes[i]] > seuil)
+        meilleurs = heapq.nsmallest(k, candidats, key=lambda element: (-element[0], element[1]))    # Les termes sont triés comme les mots.
+        return [(vocabulaire[terme], compte) for compte, terme in meilleurs]
+
+    def mots_communs(self):
+        """
+        Retourne les mots employés par tous les présidents et dont au moins un score TF-IDF est positif.
+        """
+        nb_presidents = len(self.presidents)
+        return [mot for terme, mot in enumerate(self.matrice.vocabulaire)
+                if self.nb_presidents_terme[terme] == nb_presidents and self.poids_max[terme] > 0]
+
+    def termes_contenant(self, motif):
+        """
+        Retourne les identifiants des termes du vocabulaire qui contiennent une chaîne de caractères.
+        """
+        return [terme for terme, mot in enumerate(self.matrice.vocabulaire) if motif in mot]
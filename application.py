@@ -0,0 +1,131 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient l'objet Application qui regroupe l'état du programme (chemins, index du corpus, scoreur, cache).
+# Rien n'est lu ni écrit à l'import : l'index est chargé (ou reconstruit) dans un thread en arrière-plan au démarrage,
+# et seules les fonctionnalités qui en ont besoin attendent qu'il soit prêt. Il peut ensuite être mis à jour sans
+# redémarrer le programme (voir Application.recharger).
+import threading
+from concurrent.futures import Future
+from function import (list_of_files, extraire_noms_presidents, associer_prenoms_presidents, charger_ou_construire_index,
+                      CacheReponses)
+from calcul_numpy import NUMPY_DISPONIBLE, ScoreurNumpy
+
+
+class Application:
+    """
+    État du programme, initialisé à la demande. Le chargement de l'index commence avec demarrer et se poursuit dans un
+    thread ; l'attribut pret est un Future résolu avec l'index du corpus (ou avec l'erreur du chargement).
+    Les propriétés corpus et scoreur attendent la fin du chargement.
+    L'index et le scoreur sont publiés ensemble, en remplaçant une seule référence (voir etat) : une question en cours
+    garde l'index qu'elle a lu pendant qu'un rechargement en prépare un nouveau.
+    """
+
+    def __init__(self, directory_speeches="./speeches", target_directory=None, chemin_index="./index_tfidf.bin",
+                 file_extension=".txt", nb_processus=1, cache=None):
+        """
+        Paramètres:
+        directory_speeches (str): Chemin du répertoire des discours.
+        target_directory (str): Répertoire où exporter la version nettoyée des discours, facultatif (None : aucun export).
+        chemin_index (str): Chemin du fichier d'index.
+        file_extension (str): Extension des fichiers de discours.
+        nb_processus (int): Nombre de processus utilisés pour reconstruire l'index (voir calculer_tf_idf).
+        cache (CacheReponses): Cache des réponses du chatbot (un cache par défaut est créé si None).
+        """
+        self.directory_speeches = directory_speeches
+        self.target_directory = target_directory
+        self.chemin_index = chemin_index
+        self.file_extension = file_extension
+        self.nb_processus = nb_processus
+        self.cache_reponses = cache if cache is not None else CacheReponses()
+        self.pret = Future()
+        self._etat = None    # (index du corpus, scoreur), remplacé d'un bloc à chaque publication.
+        self._thread = None
+        self._verrou = threading.Lock()
+        self._verrou_rechargement = threading.Lock()
+
+    def presidents(self):
+        """
+        Retourne les présidents du corpus avec leur prénom, d'après les seuls noms des fichiers de discours.
+        Retourne:
+        dict: Dictionnaire associant chaque nom de président à son prénom (voir associer_prenoms_presidents).
+        """
+        files_names = list_of_files(self.directory_speeches, self.file_extension)
+        return associer_prenoms_presidents(extraire_noms_presidents(files_names))
+
+    def demarrer(self):
+        """
+        Lance le chargement de l'index dans un thread en arrière-plan, s'il n'est pas déjà lancé.
+        Retourne:
+        Future: Futur résolu avec l'index du corpus (voir pret).
+        """
+        with self._verrou:
+            if self._thread is None:
+                # Thread démon : quitter le programme n'attend pas la fin d'une reconstruction (le fichier d'index
+                # n'est remplacé qu'une fois entièrement écrit, voir sauvegarder_index).
+                self._thread = threading.Thread(target=self._charger, name="chargement-index", daemon=True)
+                self._thread.start()
+        return self.pret
+
+    def _charger(self):
+        if not self.pret.set_running_or_notify_cancel():
+            return
+        try:
+            with self._verrou_rechargement:
+                corpus = self._publier()
+        except BaseException as erreur:
+            self.pret.set_exception(erreur)
+        else:
+            self.pret.set_result(corpus)
+
+    def _publier(self):
+        corpus = charger_ou_construire_index(self.directory_speeches, self.target_directory, self.chemin_index,
+                                             self.nb_processus)
+        # Calcul vectorisé des similarités si NumPy est installé, sinon calcul en Python sur l'index inversé
+        scoreur = ScoreurNumpy(corpus.matrice) if NUMPY_DISPONIBLE else None
+        self._etat = (corpus, scoreur)    # Publication : une seule affectation, l'ancien état reste valide pour qui le détient.
+        return corpus
+
+    def recharger(self):
+        """
+        Met l'index à jour d'après les discours ajoutés, modifiés ou supprimés depuis son chargement, sans redémarrer le
+        programme : seuls ces discours sont retraités (voir charger_ou_construire_index). Le nouvel index est publié
+        une fois complet ; jusque-là, les questions utilisent l'ancien.
+        Retourne:
+        CorpusIndexe: Nouvel index du corpus.
+        """
+        self.attendre()
+        with self._verrou_rechargement:    # Un seul rechargement à la fois.
+            return self._publier()
+
+    def est_pret(self):
+        """
+        Indique si l'index est chargé, sans attendre.
+        """
+        return self.pret.done()
+
+    def attendre(self, delai=None):
+        """
+        Attend la fin du chargement de l'index, en le lançant si nécessaire.
+        Paramètres:
+        delai (float): Durée maximale d'attente en secondes (None pour attendre sans limite).
+        Retourne:
+        CorpusIndexe: Index du corpus. Lève l'erreur du chargement s'il a échoué, ou TimeoutError si le délai est dépassé.
+        """
+        return self.demarrer().result(delai)
+
+    def etat(self):
+        """
+        Retourne l'index du corpus et le scoreur publiés ensemble, en attendant la fin du chargement.
+        Retourne:
+        tuple: Index du corpus (CorpusIndexe) et scoreur (ScoreurNumpy, ou None sans NumPy).
+        """
+        self.attendre()
+        return self._etat
+
+    @property
+    def corpus(self):
+        return self.etat()[0]
+
+    @property
+    def scoreur(self):
+        return self.etat()[1]
@@ -0,0 +1,288 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient les mesures de performance du programme sur un corpus synthétique de discours en français,
+# de taille réglable : nettoyage, calcul TF-IDF, démarrage à froid et à chaud, mémoire des postings de l'index inversé,
+# latence d'une question et débit en lot.
+# Les résultats sont écrits en JSON et peuvent être comparés à une référence enregistrée.
+# Utilisation : python benchmark.py [--documents 1000] [--questions 200] [-o resultats.json]
+#                                   [--reference reference.json] [--tolerance 0.2] [--enregistrer-reference reference.json]
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+from itertools import accumulate
+from function import (compter_mots_fichier, calculer_tf_idf, charger_ou_construire_index, repondre_question,
+                      FICHIER_METADONNEES)
+from lot import repondre_questions_lot
+from postings import rapport_memoire
+
+VERSION_RESULTATS = 1
+# Mots de base des discours synthétiques, complétés par des mots inventés pour atteindre la taille de vocabulaire voulue.
+MOTS_FRANCAIS = [
+    "le", "la", "les", "de", "des", "du", "et", "à", "un", "une", "en", "pour", "que", "qui", "dans", "nous", "notre",
+    "nos", "vous", "est", "sont", "sera", "doit", "avec", "sur", "pas", "plus", "France", "République", "nation",
+    "peuple", "français", "françaises", "État", "liberté", "égalité", "fraternité", "avenir", "histoire", "monde",
+    "Europe", "solidarité", "travail", "jeunesse", "confiance", "sécurité", "justice", "écologie", "climat",
+    "planète", "énergie", "économie", "emploi", "croissance", "école", "santé", "culture", "territoires", "démocratie",
+    "citoyens", "compatriotes", "engagement", "responsabilité", "volonté", "espoir", "changement", "réforme", "paix",
+]
+AMORCES = ["Pourquoi", "Comment", "Quel est", "Quelle est", "Qui", "Quand", "Peux-tu expliquer"]
+
+
+def generer_vocabulaire(taille, graine=0):
+    """
+    Construit le vocabulaire du corpus synthétique : les mots français de base, puis des mots inventés.
+    Paramètres:
+    taille (int): Nombre de mots du vocabulaire.
+    graine (int): Graine du générateur aléatoire.
+    Retourne:
+    list: Mots du vocabulaire, du plus au moins fréquent.
+    """
+    generateur = random.Random(graine)
+    syllabes = ["ma", "ti", "lo", "re", "pu", "bli", "que", "con", "fian", "ce", "na", "tion", "é", "tat", "vé", "ri", "té"]
+    vocabulaire = list(MOTS_FRANCAIS[:taille])
+    connus = set(vocabulaire)
+    while len(vocabulaire) < taille:
+        mot = ''.join(generateur.choice(syllabes) for _ in range(generateur.randint(2, 4)))
+        if mot not in connus:
+            connus.add(mot)
+            vocabulaire.append(mot)
+    return vocabulaire
+
+
+def generer_corpus(directory, nb_documents, mots_par_document=400, taille_vocabulaire=20000, graine=0):
+    """
+    Écrit un corpus synthétique de discours dont la fréquence des mots suit une loi de Zipf, avec ponctuation,
+    majuscules, accents et apostrophes, ainsi que le fichier de métadonnées des discours.
+    Paramètres:
+    directory (str): Répertoire où écrire les discours (créé si nécessaire).
+    nb_documents (int): Nombre de discours.
+    mots_par_document (int): Nombre moyen de mots par discours.
+    taille_vocabulaire (int): Nombre de mots distincts du vocabulaire.
+    graine (int): Graine du générateur aléatoire, pour un corpus reproductible.
+    Retourne:
+    list: Vocabulaire du corpus (voir generer_vocabulaire).
+    """
+    os.makedirs(directory, exist_ok=True)
+    generateur = random.Random(graine)
+    vocabulaire = generer_vocabulaire(taille_vocabulaire, graine)
+    poids_cumules = list(accumulate(1.0 / rang for rang in range(1, len(vocabulaire) + 1)))    # Loi de Zipf.
+    metadonnees = {}
+    for i in range(nb_documents):
+        filename = f"Nomination_Orateur{i:07d}.txt"
+        nb_mots = max(10, int(generateur.gauss(mots_par_document, mots_par_document / 4)))
+        mots = generateur.choices(vocabulaire, cum_weights=poids_cumules, k=nb_mots)
+        phrases, debut = [], 0
+        while debut < nb_mots:
+            fin = min(nb_mots, debut + generateur.randint(8, 25))
+            phrase = ' '.join(mots[debut:fin])
+            phrase = phrase[0].upper() + phrase[1:]
+            if generateur.random() < 0.2:
+                phrase = "l'" + phrase[0].lower() + phrase[1:]    # Apostrophes, retirées par le nettoyage.
+            phrases.append(phrase + generateur.choice(['.', '.', '.', ' !', ' ?', ' ;']))
+            debut = fin
+        with open(os.path.join(directory, filename), 'w', encoding='utf-8') as file:
+            file.write(' '.join(phrases) + '\n')
+        annee = 1900 + i % 120
+        metadonnees[filename] = {'president': f"Orateur{i % 1000}", 'prenom': "Synthétique",
+                                 'date_investiture': f"{annee}-05-{1 + i % 28:02d}"}
+    with open(os.path.join(directory, FICHIER_METADONNEES), 'w', encoding='utf-8') as file:
+        json.dump(metadonnees, file, ensure_ascii=False)
+    return vocabulaire
+
+
+def generer_questions(vocabulaire, nb_questions, graine=0):
+    """
+    Génère des questions à partir des mots courants du vocabulaire, avec une amorce de question.
+    """
+    generateur = random.Random(graine + 1)
+    courants = vocabulaire[:min(len(vocabulaire), 2000)]
+    return [f"{generateur.choice(AMORCES)} {' '.join(generateur.sample(courants, generateur.randint(2, 5)))} ?"
+            for _ in range(nb_questions)]
+
+
+def centiles(durees):
+    """
+    Calcule les centiles 50, 95 et 99 (méthode du rang le plus proche) d'une liste de durées en secondes.
+    Retourne:
+    dict: Centiles et moyenne, en millisecondes.
+    """
+    triees = sorted(durees)
+    if not triees:
+        return {}
+
+    def centile(p):
+        return triees[min(len(triees) - 1, max(0, int(round(p / 100 * len(triees) + 0.5)) - 1))] * 1000
+
+    return {'p50_ms': centile(50), 'p95_ms': centile(95), 'p99_ms': centile(99),
+            'moyenne_ms': sum(triees) / len(triees) * 1000, 'max_ms': triees[-1] * 1000}
+
+
+def chronometrer(fonction, *arguments):
+    """
+    Exécute une fonction et mesure sa durée.
+    Retourne:
+    tuple: Résultat de la fonction et durée en secondes.
+    """
+    debut = time.perf_counter()
+    resultat = fonction(*arguments)
+    return resultat, time.perf_counter() - debut
+
+
+def executer_benchmark(directory, nb_documents, nb_questions=200, mots_par_document=400, taille_vocabulaire=20000,
+                       nb_processus=1, graine=0):
+    """
+    Génère le corpus synthétique puis mesure chaque scénario.
+    Paramètres:
+    directory (str): Répertoire de travail (discours, fichiers nettoyés, fichier d'index).
+    nb_documents (int): Nombre de discours du corpus synthétique.
+    nb_questions (int): Nombre de questions des scénarios de latence et de débit.
+    mots_par_document (int): Nombre moyen de mots par discours.
+    taille_vocabulaire (int): Nombre de mots distincts du vocabulaire.
+    nb_processus (int): Nombre de processus de la construction de l'index (voir calculer_tf_idf).
+    graine (int): Graine du générateur aléatoire.
+    Retourne:
+    dict: Résultats, sérialisables en JSON.
+    """
+    directory_speeches = os.path.join(directory, "speeches")
+    directory_cleaned = os.path.join(directory, "cleaned")
+    chemin_index = os.path.join(directory, "index_tfidf.bin")
+    scenarios = {}
+
+    vocabulaire, duree = chronometrer(generer_corpus, directory_speeches, nb_documents, mots_par_document, taille_vocabulaire, graine)
+    taille_corpus = sum(os.path.getsize(os.path.join(directory_speeches, f)) for f in os.listdir(directory_speeches))
+    scenarios['generation'] = {'duree_s': duree}
+
+    # Nettoyage seul : normalisation et écriture des fichiers nettoyés.
+    os.makedirs(directory_cleaned, exist_ok=True)
+    documents = sorted(f for f in os.listdir(directory_speeches) if f.endswith('.txt'))
+    debut = time.perf_counter()
+    for filename in documents:
+        compter_mots_fichier(os.path.join(directory_speeches, filename), os.path.join(directory_cleaned, filename))
+    duree = time.perf_counter() - debut
+    scenarios['nettoyage'] = {'duree_s': duree, 'mo_par_s': taille_corpus / duree / 1e6 if duree > 0 else None}
+
+    # Calcul de la matrice TF-IDF (comptage des mots sans écriture des fichiers nettoyés).
+    matrice, duree = chronometrer(calculer_tf_idf, directory_speeches, None, nb_processus)
+    scenarios['calcul_tf_idf'] = {'duree_s': duree, 'documents_par_s': nb_documents / duree if duree > 0 else None,
+                                  'termes': len(matrice), 'elements_non_nuls': len(matrice.indices)}
+    del matrice
+
+    # Démarrage à froid : aucun fichier d'index, tout est reconstruit puis sauvegardé.
+    shutil.rmtree(directory_cleaned)
+    _, duree = chronometrer(charger_ou_construire_index, directory_speeches, None, chemin_index, nb_processus)
+    scenarios['demarrage_froid'] = {'duree_s': duree, 'taille_index_octets': os.path.getsize(chemin_index)}
+
+    # Démarrage à chaud : le fichier d'index est à jour et projeté en mémoire.
+    corpus, duree = chronometrer(charger_ou_construire_index, directory_speeches, None, chemin_index, nb_processus)
+    scenarios['demarrage_chaud'] = {'duree_s': duree}
+
+    # Mémoire des postings : compressés, en tableaux et en dictionnaire {mot: [(document, score)]}, et taille du fichier
+    # d'index complet (voir rapport_memoire).
+    scenarios['memoire_postings'] = rapport_memoire(corpus.matrice, corpus.index_inverse.postings_compresses,
+                                                    os.path.getsize(chemin_index))
+
+    # Latence d'une question, sans cache.
+    questions = generer_questions(vocabulaire, nb_questions, graine)
+    durees = [chronometrer(repondre_question, corpus, question)[1] for question in questions]
+    scenarios['latence_question'] = centiles(durees)
+
+    # Débit du mode lot (voir lot.py), sans cache ni NumPy, pour des mesures comparables d'une machine à l'autre.
+    _, duree = chronometrer(lambda: sum(1 for _ in repondre_questions_lot(corpus, questions)))
+    scenarios['debit_lot'] = {'duree_s': duree, 'questions_par_s': nb_questions / duree if duree > 0 else None}
+
+    return {
+        'version': VERSION_RESULTATS,
+        'parametres': {'documents': nb_documents, 'questions': nb_questions, 'mots_par_document': mots_par_document,
+                       'taille_vocabulaire': taille_vocabulaire, 'processus': nb_processus, 'graine': graine,
+                       'taille_corpus_octets': taille_corpus},
+        'environnement': {'python': platform.python_version(), 'plateforme': platform.platform(),
+                          'processeurs': os.cpu_count()},
+        'scenarios': scenarios,
+    }
+
+
+# Mesures comparées à la référence : une durée qui augmente ou un débit qui baisse est une régression.
+MESURES_DUREES = ['duree_s', 'p50_ms', 'p95_ms', 'p99_ms']
+MESURES_DEBITS = ['mo_par_s', 'documents_par_s', 'questions_par_s']
+
+
+def comparer_resultats(resultats, reference, tolerance=0.2):
+    """
+    Compare des résultats à une référence, scénario par scénario.
+    Paramètres:
+    resultats (dict): Résultats de executer_benchmark.
+    reference (dict): Résultats de référence.
+    tolerance (float): Écart relatif toléré avant de signaler une régression (0.2 pour 20 %).
+    Retourne:
+    list: Comparaisons {'scenario', 'mesure', 'reference', 'actuel', 'ecart', 'regression'}.
+    """
+    comparaisons = []
+    for scenario, mesures in resultats['scenarios'].items():
+        mesures_reference = reference.get('scenarios', {}).get(scenario, {})
+        for mesure in MESURES_DUREES + MESURES_DEBITS:
+            actuel, ancien = mesures.get(mesure), mesures_reference.get(mesure)
+            if actuel is None or not ancien:
+                continue
+            ecart = (actuel - ancien) / ancien
+            regression = ecart > tolerance if mesure in MESURES_DUREES else ecart < -tolerance
+            comparaisons.append({'scenario': scenario, 'mesure': mesure, 'reference': ancien, 'actuel': actuel,
+                                 'ecart': ecart, 'regression': regression})
+    return comparaisons
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Mesures de performance sur un corpus synthétique.")
+    parser.add_argument("--documents", type=int, default=1000, help="Nombre de discours synthétiques (de 10^3 à 10^6).")
+    parser.add_argument("--questions", type=int, default=200, help="Nombre de questions pour la latence et le débit.")
+    parser.add_argument("--mots-par-document", type=int, default=400, help="Nombre moyen de mots par discours.")
+    parser.add_argument("--vocabulaire", type=int, default=20000, help="Nombre de mots distincts.")
+    parser.add_argument("--processus", type=int, default=1, help="Processus de construction de l'index (0 pour un par cœur).")
+    parser.add_argument("--graine", type=int, default=0, help="Graine du générateur aléatoire.")
+    parser.add_argument("--repertoire", help="Répertoire de travail (temporaire et supprimé à la fin par défaut).")
+    parser.add_argument("-o", "--sortie", default="-", help="Fichier JSON des résultats ('-' pour la sortie standard).")
+    parser.add_argument("--reference", help="Résultats de référence à comparer.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Écart relatif toléré avant de signaler une régression.")
+    parser.add_argument("--enregistrer-reference", help="Enregistre les résultats comme nouvelle référence dans ce fichier.")
+    args = parser.parse_args(arguments)
+
+    directory = args.repertoire or tempfile.mkdtemp(prefix="pychatbot_benchmark_")
+    try:
+        resultats = executer_benchmark(directory, args.documents, args.questions, args.mots_par_document,
+                                       args.vocabulaire, args.processus or None, args.graine)
+    finally:
+        if args.repertoire is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    code_retour = 0
+    if args.reference:
+        with open(args.reference, 'r', encoding='utf-8') as file:
+            reference = json.load(file)
+        if reference.get('parametres', {}).get('documents') != args.documents:
+            print("Attention : la référence a été mesurée sur un corpus d'une autre taille.", file=sys.stderr)
+        resultats['comparaison'] = comparer_resultats(resultats, reference, args.tolerance)
+        for comparaison in resultats['comparaison']:
+            if comparaison['regression']:
+                code_retour = 1
+                print(f"Régression : {comparaison['scenario']}.{comparaison['mesure']} "
+                      f"{comparaison['reference']:.4g} -> {comparaison['actuel']:.4g} ({comparaison['ecart']:+.0%})", file=sys.stderr)
+
+    texte = json.dumps(resultats, indent=2, ensure_ascii=False)
+    if args.sortie == "-":
+        print(texte)
+    else:
+        with open(args.sortie, 'w', encoding='utf-8') as file:
+            file.write(texte + "\n")
+    if args.enregistrer_reference:
+        with open(args.enregistrer_reference, 'w', encoding='utf-8') as file:
+            file.write(texte + "\n")
+    return code_retour
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient le classement BM25, proposé à côté de la similarité cosinus : la contribution de chaque couple
+# (terme, document) est calculée une fois à la construction de l'index à partir des nombres d'occurrences des mots
+# et de la longueur des documents, puis ramenée à un petit entier (impact). Une question n'additionne donc que des
+# entiers ; les postings de chaque terme peuvent être parcourus par impact décroissant, ce qui permet de s'arrêter dès
+# que les meilleurs documents ne peuvent plus changer (voir ScoreurBM25.meilleurs_documents).
+import math
+import heapq
+from array import array
+from itertools import repeat
+from operator import truediv
+from bisect import bisect_left
+from postings import TAILLE_BLOC
+from tableaux import copier
+
+K1 = 1.2    # Saturation de la fréquence d'un mot dans un document.
+B = 0.75    # Poids de la normalisation par la longueur du document.
+NB_NIVEAUX = 255    # Les impacts sont des entiers de 1 à NB_NIVEAUX (un octet).
+
+
+class ScoreurBM25:
+    """
+    Impacts BM25 quantifiés du corpus. L'impact du posting i est impacts[i], dans l'ordre des postings de la matrice
+    transposée (voir MatriceTfIdf.transposer) : les documents ne sont pas stockés une seconde fois. L'ordre par impact
+    décroissant, qui sert à l'élagage, est calculé à la construction de l'index et sauvegardé sous forme de permutation,
+    seulement pour les termes de plus d'un bloc de postings (voir postings.TAILLE_BLOC) : les rangs, dans la liste du terme t,
+    de ses postings par impact décroissant puis par document sont la tranche [debuts_ordre[t], debuts_ordre[t + 1]) de ordre.
+    Les listes plus courtes sont triées à la lecture.
+    Le score BM25 d'un document est approché par echelle * (somme des impacts des mots distincts de la question).
+    """
+
+    def __init__(self, matrice, longueurs, impacts, echelle, k1=K1, b=B, ordre=None):
+        """
+        Les tableaux peuvent être des array ou des memoryview sur un fichier d'index projeté en mémoire.
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus, qui fournit le vocabulaire et les nombres d'occurrences.
+        longueurs (array): Nombre de mots de chaque document.
+        impacts (array): Impact quantifié de chaque posting, dans l'ordre des postings de la matrice transposée.
+        echelle (float): Valeur BM25 d'un niveau d'impact.
+        k1 (float): Paramètre k1 de BM25.
+        b (float): Paramètre b de BM25.
+        ordre (tuple): Tableaux (debuts_ordre, ordre) de l'ordre par impact des longues listes (voir ordonner), facultatif.
+        """
+        self.matrice = matrice
+        self.debuts, self.docs = matrice.transposer()
+        self.longueurs = longueurs
+        self.impacts = impacts
+        self.echelle = echelle
+        self.k1 = k1
+        self.b = b
+        self.longueur_moyenne = sum(longueurs) / len(longueurs) if len(longueurs) else 0.0
+        self.debuts_ordre, self.ordre = ordre if ordre is not None else self.ordonner()
+
+    @classmethod
+    def depuis_matrice(cls, matrice, k1=K1, b=B):
+        """
+        Calcule les impacts BM25 à partir des nombres d'occurrences des mots de chaque document (voir calculer_tf).
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+        k1 (float): Paramètre k1 de BM25.
+        b (float): Paramètre b de BM25.
+        Retourne:
+        ScoreurBM25: Scoreur du corpus.
+        """
+        longueurs = array('i', (sum(matrice.comptes[matrice.indptr[doc]:matrice.indptr[doc + 1]])
+                                for doc in range(matrice.nb_documents)))
+        scoreur = cls(matrice, longueurs, array('B'), 1.0, k1, b, (array('q'), array('i')))    # Impacts et ordre calculés ci-dessous.
+        scoreur.calculer_impacts()
+        scoreur.debuts_ordre, scoreur.ordre = scoreur.ordonner()
+        return scoreur
+
+    @classmethod
+    def fusionner(cls, ancien, matrice, docs_base, termes_repris):
+        """
+        Calcule les impacts BM25 d'une nouvelle matrice à partir de l'index de base. Les contributions dépendent du nombre
+        de documents et de la longueur moyenne des documents : elles sont recalculées en une passe sur les postings, mais la
+        longueur des documents inchangés est reprise, et l'ordre par impact d'une longue liste est recopié si ses impacts
+        n'ont pas changé.
+        Paramètres:
+        ancien (ScoreurBM25): Scoreur de l'index de base.
+        matrice (MatriceTfIdf): Nouvelle matrice TF-IDF.
+        docs_base (array): Identifiant dans la base de chaque document de la matrice, ou -1 pour un document retraité.
+        termes_repris (array): Pour chaque terme de la matrice, le terme de la base dont les postings sont les mêmes (à la
+        numérotation des documents près), ou -1.
+        Retourne:
+        ScoreurBM25: Scoreur du corpus, identique à celui de depuis_matrice.
+        """
+        longueurs = array('i', (ancien.longueurs[origine] if origine >= 0 else sum(matrice.comptes[matrice.indptr[doc]:matrice.indptr[doc + 1]])
+                                for doc, origine in enumerate(docs_base)))
+        scoreur = cls(matrice, longueurs, array('B'), 1.0, ancien.k1, ancien.b, (array('q'), array('i')))
+        scoreur.calculer_impacts()
+        scoreur.debuts_ordre, scoreur.ordre = scoreur.ordonner(ancien, termes_repris)
+        return scoreur
+
+    def idf(self, terme):
+        """
+        Retourne l'IDF BM25 d'un terme, toujours positif : log(1 + (N - n + 0.5) / (n + 0.5)), n étant le nombre de documents qui le contiennent.
+        """
+        nb_documents_terme = self.debuts[terme + 1] - self.debuts[terme]
+        return math.log(1 + (self.matrice.nb_documents - nb_documents_terme + 0.5) / (nb_documents_terme + 0.5))
+
+    def contribution(self, terme, doc, tf):
+        """
+        Calcule la contribution BM25 exacte (non quantifiée) d'un terme présent tf fois dans un document.
+        """
+        normalisation = 1 - self.b + self.b * self.longueurs[doc] / self.longueur_moyenne if self.longueur_moyenne else 1.0
+        return self.idf(terme) * tf * (self.k1 + 1) / (tf + self.k1 * normalisation)
+
+    def calculer_impacts(self):
+        """
+        Calcule les contributions BM25 exactes de tous les postings (voir contribution), terme par terme, puis l'échelle et
+        les impacts quantifiés.
+        Ne retourne rien car le scoreur est modifié directement.
+        """
+        comptes = self.matrice.comptes_transposes()
+        # Dénominateur de chaque document, hors nombre d'occurrences : k1 * normalisation par la longueur.
+        facteurs = [self.k1 * (1 - self.b + self.b * longueur / self.longueur_moyenne if self.longueur_moyenne else 1.0)
+                    for longueur in self.longueurs]
+        poids = array('d')
+        for terme in range(len(self.debuts) - 1):
+            debut, fin = self.debuts[terme], self.debuts[terme + 1]
+            idf, saturation = self.idf(terme), self.k1 + 1
+            poids.extend([idf * tf * saturation / (tf + facteurs[doc]) for doc, tf in zip(self.docs[debut:fin], comptes[debut:fin])])
+        self.echelle = max(poids, default=0.0) / NB_NIVEAUX or 1.0
+        # Même calcul que quantifier, appliqué à tout le tableau d'un coup.
+        niveaux = map(round, map(truediv, poids, repeat(self.echelle)))
+        self.impacts = array('B', map(min, repeat(NB_NIVEAUX), map(max, repeat(1), niveaux)))
+
+    def quantifier(self, contribution):
+        """
+        Ramène une contribution BM25 à un niveau d'impact entre 1 et NB_NIVEAUX.
+        """
+        return min(NB_NIVEAUX, max(1, round(contribution / self.echelle)))
+
+    def impact(self, terme, doc):
+        """
+        Retourne l'impact d'un terme dans un document (0 s'il en est absent).
+        """
+        fin = self.debuts[terme + 1]
+        i = bisect_left(self.docs, doc, self.debuts[terme], fin)    # Les postings d'un terme sont triés par document.
+        return self.impacts[i] if i < fin and self.docs[i] == doc else 0
+
+    def ordonner(self, ancien=None, termes_repris=None):
+        """
+        Range par impact décroissant, puis par document, les postings des termes de plus de TAILLE_BLOC documents.
+        Paramètres:
+        ancien (ScoreurBM25): Scoreur d'un index de base, dont l'ordre est recopié pour les listes inchangées, facultatif.
+        termes_repris (array): Terme de la base dont les postings sont les mêmes, ou -1, pour chaque terme (voir fusionner).
+        Retourne:
+        tuple: Tableaux (debuts_ordre, ordre) : rangs des postings de chaque longue liste, les listes courtes n'y figurant pas.
+        """
+        debuts_ordre, ordre = array('q', [0]), array('i')
+        for terme in range(len(self.debuts) - 1):
+            debut, fin = self.debuts[terme], self.debuts[terme + 1]
+            if fin - debut > TAILLE_BLOC:
+                repris = termes_repris[terme] if ancien is not None else -1
+                if repris >= 0 and ancien.impacts[ancien.debuts[repris]:ancien.debuts[repris + 1]] == self.impacts[debut:fin]:
+                    copier(ordre, ancien.ordre[ancien.debuts_ordre[repris]:ancien.debuts_ordre[repris + 1]])    # Mêmes impacts, même ordre.
+                else:    # Les postings du terme sont triés par document : le rang départage les égalités.
+                    ordre.extend(sorted(range(fin - debut), key=lambda rang: (-self.impacts[debut + rang], rang)))
+            debuts_ordre.append(len(ordre))
+        return debuts_ordre, ordre
+
+    def postings_par_impact(self, terme):
+        """
+        Retourne l'ordre des postings d'un terme par impact décroissant, puis par document.
+        Retourne:
+        tuple: Début de la liste du terme dans docs et impacts, et rangs de ses postings dans cette liste, dans l'ordre.
+        """
+        debut, fin = self.debuts[terme], self.debuts[terme + 1]
+        if self.debuts_ordre[terme + 1] > self.debuts_ordre[terme]:    # Longue liste : ordre lu dans l'index.
+            return debut, self.ordre[self.debuts_ordre[terme]:self.debuts_ordre[terme + 1]]
+        return debut, sorted(range(fin - debut), key=lambda rang: (-self.impacts[debut + rang], rang))
+
+    def meilleurs_documents(self, vecteur_question, k=5, documents_autorises=None, elagage=False):
+        """
+        Sélectionne les k documents de meilleur score BM25 pour les mots d'une question, en additionnant les impacts
+        de leurs postings.
+        Avec l'élagage, les postings des mots sont lus ensemble par impact décroissant et la lecture s'arrête dès que
+        les impacts restants (somme des impacts en tête de chaque liste) ne peuvent plus faire entrer un autre document
+        parmi les k meilleurs ; les scores des k documents retenus sont alors complétés depuis leurs lignes de la matrice.
+        Le résultat est le même que sans élagage, qui reste plus rapide tant que les listes sont courtes.
+        Paramètres:
+        vecteur_question (dict): Mots de la question (les valeurs non nulles indiquent les mots à prendre en compte).
+        k (int): Nombre de documents à retourner.
+        documents_autorises (set): Identifiants des seuls documents à considérer, facultatif.
+        elagage (bool): Active l'arrêt anticipé sur les postings triés par impact.
+        Retourne:
+        list: Couples (identifiant du document, score BM25 approché), du meilleur au moins bon, par identifiant à égalité.
+        """
+        termes = sorted({self.matrice.id_terme(mot) for mot, poids in vecteur_question.items()
+                         if poids != 0 and mot in self.matrice})
+        if not termes or k <= 0:
+            return []
+        if elagage:
+            scores = self._scores_elagues(termes, k, documents_autorises)
+        else:
+            scores = {}
+            for terme in termes:
+                debut, fin = self.debuts[terme], self.debuts[terme + 1]
+                for doc, impact in zip(self.docs[debut:fin], self.impacts[debut:fin]):
+                    scores[doc] = scores.get(doc, 0) + impact
+            if documents_autorises is not None:
+                scores = {doc: score for doc, score in scores.items() if doc in documents_autorises}
+        meilleurs = heapq.nsmallest(k, scores.items(), key=lambda element: (-element[1], element[0]))
+        return [(doc, score * self.echelle) for doc, score in meilleurs]
+
+    def _scores_elagues(self, termes, k, documents_autorises):
+        """
+        Lit les postings des termes par impact décroissant jusqu'à ce que les k meilleurs documents soient connus.
+        Retourne:
+        dict: Score entier des documents lus (exact pour les k meilleurs, partiel pour les autres en cas d'arrêt anticipé).
+        """
+        docs, impacts = self.docs, self.impacts
+        listes = {terme: self.postings_par_impact(terme) for terme in termes}
+        suivants = dict.fromkeys(termes, 0)    # Prochain posting à lire de chaque terme.
+        tas = [(-impacts[debut + rangs[0]], terme) for terme, (debut, rangs) in listes.items() if len(rangs)]
+        heapq.heapify(tas)
+        restant = -sum(impact for impact, _ in tas)    # Impact maximal qu'un document peut encore recevoir.
+        scores = {}
+        plus_haut = 0    # Meilleur score partiel : tant qu'il ne dépasse pas les impacts restants, rien n'est joué.
+        niveau = None
+        while tas:
+            if -tas[0][0] != niveau:    # Nouveau niveau d'impact : les k meilleurs sont-ils déjà connus ?
+                niveau = -tas[0][0]
+                if plus_haut > restant and self._k_meilleurs_connus(scores, k, restant):
+                    retenus = heapq.nlargest(k, scores, key=lambda doc: (scores[doc], -doc))
+                    return {doc: sum(self.impact(terme, doc) for terme in termes) for doc in retenus}
+            impact, terme = heapq.heappop(tas)
+            impact = -impact
+            debut, rangs = listes[terme]
+            i, fin = suivants[terme], len(rangs)
+            while i < fin and impacts[debut + rangs[i]] == impact:
+                doc = docs[debut + rangs[i]]
+                if documents_autorises is None or doc in documents_autorises:
+                    score = scores[doc] = scores.get(doc, 0) + impact
+                    if score > plus_haut:
+                        plus_haut = score
+                i += 1
+            suivants[terme] = i
+            restant -= impact
+            if i < fin:
+                restant += impacts[debut + rangs[i]]
+                heapq.heappush(tas, (-impacts[debut + rangs[i]], terme))
+        return scores
+
+    @staticmethod
+    def _k_meilleurs_connus(scores, k, restant):
+        """
+        Indique si les k documents de meilleur score partiel sont forcément les k meilleurs : le k-ième doit dépasser
+        strictement le suivant, et tout document pas encore vu, d'au moins les impacts restants.
+        """
+        if len(scores) < k:
+            return False
+        premiers = heapq.nlargest(k + 1, scores.values())
+        suivant = premiers[k] if len(premiers) > k else 0
+        return premiers[k - 1] > suivant + restant and premiers[k - 1] > restant
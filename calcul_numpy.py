@@ -0,0 +1,208 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient le calcul vectorisé des similarités cosinus avec NumPy (et SciPy s'il est installé).
+# Ces bibliothèques sont facultatives : sans elles, le chatbot utilise le calcul en Python de l'index inversé.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+NUMPY_DISPONIBLE = np is not None
+
+
+class ScoreurNumpy:
+    """
+    Matrice TF-IDF en float32 dont chaque ligne est divisée par sa norme : la similarité cosinus d'une question
+    avec tous les documents est alors un simple produit matrice-vecteur (ou matrice-matrice pour un lot de questions).
+    Avec SciPy, la matrice est gardée transposée en matrice creuse CSR (une ligne par terme) ; sans SciPy, les colonnes
+    sont gardées sous forme de tableaux NumPy et les scores sont accumulés colonne par colonne pour les seuls mots de la question.
+    """
+
+    def __init__(self, matrice):
+        """
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+        """
+        if np is None:
+            raise ImportError("NumPy est nécessaire pour ScoreurNumpy.")
+        self.matrice = matrice
+        self.nb_documents = matrice.nb_documents
+        self.nb_termes = len(matrice)
+        indptr = np.frombuffer(matrice.indptr, dtype=np.int64)
+        indices = np.frombuffer(matrice.indices, dtype=np.int32)
+        poids = np.frombuffer(matrice.poids, dtype=np.float64)
+        lignes = np.repeat(np.arange(self.nb_documents), np.diff(indptr))    # Document de chaque élément non nul.
+        normes = np.sqrt(np.bincount(lignes, weights=poids ** 2, minlength=self.nb_documents))
+        inverses = np.divide(1.0, normes, out=np.zeros_like(normes), where=normes > 0)    # Une ligne nulle reste nulle.
+        poids_normalises = (poids * inverses[lignes]).astype(np.float32)
+
+        if sparse is not None:
+            lignes_normalisees = sparse.csr_matrix((poids_normalises, indices, indptr), shape=(self.nb_documents, self.nb_termes))
+            self.colonnes = lignes_normalisees.T.tocsr()    # Une ligne par terme : le produit ne lit que les lignes des mots de la question.
+            presences = sparse.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(self.nb_documents, self.nb_termes))
+            self.presences = presences.T.tocsr()    # 1 si le document contient le terme, même quand son score TF-IDF est nul.
+        else:
+            ordre = np.argsort(indices, kind='stable')    # Transposition : éléments triés par terme puis par document.
+            self.debuts = np.concatenate(([0], np.cumsum(np.bincount(indices, minlength=self.nb_termes))))
+            self.docs = lignes[ordre]
+            self.poids = poids_normalises[ordre]
+
+    def vecteur(self, vecteur_question, normaliser=True):
+        """
+        Convertit le vecteur TF-IDF d'une question en couples (identifiants de termes, poids normalisés).
+        Paramètres:
+        vecteur_question (dict): Scores TF-IDF des mots de la question.
+        normaliser (bool): Divise les poids par leur norme.
+        Retourne:
+        tuple: Tableau des identifiants de termes et tableau float32 des poids, de norme 1 (vides si aucun mot n'est connu).
+        """
+        termes, poids = [], []
+        for mot, score in vecteur_question.items():
+            terme = self.matrice.id_terme(mot)
+            if terme is not None and score != 0:
+                termes.append(terme)
+                poids.append(score)
+        poids = np.array(poids, dtype=np.float32)
+        norme = np.linalg.norm(poids)
+        if normaliser and norme > 0:
+            poids /= norme
+        return np.array(termes, dtype=np.int64), poids
+
+    def scores(self, vecteur_question):
+        """
+        Calcule la similarité cosinus d'une question avec chaque document.
+        Paramètres:
+        vecteur_question (dict): Scores TF-IDF des mots de la question.
+        Retourne:
+        numpy.ndarray: Similarité de chaque document, dans l'ordre des identifiants de documents.
+        """
+        return self.scores_lot([vecteur_question])[0]
+
+    def scores_lot(self, vecteurs_questions):
+        """
+        Calcule en une fois la similarité cosinus de plusieurs questions avec chaque document.
+        Paramètres:
+        vecteurs_questions (list): Vecteurs TF-IDF des questions.
+        Retourne:
+        numpy.ndarray: Matrice (nombre de questions, nombre de documents) des similarités.
+        """
+        vecteurs = [self.vecteur(vecteur_question) for vecteur_question in vecteurs_questions]
+        if sparse is not None:
+            lignes = np.repeat(np.arange(len(vecteurs)), [len(termes) for termes, _ in vecteurs])
+            colonnes = np.concatenate([termes for termes, _ in vecteurs]) if vecteurs else np.zeros(0, dtype=np.int64)
+            valeurs = np.concatenate([poids for _, poids in vecteurs]) if vecteurs else np.zeros(0, dtype=np.float32)
+            questions = sparse.csr_matrix((valeurs, (lignes, colonnes)), shape=(len(vecteurs), self.nb_termes))
+            return (questions @ self.colonnes).toarray()    # Produit matrice-matrice creux.
+
+        scores = np.zeros((len(vecteurs), self.nb_documents), dtype=np.float32)
+        for ligne, (termes, poids) in enumerate(vecteurs):
+            for terme, poids_question in zip(termes, poids):
+                debut, fin = self.debuts[terme], self.debuts[terme + 1]
+                scores[ligne, self.docs[debut:fin]] += poids_question * self.poids[debut:fin]    # Un document n'apparaît qu'une fois par colonne.
+        return scores
+
+    def correspondances_lot(self, mots_questions):
+        """
+        Compte, pour chaque question d'un lot et chaque document, les mots de la question présents dans le document
+        (un mot répété dans la question compte autant de fois), comme trouver_document_pertinent.
+        Paramètres:
+        mots_questions (list): Liste des mots tokenisés de chaque question.
+        Retourne:
+        numpy.ndarray: Matrice (nombre de questions, nombre de documents) des nombres de mots correspondants.
+        """
+        multiplicites = [{mot: mots.count(mot) for mot in mots} for mots in mots_questions]
+        vecteurs = [self.vecteur(multiplicite, normaliser=False) for multiplicite in multiplicites]
+        if sparse is not None:
+            lignes = np.repeat(np.arange(len(vecteurs)), [len(termes) for termes, _ in vecteurs])
+            colonnes = np.concatenate([termes for termes, _ in vecteurs]) if vecteurs else np.zeros(0, dtype=np.int64)
+            valeurs = np.concatenate([poids for _, poids in vecteurs]) if vecteurs else np.zeros(0, dtype=np.float32)
+            questions = sparse.csr_matrix((valeurs, (lignes, colonnes)), shape=(len(vecteurs), self.nb_termes))
+            return (questions @ self.presences).toarray()
+
+        comptes = np.zeros((len(vecteurs), self.nb_documents), dtype=np.float32)
+        for ligne, (termes, poids) in enumerate(vecteurs):
+            for terme, multiplicite in zip(termes, poids):
+                comptes[ligne, self.docs[self.debuts[terme]:self.debuts[terme + 1]]] += multiplicite
+        return comptes
+
+    def documents_pertinents_lot(self, vecteurs_questions, mots_questions):
+        """
+        Choisit le document le plus pertinent de chaque question d'un lot avec la même règle que trouver_document_pertinent :
+        le plus de mots correspondants, puis la plus grande similarité cosinus, puis le plus petit identifiant.
+        Paramètres:
+        vecteurs_questions (list): Vecteurs TF-IDF des questions.
+        mots_questions (list): Liste des mots tokenisés de chaque question.
+        Retourne:
+        list: Identifiant du document choisi pour chaque question, ou None si aucun document ne contient ses mots.
+        """
+        resultats = []
+        for scores, comptes in zip(self.scores_lot(vecteurs_questions), self.correspondances_lot(mots_questions)):
+            maximum = comptes.max(initial=0)
+            if maximum <= 0:
+                resultats.append(None)
+                continue
+            candidats = np.flatnonzero(comptes == maximum)
+            resultats.append(int(candidats[np.argmax(scores[candidats])]))    # argmax garde le premier en cas d'égalité.
+        return resultats
+
+    def meilleurs_documents(self, vecteur_question, k=5):
+        """
+        Sélectionne les k documents les plus similaires à la question (voir IndexInverse.meilleurs_documents).
+        Paramètres:
+        vecteur_question (dict): Scores TF-IDF des mots de la question.
+        k (int): Nombre de documents à retourner.
+        Retourne:
+        list: Couples (identifiant du document, similarité cosinus), du plus au moins similaire, à égalité le plus petit identifiant d'abord.
+        """
+        return self.meilleurs_documents_lot([vecteur_question], k)[0]
+
+    def meilleurs_documents_lot(self, vecteurs_questions, k=5):
+        """
+        Sélectionne les k documents les plus similaires à chaque question d'un lot. Comme dans l'index inversé, les
+        candidats sont les documents qui contiennent au moins un mot de la question, même si leur similarité est nulle.
+        Paramètres:
+        vecteurs_questions (list): Vecteurs TF-IDF des questions.
+        k (int): Nombre de documents à retourner par question.
+        Retourne:
+        list: Pour chaque question, la liste de ses couples (identifiant du document, similarité cosinus).
+        """
+        resultats = []
+        for scores, presences in zip(self.scores_lot(vecteurs_questions), self.presences_lot(vecteurs_questions)):
+            candidats = np.flatnonzero(presences)
+            if k <= 0 or len(candidats) == 0:
+                resultats.append([])
+                continue
+            scores_candidats = scores[candidats]
+            if len(candidats) > k:    # Les k meilleurs, sans trier tous les candidats ; les ex aequo du k-ième sont gardés.
+                seuil = np.partition(scores_candidats, len(candidats) - k)[len(candidats) - k]
+                garder = scores_candidats >= seuil
+                candidats, scores_candidats = candidats[garder], scores_candidats[garder]
+            ordre = np.lexsort((candidats, -scores_candidats))[:k]    # Score décroissant, puis identifiant croissant.
+            resultats.append([(int(candidats[i]), float(scores_candidats[i])) for i in ordre])
+        return resultats
+
+    def presences_lot(self, vecteurs_questions):
+        """
+        Indique, pour chaque question d'un lot et chaque document, si le document contient au moins un mot de la question.
+        Paramètres:
+        vecteurs_questions (list): Vecteurs TF-IDF des questions.
+        Retourne:
+        numpy.ndarray: Matrice booléenne (nombre de questions, nombre de documents).
+        """
+        termes_questions = [self.vecteur(vecteur_question, normaliser=False)[0] for vecteur_question in vecteurs_questions]
+        if sparse is not None:
+            lignes = np.repeat(np.arange(len(termes_questions)), [len(termes) for termes in termes_questions])
+            colonnes = np.concatenate(termes_questions) if termes_questions else np.zeros(0, dtype=np.int64)
+            questions = sparse.csr_matrix((np.ones(len(colonnes), dtype=np.float32), (lignes, colonnes)),
+                                          shape=(len(termes_questions), self.nb_termes))
+            return (questions @ self.presences).toarray() > 0
+
+        presences = np.zeros((len(termes_questions), self.nb_documents), dtype=bool)
+        for ligne, termes in enumerate(termes_questions):
+            for terme in termes:
+                presences[ligne, self.docs[self.debuts[terme]:self.debuts[terme + 1]]] = True
+        return presences
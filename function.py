@@ -3,9 +3,47 @@
 # Ce fichier contient des fonctions pour le traitement des textes,
 # l'analyse TF-IDF, et la génération de réponses automatiques pour un chatbot.
 import os
+import json
 import string
 import math
 import re
+import heapq
+import time
+import threading
+from collections import OrderedDict, Counter
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from indexation import MatriceTfIdf, IndexInverse, CorpusIndexe
+from analyses import AnalysesCorpus
+from passages import IndexPassages
+from positions import IndexPositionnel
+from trigrammes import IndexTrigrammes
+from bm25 import ScoreurBM25
+from persistance import signature_sources, sauvegarder_index, charger_index, index_a_jour
+from indexeur import IndexeurIncremental
+from instrumentation import INSTRUMENTATION
+
+# Dictionnaire de correspondance des accents.
+CORRESPONDANCES_ACCENTS = {
+    'à': 'a', 'â': 'a', 'ä': 'a',
+    'è': 'e', 'é': 'e', 'ê': 'e', 'ë': 'e',
+    'î': 'i', 'ï': 'i',
+    'ô': 'o', 'ö': 'o',
+    'ù': 'u', 'û': 'u', 'ü': 'u',
+    'ç': 'c',
+}
+TABLE_ACCENTS = str.maketrans(CORRESPONDANCES_ACCENTS)
+# Table de normalisation des discours : ponctuation, apostrophes et tirets remplacés par un espace, accents retirés.
+TABLE_NORMALISATION = str.maketrans({**{char: ' ' for char in string.punctuation}, **CORRESPONDANCES_ACCENTS})
+TAILLE_BLOC = 1 << 16    # Nombre de caractères lus à la fois lors de la lecture en flux des discours.
+# Une phrase s'arrête à un point, un point d'exclamation, un point d'interrogation ou un retour à la ligne.
+MOTIF_PHRASE = re.compile(rb'[^.!?\n]*[.!?]+|[^.!?\n]+')
+MESSAGE_AUCUN_DOCUMENT = "Aucun document pertinent trouvé pour la question posée."
+CLASSEMENTS = ("cosinus", "bm25")    # Modes de classement des documents du chatbot (voir repondre_question).
+# Expression entre guillemets dans une question, éventuellement suivie de ~N pour chercher des mots proches de moins de N mots.
+MOTIF_EXPRESSION = re.compile(r'["“«]\s*([^"”»]+?)\s*["”»](?:~(\d+))?')
+NB_PHRASES_EXPRESSIONS = 20    # Phrases examinées pour en trouver une qui contient les expressions entre guillemets.
+FICHIER_METADONNEES = "metadonnees.json"    # Président, prénom et date d'investiture de chaque discours, dans le répertoire des discours.
 
 
 def list_of_files(directory, extension):
@@ -76,6 +114,31 @@ def afficher_presidents(presidents):
 
 
 
+def lire_metadonnees(directory, documents):
+    """
+    Lit les métadonnées des discours (président, prénom, date d'investiture) dans le fichier metadonnees.json du
+    répertoire des discours. Un discours absent du fichier reçoit le président extrait de son nom et aucune date.
+    Paramètres:
+    directory (str): Chemin du répertoire des discours.
+    documents (list): Noms des fichiers des discours.
+    Retourne:
+    list: Dictionnaire {'president', 'prenom', 'date_investiture'} de chaque discours, dans l'ordre de documents.
+    """
+    try:
+        with open(os.path.join(directory, FICHIER_METADONNEES), 'r', encoding='utf-8') as file:
+            connues = json.load(file)
+    except FileNotFoundError:
+        connues = {}
+    metadonnees = []
+    for filename in documents:
+        metadonnee = connues.get(filename, {})
+        president = metadonnee.get('president') or extraire_nom_president2(filename)
+        prenom = metadonnee.get('prenom') or associer_prenoms_presidents([president])[president]
+        metadonnees.append({'president': president, 'prenom': prenom, 'date_investiture': metadonnee.get('date_investiture')})
+    return metadonnees
+
+
+
 def convertir_en_minuscules(directory, target_directory):
     """
     Convertit le contenu de chaque fichier texte en minuscules.
@@ -103,17 +166,19 @@ def retirer_accents(texte):
     Retourne:
     str: Texte modifié  sans accents.
     """
-    # Dictionnaire de correspondance des accents.
-    correspondances = {
-        'à': 'a', 'â': 'a', 'ä': 'a',
-        'è': 'e', 'é': 'e', 'ê': 'e', 'ë': 'e',
-        'î': 'i', 'ï': 'i',
-        'ô': 'o', 'ö': 'o',
-        'ù': 'u', 'û': 'u', 'ü': 'u',
-        'ç': 'c',
-    }
-    
-    return ''.join(correspondances.get(c, c) for c in texte)    # Remplacement des caractères accentués.
+    return texte.translate(TABLE_ACCENTS)    # Remplacement des caractères accentués.
+
+
+def normaliser_texte(texte):
+    """
+    Met un texte en minuscules puis remplace en une seule passe la ponctuation (apostrophes et tirets compris)
+    par des espaces et les lettres accentuées par leurs équivalents sans accent.
+    Paramètres:
+    texte (str): Texte à normaliser.
+    Retourne:
+    str: Texte en minuscules, sans ponctuation ni accents.
+    """
+    return texte.lower().translate(TABLE_NORMALISATION)
 
 
 def supprimer_ponctuation_et_accents(directory):
@@ -123,24 +188,75 @@ def supprimer_ponctuation_et_accents(directory):
     directory (str): Chemin du répertoire des fichiers.
     Ne retourne rien car les modifications sont directes
     """
-    punctuation = string.punctuation.replace("'", "").replace("-", "")  # Conserve les apostrophes et les tirets
-
     for filename in os.listdir(directory):
         if filename.endswith(".txt"):
             file_path = os.path.join(directory, filename)
 
             with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+                content = normaliser_texte(file.read())    # Les fichiers sont déjà en minuscules, seules la ponctuation et les accents changent.
 
-                for char in punctuation:    # Suppression de la ponctuation
-                    content = content.replace(char, " ")
+            with open(file_path, 'w', encoding='utf-8') as file:
+                file.write(content)
 
-                content = content.replace("'", " ").replace("-", " ")    # Remplacement des apostrophes et tirets
 
-                content = retirer_accents(content)    # Suppression des accents
+def lire_blocs_normalises(file_path, taille_bloc=TAILLE_BLOC):
+    """
+    Lit un fichier par blocs et normalise chaque bloc au fil de la lecture, sans charger tout le fichier en mémoire.
+    Paramètres:
+    file_path (str): Chemin du fichier.
+    taille_bloc (int): Nombre de caractères lus à la fois.
+    Retourne:
+    generator: Blocs de texte normalisés (voir normaliser_texte).
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        while True:
+            bloc = file.read(taille_bloc)
+            if not bloc:
+                break
+            yield normaliser_texte(bloc)
 
-            with open(file_path, 'w', encoding='utf-8') as file:
-                file.write(content)
+
+def decouper_mots(blocs):
+    """
+    Découpe une suite de blocs de texte en mots, un mot coupé entre deux blocs étant recollé.
+    Paramètres:
+    blocs (iterable): Blocs de texte successifs.
+    Retourne:
+    generator: Mots du texte, dans l'ordre.
+    """
+    reste = ''    # Début d'un mot coupé à la fin du bloc précédent.
+    for bloc in blocs:
+        bloc = reste + bloc
+        mots = bloc.split()
+        reste = mots.pop() if mots and not bloc[-1].isspace() else ''
+        yield from mots
+    if reste:
+        yield reste
+
+
+def compter_mots_fichier(file_path, chemin_nettoye=None):
+    """
+    Lit un discours en flux, le normalise et compte ses mots en une seule passe.
+    Paramètres:
+    file_path (str): Chemin du discours.
+    chemin_nettoye (str): Chemin où écrire en même temps la version nettoyée du discours, facultatif.
+    Retourne:
+    dict: Dictionnaire des fréquences des termes (voir calculer_tf).
+    """
+    tf = {}
+    blocs = lire_blocs_normalises(file_path)
+    if chemin_nettoye is not None:
+        blocs = _ecrire_blocs(blocs, chemin_nettoye)
+    for mot in decouper_mots(blocs):
+        tf[mot] = tf.get(mot, 0) + 1
+    return tf
+
+
+def _ecrire_blocs(blocs, file_path):
+    with open(file_path, 'w', encoding='utf-8') as file:    # Chaque bloc est écrit au passage, avant d'être découpé en mots.
+        for bloc in blocs:
+            file.write(bloc)
+            yield bloc
 
 
 def calculer_tf(texte):
@@ -162,23 +278,31 @@ def calculer_tf(texte):
 
 
 
-def calculer_idf(directory):
+def compter_frequences_documents(comptages):
     """
-    Calcule l'IDF pour chaque mot unique dans les fichiers.
+    Compte, pour chaque mot, le nombre de documents qui le contiennent.
     Paramètres:
-    directory (str): Chemin du répertoire des fichiers.
+    comptages (list): Fréquences des termes (ou ensemble des mots) de chaque document.
     Retourne:
-    dict: Dictionnaire des scores IDF.
-        """
-    files = os.listdir(directory)    # Liste des fichiers dans le répertoire.
-    nb_fichiers = len([f for f in files if f.endswith('.txt')])    # Nombre total de fichiers.
+    dict: Dictionnaire associant chaque mot à son nombre de documents.
+    """
     comptage_docs_mot = {}    # Dictionnaire pour compter combien de documents contiennent chaque mot.
-    for filename in files:
-        if filename.endswith('.txt'):
-            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
-                mots_uniques = set(file.read().split())    # Ensemble des mots uniques dans le document.
-                for mot in mots_uniques:
-                    comptage_docs_mot[mot] = comptage_docs_mot.get(mot, 0) + 1    # Incrémentation du comptage pour chaque mot unique.
+    for tf in comptages:
+        for mot in tf:
+            comptage_docs_mot[mot] = comptage_docs_mot.get(mot, 0) + 1    # Incrémentation du comptage pour chaque mot unique.
+    return comptage_docs_mot
+
+
+
+def calculer_idf_depuis_frequences(comptage_docs_mot, nb_fichiers):
+    """
+    Calcule l'IDF de chaque mot à partir du nombre de documents qui le contiennent.
+    Paramètres:
+    comptage_docs_mot (dict): Nombre de documents contenant chaque mot.
+    nb_fichiers (int): Nombre total de documents.
+    Retourne:
+    dict: Dictionnaire des scores IDF.
+    """
     idf = {}    # Dictionnaire pour stocker les scores IDF.
     for mot, comptage in comptage_docs_mot.items():
         idf[mot] = math.log(nb_fichiers / float(comptage)) if comptage > 0 else 0    # Calcul du score IDF en évitant la division par zéro.
@@ -186,29 +310,223 @@ def calculer_idf(directory):
 
 
 
-def calculer_tf_idf(directory):
+def calculer_idf(directory):
+    """
+    Calcule l'IDF pour chaque mot unique dans les fichiers.
+    Paramètres:
+    directory (str): Chemin du répertoire des fichiers.
+    Retourne:
+    dict: Dictionnaire des scores IDF.
+        """
+    files = [f for f in os.listdir(directory) if f.endswith('.txt')]    # Liste des fichiers dans le répertoire.
+    mots_par_fichier = [set(decouper_mots(lire_blocs_normalises(os.path.join(directory, f)))) for f in files]    # Ensemble des mots uniques de chaque document.
+    return calculer_idf_depuis_frequences(compter_frequences_documents(mots_par_fichier), len(files))
+
+
+
+def _compter_lot(chemins):
+    """
+    Compte les mots d'un lot de documents (exécuté dans un processus de travail lors d'une construction parallèle).
+    Paramètres:
+    chemins (list): Couples (chemin du discours, chemin de sa version nettoyée ou None).
+    Retourne:
+    tuple: Fréquences des termes de chaque document du lot et nombre de documents du lot contenant chaque mot.
+    """
+    comptages = [compter_mots_fichier(source, nettoye) for source, nettoye in chemins]
+    return comptages, compter_frequences_documents(comptages)
+
+
+
+def calculer_tf_idf(directory, target_directory=None, nb_processus=1):
     """
-    Calcule la matrice TF-IDF pour tous les fichiers. .
+    Calcule la matrice TF-IDF pour tous les fichiers, en lisant chaque fichier une seule fois.
+    Les fichiers sont normalisés à la lecture : le répertoire peut être celui des discours bruts ou celui des fichiers nettoyés.
+    Avec plusieurs processus, les documents sont répartis en lots comptés en parallèle, puis les fréquences
+    documentaires partielles de chaque lot sont additionnées.
     Paramètres:
     directory (str): Chemin du répertoire des fichiers.
+    target_directory (str): Répertoire où écrire au passage la version nettoyée de chaque fichier, facultatif.
+    nb_processus (int): Nombre de processus de travail (1 pour tout faire dans le processus courant, None pour un par cœur).
+    Retourne:
+    MatriceTfIdf: Matrice TF-IDF creuse, chaque document étant identifié par sa position dans la liste triée des fichiers.
+    """
+    documents = sorted(f for f in os.listdir(directory) if f.endswith('.txt'))    # Liste triée des fichiers, pour des identifiants de documents stables.
+    if target_directory is not None:
+        os.makedirs(target_directory, exist_ok=True)    # Création du répertoire cible si nécessaire.
+    chemins = [(os.path.join(directory, filename), os.path.join(target_directory, filename) if target_directory is not None else None)
+               for filename in documents]
+    if nb_processus is None:
+        nb_processus = os.cpu_count() or 1
+
+    if nb_processus <= 1 or len(documents) < 2:
+        comptages, comptage_docs_mot = _compter_lot(chemins)
+    else:
+        taille_lot = max(1, math.ceil(len(chemins) / (nb_processus * 4)))    # Plusieurs lots par processus pour équilibrer la charge.
+        lots = [chemins[i:i + taille_lot] for i in range(0, len(chemins), taille_lot)]
+        comptages, comptage_docs_mot = [], {}
+        with ProcessPoolExecutor(max_workers=nb_processus) as executor:
+            for comptages_lot, frequences_lot in executor.map(_compter_lot, lots):    # Résultats reçus dans l'ordre des lots.
+                comptages.extend(comptages_lot)
+                for mot, comptage in frequences_lot.items():
+                    comptage_docs_mot[mot] = comptage_docs_mot.get(mot, 0) + comptage
+
+    idf_scores = calculer_idf_depuis_frequences(comptage_docs_mot, len(documents))    # Calcul des scores IDF sans relire les fichiers.
+    return MatriceTfIdf.depuis_comptages(documents, comptages, idf_scores)
+
+
+
+def segmenter_discours(file_path):
+    """
+    Découpe un discours en phrases, chaque phrase étant repérée par sa position en octets dans le fichier.
+    Paramètres:
+    file_path (str): Chemin du discours.
     Retourne:
-    dict: Dictionnaire représentant la matrice TF-IDF.
+    list: Triplets (position, longueur en octets, mots normalisés) de chaque phrase contenant au moins un mot.
     """
-    tf_idf_matrice = {}    # Dictionnaire pour la matrice TF-IDF.
-    idf_scores = calculer_idf(directory)    # Calcul des scores IDF.
-    files = os.listdir(directory)    # Liste des fichiers.
-    for filename in files:
-        if filename.endswith('.txt'):
-            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
-                tf_scores = calculer_tf(file.read())    # Calcul des scores TF pour le fichier actuel.
-                for mot, tf in tf_scores.items():
-                    tf_idf = tf * idf_scores[mot]    # Calcul du score TF-IDF.
-                    if mot in tf_idf_matrice:
-                        tf_idf_matrice[mot].append(tf_idf)
-                    else:
-                        tf_idf_matrice[mot] = [tf_idf]
+    with open(file_path, 'rb') as file:
+        contenu = file.read()    # Lecture en octets, pour que les positions puissent servir directement à un seek.
+    phrases = []
+    for correspondance in MOTIF_PHRASE.finditer(contenu):
+        texte = correspondance.group()
+        debut = correspondance.start() + len(texte) - len(texte.lstrip())    # Les espaces autour de la phrase ne sont pas gardés.
+        texte = texte.strip()
+        mots = normaliser_texte(texte.decode('utf-8')).split()
+        if mots:
+            phrases.append((debut, len(texte), mots))
+    return phrases
+
 
-    return tf_idf_matrice
+
+def construire_index_passages(directory_speeches, tf_idf_matrice):
+    """
+    Construit l'index des phrases des discours du corpus.
+    Paramètres:
+    directory_speeches (str): Chemin du répertoire des discours.
+    tf_idf_matrice (MatriceTfIdf): Matrice TF-IDF des documents.
+    Retourne:
+    IndexPassages: Index des phrases du corpus.
+    """
+    segmentations = [segmenter_discours(os.path.join(directory_speeches, filename)) for filename in tf_idf_matrice.documents]
+    return IndexPassages.depuis_segmentations(tf_idf_matrice, segmentations, directory_speeches)
+
+
+
+def positions_discours(file_path):
+    """
+    Relève la position de chaque mot d'un discours, c'est-à-dire son rang dans la suite des mots du discours normalisé.
+    Paramètres:
+    file_path (str): Chemin du discours.
+    Retourne:
+    dict: Dictionnaire associant chaque mot à la liste croissante de ses positions.
+    """
+    positions = {}
+    for position, mot in enumerate(decouper_mots(lire_blocs_normalises(file_path))):
+        positions.setdefault(mot, []).append(position)
+    return positions
+
+
+
+def construire_index_positions(directory_speeches, tf_idf_matrice):
+    """
+    Construit l'index positionnel des discours du corpus.
+    Paramètres:
+    directory_speeches (str): Chemin du répertoire des discours.
+    tf_idf_matrice (MatriceTfIdf): Matrice TF-IDF des documents.
+    Retourne:
+    IndexPositionnel: Index positionnel du corpus.
+    """
+    positions_documents = [positions_discours(os.path.join(directory_speeches, filename)) for filename in tf_idf_matrice.documents]
+    return IndexPositionnel.depuis_positions(tf_idf_matrice, positions_documents)
+
+
+
+def construire_index_inverse(tf_idf_matrice):
+    """
+    Construit l'index inversé du corpus (postings des scores TF-IDF de chaque mot et normes des documents).
+    Paramètres:
+    tf_idf_matrice (MatriceTfIdf): Matrice TF-IDF des documents.
+    Retourne:
+    IndexInverse: Index inversé du corpus.
+    """
+    return IndexInverse(tf_idf_matrice)
+
+
+
+def charger_ou_construire_index(directory_speeches, target_directory, chemin_index, nb_processus=1):
+    """
+    Charge l'index du corpus depuis le fichier d'index s'il est à jour (discours et métadonnées), sinon recalcule la matrice
+    TF-IDF, l'index inversé, l'index des phrases, l'index positionnel, les impacts BM25, les tables d'analyse et l'index
+    des trigrammes, puis les sauvegarde pour les prochains lancements. Les discours sont normalisés à la lecture : aucun fichier nettoyé n'est nécessaire.
+    Paramètres:
+    directory_speeches (str): Chemin du répertoire des discours.
+    target_directory (str): Répertoire où exporter la version nettoyée des discours retraités, facultatif (None : aucun export).
+    chemin_index (str): Chemin du fichier d'index.
+    nb_processus (int): Nombre de processus utilisés pour une reconstruction complète (voir calculer_tf_idf).
+    Retourne:
+    CorpusIndexe: Index du corpus (matrice TF-IDF, index inversé, index des phrases, index positionnel, impacts BM25,
+    tables d'analyse et index des trigrammes du vocabulaire).
+    """
+    corpus = charger_index(chemin_index, directory_speeches)
+    if corpus is not None:
+        if (index_a_jour(corpus, directory_speeches)    # Aucun discours ajouté, supprimé ou modifié.
+                and corpus.metadonnees == lire_metadonnees(directory_speeches, corpus.matrice.documents)):
+            return corpus    # Tables d'analyse et index des trigrammes compris, lus dans le fichier.
+
+        # Seuls les discours ajoutés, modifiés ou supprimés depuis la dernière sauvegarde sont relus ; l'index chargé
+        # sert de base à la fusion (voir indexeur.Fusion), qui recopie tout ce qui ne dépend pas d'eux.
+        indexeur = IndexeurIncremental(corpus)
+        sources, modifies = synchroniser_index(indexeur, directory_speeches, target_directory, corpus.sources)
+        fusion = indexeur.fusion()
+        metadonnees = lire_metadonnees(directory_speeches, fusion.documents)
+        segmentations = {filename: segmenter_discours(os.path.join(directory_speeches, filename)) for filename in modifies}
+        positions = {filename: positions_discours(os.path.join(directory_speeches, filename)) for filename in modifies}
+        corpus = fusion.corpus(sources, metadonnees, segmentations, positions, directory_speeches)
+        del indexeur, fusion    # Libère la projection de l'ancien fichier avant de le remplacer.
+        sauvegarder_index(chemin_index, corpus)
+        return corpus
+
+    sources = signature_sources(directory_speeches)    # Relevé avant le nettoyage, pour qu'une modification pendant la construction soit détectée au prochain lancement.
+    tf_idf_matrice = calculer_tf_idf(directory_speeches, target_directory, nb_processus)    # Normalisation et comptage des mots de chaque discours en une seule lecture.
+    index_inverse = construire_index_inverse(tf_idf_matrice)
+    passages = construire_index_passages(directory_speeches, tf_idf_matrice)
+    index_positions = construire_index_positions(directory_speeches, tf_idf_matrice)
+    metadonnees = lire_metadonnees(directory_speeches, tf_idf_matrice.documents)
+    bm25 = ScoreurBM25.depuis_matrice(tf_idf_matrice)
+    corpus = CorpusIndexe(tf_idf_matrice, index_inverse, passages, sources, metadonnees, index_positions, bm25)
+    corpus.analyses = construire_analyses(corpus)
+    corpus.trigrammes = IndexTrigrammes(corpus.matrice)
+    sauvegarder_index(chemin_index, corpus)
+    return corpus
+
+
+
+def synchroniser_index(indexeur, directory_speeches, target_directory, sources_indexees):
+    """
+    Met à jour un indexeur incrémental d'après les discours ajoutés, modifiés ou supprimés.
+    Paramètres:
+    indexeur (IndexeurIncremental): Indexeur à mettre à jour.
+    directory_speeches (str): Chemin du répertoire des discours.
+    target_directory (str): Répertoire où exporter la version nettoyée des discours retraités, facultatif (None : aucun export).
+    sources_indexees (dict): Signature des discours au moment de leur indexation (voir signature_sources).
+    Retourne:
+    tuple: Signature actuelle des discours, à enregistrer avec l'index, et liste des discours ajoutés ou modifiés.
+    """
+    sources = signature_sources(directory_speeches)
+    modifies = []
+    for filename in sources_indexees:
+        if filename not in sources:    # Discours supprimé.
+            indexeur.supprimer_document(filename)
+            if target_directory is not None and os.path.exists(os.path.join(target_directory, filename)):
+                os.remove(os.path.join(target_directory, filename))
+    if target_directory is not None:
+        os.makedirs(target_directory, exist_ok=True)
+    for filename, signature in sources.items():
+        if sources_indexees.get(filename) != signature:    # Discours ajouté ou modifié.
+            chemin_nettoye = os.path.join(target_directory, filename) if target_directory is not None else None
+            comptage = compter_mots_fichier(os.path.join(directory_speeches, filename), chemin_nettoye)
+            indexeur.mettre_a_jour_document(filename, comptage)
+            modifies.append(filename)
+    return sources, modifies
 
 
 
@@ -216,12 +534,12 @@ def trouver_mots_moins_importants(tf_idf_matrice):
     """
     Identifie les mots avec un score TF-IDF de zéro.
     Paramètres:
-    tf_idf_matrice (dict): Matrice TF-IDF des documents.
+    tf_idf_matrice (MatriceTfIdf): Matrice TF-IDF des documents.
     Retourne:
     list: Liste des mots avec un score TF-IDF de zéro.
     """
 
-    return [mot for mot, scores in tf_idf_matrice.items() if all(score == 0 for score in scores)]
+    return [mot for mot, scores in tf_idf_matrice.colonnes() if all(score == 0 for _, score in scores)]
 
 
 
@@ -229,14 +547,14 @@ def trouver_mots_avec_tf_idf_le_plus_eleve(tf_idf_matrice):
     """
     Identifie les mots avec le score TF-IDF le plus élevé.
     Paramètres:
-    tf_idf_matrice (dict): Matrice TF-IDF des documents.
+    tf_idf_matrice (MatriceTfIdf): Matrice TF-IDF des documents.
     Retourne:
     tuple: Liste des mots avec le score TF-IDF le plus élevé et le score.
     """
     score_tf_idf_maximal = 0    # Initialisation du score maximal et de la liste des mots correspondants.
     liste_mots_avec_score_maximal = []
-    for mot, scores in tf_idf_matrice.items():
-        max_score = max(scores)    # Trouver le score maximal pour chaque mot.
+    for mot, scores in tf_idf_matrice.colonnes():
+        max_score = max(score for _, score in scores)    # Trouver le score maximal pour chaque mot.
         if max_score > score_tf_idf_maximal:
             score_tf_idf_maximal = max_score
             liste_mots_avec_score_maximal = [mot]
@@ -245,52 +563,72 @@ def trouver_mots_avec_tf_idf_le_plus_eleve(tf_idf_matrice):
     return liste_mots_avec_score_maximal, score_tf_idf_maximal
 
 
-def mots_les_plus_repetes_par_president(tf_idf_matrice, directory, nom_president):
+def construire_analyses(corpus):
+    """
+    Regroupe par président les nombres d'occurrences des mots de chaque document, pour les fonctionnalités de la Partie I.
+    Paramètres:
+    corpus (CorpusIndexe): Index du corpus, avec les métadonnées des discours.
+    Retourne:
+    AnalysesCorpus: Tables d'analyse du corpus.
+    """
+    return AnalysesCorpus(corpus.matrice, corpus.metadonnees, corpus.positions)
+
+
+def mots_les_plus_repetes_par_president(analyses, nom_president):
     """
     Identifie les mots les plus répétés dans les discours d'un président spécifique, en tenant compte de leur score TF-IDF.
     Paramètres:
-    tf_idf_matrice (dict): Matrice TF-IDF des documents.
-    directory (str): Chemin du répertoire contenant les discours.
+    analyses (AnalysesCorpus): Tables d'analyse du corpus.
     nom_president (str): Nom du président à analyser.
     Retourne:
-    list: Liste des 20 mots les plus répétés par le président spécifié.
+    list: Liste des 20 mots les plus répétés par le président spécifié, avec leur nombre d'occurrences.
     """
-    mots_avec_tfidf_positif = set(mot for mot, scores in tf_idf_matrice.items() if any(score > 0.1 for score in scores))    # Ensemble des mots avec un score TF-IDF positif.
-    comptage_mots = {}    # Dictionnaire pour le comptage des mots.
-    president_files = [filename for filename in os.listdir(directory) if nom_president in filename]    # Liste des fichiers correspondant au président.
-    for filename in president_files:
-        with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
-            mots = file.read().split()    # Lecture des mots du fichier.
-            for mot in mots:
-                if mot in mots_avec_tfidf_positif:
-                    comptage_mots[mot] = comptage_mots.get(mot, 0) + 1
-    vingt_mots_les_plus_repetes = sorted(comptage_mots.items(), key=lambda x: x[1], reverse=True)[:20]    # Tri des mots par nombre d'occurrences et récupération des vingt premiers.
-    return vingt_mots_les_plus_repetes
+    return analyses.mots_les_plus_repetes(nom_president, 20, 0.1)    # Seuls les mots dont un score TF-IDF dépasse 0.1 sont retenus.
 
 
 
-def compter_mentions_nation(directory):
+def compter_mentions(analyses, mots, par_president=True):
+    """
+    Compte le nombre de fois qu'un mot, ou l'un des mots d'une liste, est mentionné par chaque président ou dans chaque discours.
+    Paramètres:
+    analyses (AnalysesCorpus): Tables d'analyse du corpus.
+    mots (str ou list): Mot ou liste de mots recherchés ; un élément de plusieurs mots est cherché comme une expression exacte.
+    par_president (bool): Regroupe les discours d'un même président.
+    Retourne:
+    dict: Dictionnaire des présidents (ou des fichiers) et de leur nombre de mentions, dans l'ordre chronologique.
+    """
+    if isinstance(mots, str):
+        mots = [mots]
+    return analyses.occurrences([normaliser_texte(expression).split() for expression in mots], par_president)
+
+
+def trouver_orateur(analyses, mots, dernier=False):
+    """
+    Trouve le premier (ou le dernier) président, dans l'ordre des investitures, à mentionner un mot ou l'un des mots d'une liste.
+    Paramètres:
+    analyses (AnalysesCorpus): Tables d'analyse du corpus.
+    mots (str ou list): Mot ou liste de mots recherchés ; un élément de plusieurs mots est cherché comme une expression exacte.
+    dernier (bool): Cherche le plus récent au lieu du plus ancien.
+    Retourne:
+    tuple: Nom du président et fichier du discours. Si aucun n'est trouvé, retourne ("", None).
+    """
+    if isinstance(mots, str):
+        mots = [mots]
+    doc = analyses.premier_document([normaliser_texte(expression).split() for expression in mots], dernier)
+    if doc is None:
+        return "", None
+    return analyses.presidents_documents[doc], analyses.matrice.documents[doc]
+
+
+def compter_mentions_nation(analyses):
     """
     Compte le nombre de fois que le mot "nation" est mentionné par chaque président.
     Paramètres:
-    directory (str): Chemin du répertoire des fichiers.
+    analyses (AnalysesCorpus): Tables d'analyse du corpus.
     Retourne:
     dict: Dictionnaire des présidents et du nombre de mentions de "nation".
     """
-    mentions_nation = {}    # Dictionnaire pour les mentions de "nation".
-    mot_recherche = 'nation'    # Le mot à rechercher.
-    for filename in os.listdir(directory):
-        if filename.endswith(".txt"):
-            president = extraire_nom_president2(filename)    # Extraction du nom du président sans numéro.
-            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
-                content = file.read().split()    # Lecture des mots du fichier.
-                mentions = content.count(mot_recherche)    # Comptage des occurrences de "nation".
-                if mentions > 0:
-                    if president in mentions_nation:
-                        mentions_nation[president] += mentions
-                    else:
-                        mentions_nation[president] = mentions
-    return mentions_nation
+    return compter_mentions(analyses, 'nation')
 
 
 
@@ -309,67 +647,141 @@ def extraire_nom_president2(filename):
         nom_president = ''.join([i for i in nom_president if not i.isdigit()])    # Suppression des chiffres.
     return nom_president.strip()
 
-def trouver_premier_president_climat_ecologie(directory):
+def trouver_premier_president_climat_ecologie(analyses):
     """
-    Détermine le premier président à mentionner des termes liés au climat ou à l'écologie.
+    Détermine le premier président, dans l'ordre des investitures, à mentionner des termes liés au climat ou à l'écologie.
+    Un terme d'un seul mot est trouvé dans un discours si l'un de ses mots le contient (climat dans climatique) ; une expression
+    de plusieurs mots est cherchée telle quelle, mots consécutifs, dans l'index positionnel.
     Paramètres:
-    directory (str): Chemin du répertoire des fichiers.
+    analyses (AnalysesCorpus): Tables d'analyse du corpus.
     Retourne:
-    tuple: Nom du président et fichier où la mention a été trouvée. Si aucun n'est trouvé, retourne un tuple vide.
+    tuple: Nom du président et fichier où la mention a été trouvée. Si aucun n'est trouvé, retourne ("", None).
     """
     # Liste des termes liés au climat ou à l'écologie.
     mots_recherches = [
         'climat', 'climatique', 'ecologie', 'ecologique', 'planete',
         'transition energetique', 'rechauffement', 'changement climatique',
         'rechauffement global', 'energies renouvelables', 'emissions de gaz a effet de serre',
-        'developpement durable', 'ressources naturelles' 'biodiversite',
+        'developpement durable', 'ressources naturelles', 'biodiversite',
         'pollution', 'conservation de la nature', 'durabilite'
     ]
-    president_premiere_mention = ""
-    fichier_premiere_mention = None
-    
-    # Ordre d'investiture des présidents.
-    ordre_investiture = [
-        'Giscard dEstaing', 'Chirac1', 'Chirac2', 'Mitterrand1', 'Mitterrand2',
-        'Sarkozy', 'Hollande', 'Macron'
-    ]
-    for nom_fichier_investiture in ordre_investiture:
-        filename = f"Nomination_{nom_fichier_investiture}.txt"
-        file_path = os.path.join(directory, filename)
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                if any(mot in content for mot in mots_recherches):
-                    president_premiere_mention = extraire_nom_president2(filename)
-                    fichier_premiere_mention = filename
-                    break  # Arrêt dès la première mention trouvée.
-    return president_premiere_mention, fichier_premiere_mention
+    matrice = analyses.matrice
+    mots_contenant = [matrice.vocabulaire[terme] for mot in mots_recherches if ' ' not in mot for terme in analyses.termes_contenant(mot)]
+    expressions = [[mot] for mot in mots_contenant] + [mot.split() for mot in mots_recherches if ' ' in mot]
+    doc = analyses.premier_document(expressions)    # Ordre des investitures, d'après les métadonnées des discours.
+    if doc is None:
+        return "", None
+    return analyses.presidents_documents[doc], matrice.documents[doc]
 
 
-def mots_communs_tous_presidents(directory, tf_idf_matrice):
+def mots_communs_tous_presidents(analyses):
     """
-    Trouve les mots communs à tous les discours des présidents, exclus ceux avec un score TF-IDF de zéro.
+    Trouve les mots employés par tous les présidents, exclus ceux avec un score TF-IDF de zéro.
     Paramètres:
-    directory (str): Chemin du répertoire des fichiers.
-    tf_idf_matrice (dict): Matrice TF-IDF des documents.
+    analyses (AnalysesCorpus): Tables d'analyse du corpus.
     Retourne:
-    set: Ensemble de mots communs à tous les présidents.
+    list: Liste des mots communs à tous les présidents, par ordre alphabétique.
+    """
+    return analyses.mots_communs()
+
+# Mots vides retirés des questions posées au chatbot.
+MOTS_VIDES_AVEC_ACCENTS = [
+    "a", "à", "â", "abord", "afin", "ah", "ai", "aie", "ainsi", "allaient",
+    "allo", "allô", "allons", "après", "assez", "attendu", "au", "aucun", "aucune",
+    "aujourd", "aujourd'hui", "auquel", "aura", "auront", "aussi", "autre", "autres",
+    "aux", "auxquelles", "auxquels", "avaient", "avais", "avait", "avant", "avec",
+    "avoir", "ayant", "b", "bah", "beaucoup", "bien", "bigre", "boum", "bravo", "brrr",
+    "c", "ça", "car", "ce", "ceci", "cela", "celle", "celle-ci", "celle-là", "celles",
+    "celles-ci", "celles-là", "celui", "celui-ci", "celui-là", "cent", "cependant", "certain",
+    "certaine", "certaines", "certains", "certes", "ces", "cet", "cette", "ceux", "ceux-ci",
+    "ceux-là", "chacun", "chaque", "cher", "chère", "chères", "chers", "chez", "chiche", "chut",
+    "ci", "cinq", "cinquantaine", "cinquante", "cinquantième", "cinquième", "clac", "clic",
+    "combien", "comme", "comment", "compris", "concernant", "contre", "couic", "crac", "d",
+    "da", "dans", "de", "debout", "dedans", "dehors", "delà", "depuis", "derrière", "des",
+    "dès", "désormais", "desquelles", "desquels", "dessous", "dessus", "deux", "deuxième",
+    "deuxièmement", "devant", "devers", "devra", "différent", "différente", "différentes",
+    "différents", "dire", "divers", "diverse", "diverses", "dix", "dix-huit", "dixième",
+    "dix-neuf", "dix-sept", "doit", "doivent", "donc", "dont", "douze", "douzième", "dring",
+    "du", "duquel", "durant", "e", "effet", "eh", "elle", "elle-même", "elles", "elles-mêmes",
+    "en", "encore", "entre", "envers", "environ", "es", "ès", "est", "et", "etant", "étaient",
+    "étais", "était", "étant", "etc", "été", "etre", "être", "eu", "euh", "eux", "eux-mêmes",
+    "excepté", "f", "façon", "fais", "faisaient", "faisant", "fait", "feront", "fi", "flac",
+    "floc", "font", "g", "gens", "h", "ha", "hé", "hein", "hélas", "hem", "hep", "hi", "ho",
+    "holà", "hop", "hormis", "hors", "hou", "houp", "hue", "hui", "huit", "huitième", "hum",
+    "hurrah", "i", "il", "ils", "importe", "j", "je", "jusqu", "jusque", "k", "l", "la",
+    "là", "laquelle", "las", "le", "lequel", "les", "lès", "lesquelles", "lesquels", "leur",
+    "leurs", "longtemps", "lorsque", "lui", "lui-même", "m", "ma", "maint", "mais", "malgré",
+    "me", "même", "mêmes", "merci", "mes", "mien", "mienne", "miennes", "miens", "mille",
+    "mince", "moi", "moi-même", "moins", "mon", "moyennant", "n", "na", "ne", "néanmoins",
+    "neuf", "neuvième", "ni", "nombreuses", "nombreux", "non", "nos", "notre", "nôtre",
+    "nôtres", "nous", "nous-mêmes", "nul", "o", "où", "ô", "oh", "ohé", "olé", "ollé", "on",
+    "ont", "onze", "onzième", "ore", "ou", "où", "ouf", "ouias", "oust", "ouste", "outre",
+    "p", "paf", "pan", "par", "parmi", "partant", "particulier", "particulière", "particulièrement",
+    "pas", "passé", "pendant", "personne", "peu", "peut", "peuvent", "peux", "pff", "pfft", "pfut",
+    "pif", "plein", "plouf", "plus", "plusieurs", "plutôt", "pouah", "pour", "pourquoi", "premier",
+    "première", "premièrement", "près", "proche", "psitt", "puisque", "q", "qu", "quand", "quant",
+    "quanta", "quant-à-soi", "quarante", "quatorze", "quatre", "quatre-vingt", "quatrième",
+    "quatrièmement", "que", "quel", "quelconque", "quelle", "quelles", "quelque", "quelques",
+    "quelqu'un", "quels", "qui", "quiconque", "quinze", "quoi", "quoique", "r", "revoici", "revoilà",
+    "rien", "s", "sa", "sacrebleu", "sans", "sapristi", "sauf", "se", "seize", "selon", "sept",
+    "septième", "sera", "seront", "ses", "si", "sien", "sienne", "siennes", "siens", "sinon", "six",
+    "sixième", "soi", "soi-même", "soit", "soixante", "son", "sont", "sous", "stop", "suis", "suivant",
+    "sur", "surtout", "t", "ta", "tac", "tant", "te", "té", "tel", "telle", "tellement", "telles", "tels",
+    "tenant", "tes", "tic", "tien", "tienne", "tiennes", "tiens", "toc", "toi", "toi-même", "ton",
+    "touchant", "toujours", "tous", "tout", "toute", "toutes", "treize", "trente", "très", "trois",
+    "troisième", "troisièmement", "trop", "tsoin", "tsouin", "tu", "u", "un", "une", "unes", "uns", "v",
+    "va", "vais", "vas", "vé", "vers", "via", "vif", "vifs", "vingt", "vivat", "vive", "vives", "vlan",
+    "voici", "voilà", "vont", "vos", "votre", "vôtre", "vôtres", "vous", "vous-mêmes", "vu", "w", "x",
+    "y", "z", "zut", "alors", "aucuns", "bon", "devrait", "dos", "droite", "début", "essai", "faites",
+    "fois", "force", "haut", "ici", "juste", "maintenant", "mine", "mot", "nommés", "nouveaux", "parce",
+    "parole", "personnes", "pièce", "plupart", "seulement", "soyez", "sujet", "tandis", "valeur", "voie",
+    "voient", "état", "étions"
+]
+
+
+# Table de tokenisation des questions : apostrophes et tirets remplacés par un espace,
+# autre ponctuation supprimée, accents retirés.
+TABLE_TOKENISATION = str.maketrans({**{char: None for char in string.punctuation}, "'": ' ', '-': ' ', **CORRESPONDANCES_ACCENTS})
+
+
+class TokeniseurQuestion:
+    """
+    Tokeniseur de questions construit une seule fois : les mots vides sont déjà sans accents et rangés
+    dans un ensemble, et la ponctuation et les accents sont traités par une seule table de traduction.
+    Les questions déjà tokenisées peuvent être gardées dans un cache LRU.
     """
-    files = [f for f in os.listdir(directory) if f.endswith('.txt')]    # Liste des fichiers dans le répertoire.
-    if not files:
-        return []
 
-    with open(os.path.join(directory, files[0]), 'r', encoding='utf-8') as file:    # Initialisation des mots communs avec ceux du premier fichier.
-        mots_communs = set(file.read().split())
+    def __init__(self, mots_vides=MOTS_VIDES_AVEC_ACCENTS, taille_cache=1024):
+        """
+        Paramètres:
+        mots_vides (list): Mots vides, avec ou sans accents.
+        taille_cache (int): Nombre de questions gardées en cache (0 pour désactiver le cache).
+        """
+        self.mots_vides = frozenset(retirer_accents(mot) for mot in mots_vides)
+        if taille_cache:
+            self._tokeniser = lru_cache(maxsize=taille_cache)(self._tokeniser_sans_cache)
+        else:
+            self._tokeniser = self._tokeniser_sans_cache
+
+    def _tokeniser_sans_cache(self, question):
+        mots = question.lower().translate(TABLE_TOKENISATION).split()  # Minuscules, ponctuation et accents en une passe, puis division en mots
+        return tuple(mot for mot in mots if mot not in self.mots_vides)  # Filtrage des mots vides
 
-    for filename in files[1:]:    # Intersection des mots communs avec ceux des fichiers suivants.
-        with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
-            mots_fichier = set(file.read().split())
-            mots_communs = mots_communs.intersection(mots_fichier)
+    def tokeniser(self, question):
+        """
+        Tokenise une question en supprimant la ponctuation, les majuscules, les accents et les mots vides.
+        Paramètres:
+        question (str): Question à tokeniser.
+        Retourne:
+        list: Liste des mots tokenisés.
+        """
+        return list(self._tokeniser(question))  # Copie, pour que l'appelant ne puisse pas modifier le cache
 
-    mots_communs = {mot for mot in mots_communs if any(score > 0 for score in tf_idf_matrice.get(mot, []))}    # Filtre pour exclure les mots avec un score TF-IDF de zéro.
-    return mots_communs
 
+TOKENISEUR_QUESTION = TokeniseurQuestion()    # Tokeniseur partagé, construit une fois à l'import.
+
+
+@INSTRUMENTATION.etape('tokeniser_question')
 def tokeniser_question(question):
     """
     Tokenise une question en supprimant la ponctuation, les majuscules, et les mots vides.
@@ -378,115 +790,143 @@ def tokeniser_question(question):
     Retourne:
     list: Liste des mots tokenisés.
     """
-    liste_mots_vides_avec_accents = [
-        "a", "à", "â", "abord", "afin", "ah", "ai", "aie", "ainsi", "allaient",
-        "allo", "allô", "allons", "après", "assez", "attendu", "au", "aucun", "aucune",
-        "aujourd", "aujourd'hui", "auquel", "aura", "auront", "aussi", "autre", "autres",
-        "aux", "auxquelles", "auxquels", "avaient", "avais", "avait", "avant", "avec",
-        "avoir", "ayant", "b", "bah", "beaucoup", "bien", "bigre", "boum", "bravo", "brrr",
-        "c", "ça", "car", "ce", "ceci", "cela", "celle", "celle-ci", "celle-là", "celles",
-        "celles-ci", "celles-là", "celui", "celui-ci", "celui-là", "cent", "cependant", "certain",
-        "certaine", "certaines", "certains", "certes", "ces", "cet", "cette", "ceux", "ceux-ci",
-        "ceux-là", "chacun", "chaque", "cher", "chère", "chères", "chers", "chez", "chiche", "chut",
-        "ci", "cinq", "cinquantaine", "cinquante", "cinquantième", "cinquième", "clac", "clic",
-        "combien", "comme", "comment", "compris", "concernant", "contre", "couic", "crac", "d",
-        "da", "dans", "de", "debout", "dedans", "dehors", "delà", "depuis", "derrière", "des",
-        "dès", "désormais", "desquelles", "desquels", "dessous", "dessus", "deux", "deuxième",
-        "deuxièmement", "devant", "devers", "devra", "différent", "différente", "différentes",
-        "différents", "dire", "divers", "diverse", "diverses", "dix", "dix-huit", "dixième",
-        "dix-neuf", "dix-sept", "doit", "doivent", "donc", "dont", "douze", "douzième", "dring",
-        "du", "duquel", "durant", "e", "effet", "eh", "elle", "elle-même", "elles", "elles-mêmes",
-        "en", "encore", "entre", "envers", "environ", "es", "ès", "est", "et", "etant", "étaient",
-        "étais", "était", "étant", "etc", "été", "etre", "être", "eu", "euh", "eux", "eux-mêmes",
-        "excepté", "f", "façon", "fais", "faisaient", "faisant", "fait", "feront", "fi", "flac",
-        "floc", "font", "g", "gens", "h", "ha", "hé", "hein", "hélas", "hem", "hep", "hi", "ho",
-        "holà", "hop", "hormis", "hors", "hou", "houp", "hue", "hui", "huit", "huitième", "hum",
-        "hurrah", "i", "il", "ils", "importe", "j", "je", "jusqu", "jusque", "k", "l", "la",
-        "là", "laquelle", "las", "le", "lequel", "les", "lès", "lesquelles", "lesquels", "leur",
-        "leurs", "longtemps", "lorsque", "lui", "lui-même", "m", "ma", "maint", "mais", "malgré",
-        "me", "même", "mêmes", "merci", "mes", "mien", "mienne", "miennes", "miens", "mille",
-        "mince", "moi", "moi-même", "moins", "mon", "moyennant", "n", "na", "ne", "néanmoins",
-        "neuf", "neuvième", "ni", "nombreuses", "nombreux", "non", "nos", "notre", "nôtre",
-        "nôtres", "nous", "nous-mêmes", "nul", "o", "où", "ô", "oh", "ohé", "olé", "ollé", "on",
-        "ont", "onze", "onzième", "ore", "ou", "où", "ouf", "ouias", "oust", "ouste", "outre",
-        "p", "paf", "pan", "par", "parmi", "partant", "particulier", "particulière", "particulièrement",
-        "pas", "passé", "pendant", "personne", "peu", "peut", "peuvent", "peux", "pff", "pfft", "pfut",
-        "pif", "plein", "plouf", "plus", "plusieurs", "plutôt", "pouah", "pour", "pourquoi", "premier",
-        "première", "premièrement", "près", "proche", "psitt", "puisque", "q", "qu", "quand", "quant",
-        "quanta", "quant-à-soi", "quarante", "quatorze", "quatre", "quatre-vingt", "quatrième",
-        "quatrièmement", "que", "quel", "quelconque", "quelle", "quelles", "quelque", "quelques",
-        "quelqu'un", "quels", "qui", "quiconque", "quinze", "quoi", "quoique", "r", "revoici", "revoilà",
-        "rien", "s", "sa", "sacrebleu", "sans", "sapristi", "sauf", "se", "seize", "selon", "sept",
-        "septième", "sera", "seront", "ses", "si", "sien", "sienne", "siennes", "siens", "sinon", "six",
-        "sixième", "soi", "soi-même", "soit", "soixante", "son", "sont", "sous", "stop", "suis", "suivant",
-        "sur", "surtout", "t", "ta", "tac", "tant", "te", "té", "tel", "telle", "tellement", "telles", "tels",
-        "tenant", "tes", "tic", "tien", "tienne", "tiennes", "tiens", "toc", "toi", "toi-même", "ton",
-        "touchant", "toujours", "tous", "tout", "toute", "toutes", "treize", "trente", "très", "trois",
-        "troisième", "troisièmement", "trop", "tsoin", "tsouin", "tu", "u", "un", "une", "unes", "uns", "v",
-        "va", "vais", "vas", "vé", "vers", "via", "vif", "vifs", "vingt", "vivat", "vive", "vives", "vlan",
-        "voici", "voilà", "vont", "vos", "votre", "vôtre", "vôtres", "vous", "vous-mêmes", "vu", "w", "x",
-        "y", "z", "zut", "alors", "aucuns", "bon", "devrait", "dos", "droite", "début", "essai", "faites",
-        "fois", "force", "haut", "ici", "juste", "maintenant", "mine", "mot", "nommés", "nouveaux", "parce",
-        "parole", "personnes", "pièce", "plupart", "seulement", "soyez", "sujet", "tandis", "valeur", "voie",
-        "voient", "état", "étions"
-    ]
-    liste_mots_vides = [retirer_accents(mot) for mot in liste_mots_vides_avec_accents]
-    # Suppression de la ponctuation
-    question = question.replace("'", " ").replace("-", " ").lower()
-    punctuation = string.punctuation  # Suppression de la ponctuation
-    question_sans_ponctuation = ''.join(char for char in question if char not in punctuation)
+    return TOKENISEUR_QUESTION.tokeniser(question)
 
-    mots = question_sans_ponctuation.split()  # Division en mots
-    mots_sans_accents = [retirer_accents(mot) for mot in mots]  # Suppression des accents
-    mots_filtres = [mot for mot in mots_sans_accents if mot not in liste_mots_vides]  # Filtrage des mots vides
 
-    return mots_filtres
 
+def extraire_expressions(question):
+    """
+    Extrait les expressions entre guillemets d'une question : "changement climatique" pour l'expression exacte,
+    "europe solidarite"~5 pour des mots distants d'au plus 5 mots, dans n'importe quel ordre.
+    Paramètres:
+    question (str): Question posée.
+    Retourne:
+    list: Couples (tuple des mots normalisés comme les discours, fenêtre ou None pour l'expression exacte).
+    """
+    expressions = []
+    for correspondance in MOTIF_EXPRESSION.finditer(question):
+        mots = tuple(normaliser_texte(correspondance.group(1)).split())
+        if mots:
+            fenetre = int(correspondance.group(2)) if correspondance.group(2) else None
+            expressions.append((mots, fenetre))
+    return expressions
 
 
+@INSTRUMENTATION.etape('documents_expressions')
+def documents_expressions(index_positions, expressions):
+    """
+    Trouve les documents qui contiennent toutes les expressions d'une question.
+    Paramètres:
+    index_positions (IndexPositionnel): Index positionnel du corpus.
+    expressions (list): Expressions de la question (voir extraire_expressions).
+    Retourne:
+    set: Identifiants des documents qui contiennent chacune des expressions.
+    """
+    documents = None
+    for mots, fenetre in expressions:
+        trouves = set(index_positions.occurrences_expression(list(mots), fenetre))
+        documents = trouves if documents is None else documents & trouves
+    return documents if documents is not None else set()
+
+
+def contient_expression(mots_texte, mots, fenetre=None):
+    """
+    Vérifie qu'une suite de mots contient une expression exacte, ou des mots proches les uns des autres.
+    Paramètres:
+    mots_texte (list): Mots du texte, normalisés comme les discours.
+    mots (tuple): Mots de l'expression.
+    fenetre (int): Distance maximale entre le premier mot et chacun des autres, None pour l'expression exacte.
+    Retourne:
+    bool: True si le texte contient l'expression.
+    """
+    if fenetre is None:
+        return any(tuple(mots_texte[i:i + len(mots)]) == mots for i in range(len(mots_texte) - len(mots) + 1))
+    for i, mot in enumerate(mots_texte):
+        if mot == mots[0]:
+            voisins = mots_texte[max(0, i - fenetre):i + fenetre + 1]
+            if all(autre in voisins for autre in mots[1:]):
+                return True
+    return False
+
+
+@INSTRUMENTATION.etape('trouver_mots_dans_corpus')
 def trouver_mots_dans_corpus(mots_question, tf_idf_matrice):
     """
      Identifie les mots de la question présents dans le corpus.
      Paramètres:
      mots_question (list): Liste des mots de la question.
-     tf_idf_matrice (dict): Matrice TF-IDF des documents.
+     tf_idf_matrice (MatriceTfIdf): Matrice TF-IDF des documents.
      Retourne:
      list: Liste des mots de la question présents dans le corpus.
      """
-    mots_du_corpus = set(tf_idf_matrice.keys())  # Récupération des mots du corpus.
-    mots_trouves = [mot for mot in mots_question if mot in mots_du_corpus]  # Intersection des mots.
+    mots_trouves = [mot for mot in mots_question if mot in tf_idf_matrice]  # Intersection avec le vocabulaire du corpus.
 
     return mots_trouves
 
 
-def calculer_tf_idf_question(question, tf_idf_matrice):
+def completer_mot(tf_idf_matrice, prefixe, k=10):
     """
-    Calcule le vecteur TF-IDF pour une question donnée.
+    Propose les mots du corpus qui complètent le dernier mot d'un début de question (autocomplétion).
     Paramètres:
-    question (str): Question posée.
-    tf_idf_matrice (dict): Matrice TF-IDF des documents.
+    tf_idf_matrice (MatriceTfIdf): Matrice TF-IDF des documents.
+    prefixe (str): Début de la question ; son dernier mot est normalisé comme les discours (minuscules, sans accents).
+    k (int): Nombre de mots proposés.
     Retourne:
-    dict: Vecteur TF-IDF de la question.
+    list: Mots commençant par le dernier mot, des plus répandus (nombre de documents qui les contiennent) aux moins
+    répandus, puis par ordre alphabétique.
     """
-    mots_question = tokeniser_question(question) # Tokenisation de la question et suppression des mots vides et de la ponctuation
+    mots = normaliser_texte(prefixe).split()
+    if not mots or prefixe[-1:].isspace():
+        return []
+    debuts, _ = tf_idf_matrice.transposer()
+    # Les mots d'un même préfixe ont des identifiants consécutifs : seule cette tranche du vocabulaire est examinée.
+    termes = heapq.nsmallest(k, tf_idf_matrice.termes_prefixe(mots[-1]), key=lambda terme: (debuts[terme] - debuts[terme + 1], terme))
+    return [tf_idf_matrice.vocabulaire[terme] for terme in termes]
 
 
-    mots_dans_corpus = trouver_mots_dans_corpus(mots_question, tf_idf_matrice)# Filtrage des mots de la question pour ne garder que ceux présents dans le corpus
+@INSTRUMENTATION.etape('corriger_mots')
+def corriger_mots(mots_question, index_trigrammes):
+    """
+    Remplace les mots de la question absents du corpus par le mot du corpus le plus proche (fautes de frappe).
+    Paramètres:
+    mots_question (list): Liste des mots tokenisés et filtrés de la question.
+    index_trigrammes (IndexTrigrammes): Index des trigrammes du vocabulaire (None pour ne rien corriger).
+    Retourne:
+    tuple: Mots de la question corrigés, et dictionnaire associant chaque mot corrigé à sa correction.
+    """
+    if index_trigrammes is None:
+        return mots_question, {}
+    corrections = {}
+    for mot in dict.fromkeys(mots_question):    # Mots distincts, dans l'ordre de la question.
+        if mot not in index_trigrammes.matrice:
+            correction = index_trigrammes.corriger(mot)
+            if correction is not None:
+                corrections[mot] = correction
+    return [corrections.get(mot, mot) for mot in mots_question], corrections
+
+
+@INSTRUMENTATION.etape('calculer_tf_idf_question')
+def calculer_tf_idf_question(question, tf_idf_matrice, mots_question=None):
+    """
+    Calcule le vecteur TF-IDF creux d'une question : seuls les mots de la question présents dans le corpus y figurent,
+    la taille du vecteur dépend donc de la longueur de la question et non du vocabulaire du corpus.
+    Paramètres:
+    question (str): Question posée.
+    tf_idf_matrice (MatriceTfIdf): Matrice TF-IDF des documents.
+    mots_question (list): Mots de la question déjà tokenisés (et éventuellement corrigés, voir corriger_mots), facultatif.
+    Retourne:
+    dict: Vecteur TF-IDF de la question, associant à chaque mot de la question présent dans le corpus son score TF-IDF,
+    dans l'ordre d'apparition des mots.
+    """
+    if mots_question is None:
+        mots_question = tokeniser_question(question) # Tokenisation de la question et suppression des mots vides et de la ponctuation
 
+    mots_dans_corpus = trouver_mots_dans_corpus(mots_question, tf_idf_matrice)# Filtrage des mots de la question pour ne garder que ceux présents dans le corpus
 
     tf_question = calculer_tf(' '.join(mots_dans_corpus))# Calcul de la fréquence des termes (TF) pour la question
 
-
-    tf_idf_question = {mot: 0 for mot in tf_idf_matrice.keys()}# Initialisation du vecteur TF-IDF de la question avec des scores TF-IDF pour chaque mot du corpus
-
-    # Calcul des scores TF-IDF pour chaque mot de la question en utilisant les scores IDF du corpus
-    for mot in mots_dans_corpus:
-        if mot in tf_idf_matrice:
-            idf_score = sum(tf_idf_matrice[mot]) / len(tf_idf_matrice[mot])# Moyenne des scores IDF pour le mot dans le corpus, car chaque mot a un score TF-IDF par document, nécessitant une synthèse en une seule valeur représentative pour l'ensemble du corpus
-
-            tf_idf_question[mot] = tf_question[mot] * idf_score# Multiplication du score TF du mot dans la question par son score IDF moyen dans le corpus
-
-    return tf_idf_question
+    # Score TF du mot dans la question multiplié par le score IDF du mot dans le corpus (voir calculer_idf)
+    return {mot: tf * tf_idf_matrice.idf[tf_idf_matrice.id_terme(mot)] for mot, tf in tf_question.items()}
 
 
 def calculer_produit_scalaire(vecteur_a, vecteur_b):
@@ -539,14 +979,17 @@ def calculer_similarite_cosinus(vecteur_a, vecteur_b):
         return 0  # Retourne 0 si l'une des normes est nulle
 
 
-def trouver_document_pertinent(tf_idf_corpus, tf_idf_question, files_names, mots_question):
+@INSTRUMENTATION.etape('trouver_document_pertinent')
+def trouver_document_pertinent(index_inverse, tf_idf_question, mots_question, documents_autorises=None):
     """
     Trouve le document le plus pertinent basé sur la similarité cosinus et le nombre de mots correspondants.
+    Seuls les documents présents dans les postings des mots de la question sont évalués.
     Paramètres:
-    tf_idf_corpus (dict): Matrice TF-IDF du corpus.
-    tf_idf_question (dict): Vecteur TF-IDF de la question.
-    files_names (list): Liste des noms de fichiers dans le corpus.
+    index_inverse (IndexInverse): Index inversé du corpus.
+    tf_idf_question (dict): Vecteur TF-IDF creux de la question (voir calculer_tf_idf_question).
     mots_question (list): Liste des mots tokenisés et filtrés de la question.
+    documents_autorises (set): Identifiants des seuls documents à considérer, par exemple ceux qui contiennent les
+    expressions entre guillemets de la question (voir documents_expressions), facultatif.
     Retourne:
     str: Nom du fichier le plus pertinent. Retourne un message si aucun document pertinent n'est trouvé.
     """
@@ -554,26 +997,91 @@ def trouver_document_pertinent(tf_idf_corpus, tf_idf_question, files_names, mots
     document_pertinent = None  # Initialiser le document pertinent à None
     max_mot_correspondants = 0  # Nombre maximal de mots correspondants
 
-    vecteur_question = [tf_idf_question.get(mot, 0) for mot in tf_idf_corpus]  # Créer le vecteur TF-IDF pour la question
+    mots_distincts = set(mots_question)
+    vecteur_question = {mot: tf_idf_question.get(mot, 0) for mot in mots_distincts}  # Vecteur de la question restreint à ses propres mots
+    similarites = index_inverse.scores_cosinus(vecteur_question)  # Similarité cosinus des seuls documents candidats
+
+    nb_mots_correspondants = {}  # Nombre de mots de la question présents dans chaque document
+    for mot, repetitions in Counter(mots_question).items():  # Un mot répété dans la question compte autant de fois
+        for doc in index_inverse.documents_mot(mot):
+            nb_mots_correspondants[doc] = nb_mots_correspondants.get(doc, 0) + repetitions
+
+    for doc in sorted(nb_mots_correspondants):  # Parcourir les documents candidats dans l'ordre du corpus
+        if documents_autorises is not None and doc not in documents_autorises:
+            continue
+        similarite = similarites.get(doc, 0)
+        # Vérifier si le nombre de mots correspondants est supérieur ou égal et si la similarité est plus élevée
+        if nb_mots_correspondants[doc] > max_mot_correspondants or (nb_mots_correspondants[doc] == max_mot_correspondants and similarite > meilleur_score):
+            max_mot_correspondants = nb_mots_correspondants[doc]
+            meilleur_score = similarite
+            document_pertinent = index_inverse.documents[doc]  # Mettre à jour le document pertinent
 
-    for index, nom_fichier in enumerate(files_names):  # Parcourir chaque fichier
-        with open(os.path.join("./cleaned", nom_fichier), 'r') as file:
-            contenu = file.read()  # Lire le contenu du fichier
-            nb_mots_correspondants = sum(mot in contenu for mot in mots_question)  # Compter le nombre de mots de la question présents
+    if document_pertinent is None:# Gérer le cas où aucun document pertinent n'est trouvé
+        return MESSAGE_AUCUN_DOCUMENT
+    else:
+        return document_pertinent  # Retourner le nom du document pertinent
 
-            vecteur_document = [tf_idf_corpus[mot][index] if index < len(tf_idf_corpus[mot]) else 0 for mot in tf_idf_corpus]  # Créer le vecteur TF-IDF pour le document
-            similarite = calculer_similarite_cosinus(vecteur_question, vecteur_document)  # Calculer la similarité cosinus
 
-            # Vérifier si le nombre de mots correspondants est supérieur ou égal et si la similarité est plus élevée
-            if nb_mots_correspondants > max_mot_correspondants or (nb_mots_correspondants == max_mot_correspondants and similarite > meilleur_score):
-                max_mot_correspondants = nb_mots_correspondants
-                meilleur_score = similarite
-                document_pertinent = nom_fichier  # Mettre à jour le document pertinent
+@INSTRUMENTATION.etape('trouver_document_bm25')
+def trouver_document_bm25(bm25, tf_idf_question, documents_autorises=None):
+    """
+    Trouve le document de meilleur score BM25 pour les mots d'une question (voir bm25.ScoreurBM25).
+    Paramètres:
+    bm25 (ScoreurBM25): Impacts BM25 du corpus.
+    tf_idf_question (dict): Vecteur TF-IDF creux de la question (voir calculer_tf_idf_question).
+    documents_autorises (set): Identifiants des seuls documents à considérer, facultatif.
+    Retourne:
+    str: Nom du fichier le plus pertinent. Retourne un message si aucun document ne contient un mot de la question.
+    """
+    meilleurs = bm25.meilleurs_documents(tf_idf_question, 1, documents_autorises)
+    if not meilleurs:
+        return MESSAGE_AUCUN_DOCUMENT
+    return bm25.matrice.documents[meilleurs[0][0]]
 
-    if document_pertinent is None:# Gérer le cas où aucun document pertinent n'est trouvé
-        return "Aucun document pertinent trouvé pour la question posée."
+
+@INSTRUMENTATION.etape('rechercher_documents', question=True)
+def rechercher_documents(index_inverse, question, k=5, elagage=False, scoreur=None, index_positions=None, index_trigrammes=None,
+                         bm25=None):
+    """
+    Recherche les k documents les plus similaires à une question.
+    Paramètres:
+    index_inverse (IndexInverse): Index inversé du corpus.
+    question (str): Question posée.
+    k (int): Nombre de documents à retourner.
+    elagage (bool): Active l'arrêt anticipé MaxScore, utile sur un grand corpus (voir IndexInverse.meilleurs_documents),
+    ou sur les postings triés par impact en classement BM25 (voir ScoreurBM25.meilleurs_documents).
+    scoreur (ScoreurNumpy): Calcul vectorisé des similarités avec NumPy, utilisé à la place de l'index inversé s'il est fourni.
+    index_positions (IndexPositionnel): Index positionnel, pour ne garder que les documents contenant les expressions
+    entre guillemets de la question (voir extraire_expressions), facultatif.
+    index_trigrammes (IndexTrigrammes): Index des trigrammes du vocabulaire, pour corriger les fautes de frappe (voir corriger_mots), facultatif.
+    bm25 (ScoreurBM25): Impacts BM25 du corpus : s'ils sont fournis, les documents sont classés par score BM25 au lieu
+    de la similarité cosinus.
+    Retourne:
+    list: Triplets (nom du fichier, similarité cosinus ou score BM25, mots de la question présents dans le document),
+    du plus au moins pertinent.
+    """
+    mots_corriges, _ = corriger_mots(tokeniser_question(question), index_trigrammes)
+    mots_question = list(dict.fromkeys(mots_corriges))  # Mots distincts de la question, dans leur ordre d'apparition
+    vecteur_question = calculer_tf_idf_question(question, index_inverse.matrice, mots_corriges)  # Vecteur creux, limité aux mots de la question
+    expressions = extraire_expressions(question) if index_positions is not None else []
+
+    if bm25 is not None:
+        autorises = documents_expressions(index_positions, expressions) if expressions else None
+        meilleurs = bm25.meilleurs_documents(vecteur_question, k, autorises, elagage)
+    elif expressions:
+        autorises = documents_expressions(index_positions, expressions)
+        scores = index_inverse.scores_cosinus(vecteur_question)
+        meilleurs = heapq.nsmallest(k, ((doc, score) for doc, score in scores.items() if doc in autorises and score > 0),
+                                    key=lambda element: (-element[1], element[0]))
+    elif scoreur is not None:
+        meilleurs = scoreur.meilleurs_documents(vecteur_question, k)
     else:
-        return document_pertinent  # Retourner le nom du document pertinent
+        meilleurs = index_inverse.meilleurs_documents(vecteur_question, k, elagage)
+    resultats = []
+    for doc, score in meilleurs:
+        mots_correspondants = [mot for mot in mots_question if index_inverse.contient(mot, doc)]
+        resultats.append((index_inverse.documents[doc], score, mots_correspondants))
+    return resultats
 
 
 def convertir_chemin_cleaned_vers_speeches(nom_fichier_cleaned):
@@ -590,9 +1098,9 @@ def trouver_mot_important(tf_idf_question):
     """
     Identifie le mot avec le score TF-IDF le plus élevé dans la question.
     Paramètres:
-    tf_idf_question (dict): Vecteur TF-IDF de la question.
+    tf_idf_question (dict): Vecteur TF-IDF creux de la question (voir calculer_tf_idf_question).
     Retourne:
-    str: Mot ayant le score TF-IDF le plus élevé. Retourne None si aucun mot n'est trouvé.
+    str: Mot ayant le score TF-IDF le plus élevé, le premier de la question en cas d'égalité. Retourne None si aucun mot n'a un score positif.
     """
     mot_important = None
     score_max = 0
@@ -605,6 +1113,7 @@ def trouver_mot_important(tf_idf_question):
 
 
 
+@INSTRUMENTATION.etape('extraire_phrase_avec_mot')
 def extraire_phrase_avec_mot(document_path, mot_important):
     """
     Extrait la première phrase contenant le mot important d'un document.
@@ -630,6 +1139,64 @@ def extraire_phrase_avec_mot(document_path, mot_important):
     except FileNotFoundError:
         return "Le fichier spécifié est introuvable."
 
+@INSTRUMENTATION.etape('extraire_phrase_pertinente')
+def extraire_phrase_pertinente(index_passages, nom_document, tf_idf_question, mots_question, expressions=None):
+    """
+    Extrait du document la phrase qui partage le plus de mots importants avec la question, à l'aide de l'index des phrases.
+    Paramètres:
+    index_passages (IndexPassages): Index des phrases du corpus.
+    nom_document (str): Nom du fichier du document pertinent.
+    tf_idf_question (dict): Vecteur TF-IDF de la question.
+    mots_question (list): Liste des mots tokenisés et filtrés de la question.
+    expressions (list): Expressions entre guillemets de la question (voir extraire_expressions) : la meilleure phrase
+    qui les contient toutes est préférée, facultatif.
+    Retourne:
+    str: Phrase la plus pertinente du document. Retourne une phrase d'erreur si aucune phrase ne contient un mot de la question.
+    """
+    doc = index_passages.matrice.ids_documents.get(nom_document)
+    if doc is None:
+        return "Le fichier spécifié est introuvable."
+    vecteur_question = {mot: tf_idf_question.get(mot, 0) for mot in set(mots_question)}
+    meilleures_phrases = index_passages.meilleures_phrases(doc, vecteur_question, k=NB_PHRASES_EXPRESSIONS if expressions else 1)
+    if not meilleures_phrases:
+        return "Le mot important n'a pas été trouvé dans le document."
+    for phrase, _ in meilleures_phrases if expressions else ():
+        texte = index_passages.lire_phrase(phrase)
+        mots_texte = normaliser_texte(texte).split()
+        if all(contient_expression(mots_texte, mots, fenetre) for mots, fenetre in expressions):
+            return texte
+    return index_passages.lire_phrase(meilleures_phrases[0][0])
+
+# Dictionnaire associant les amorces de question à des introductions de réponse
+AMORCES_QUESTION = {
+    "Comment": "Après analyse, ",
+    "Pourquoi": "Il semble que la raison soit : ",
+    "Peux-tu": "Certainement! ",
+    "Qui": "Il semble que cela concerne : ",
+    "Où": "Cela semble se rapporter à : ",
+    "Quand": "Cela semble s'être produit : ",
+    "Quelle": "La réponse à cette question est : ",
+    "Quelles": "Les réponses à cette question sont : ",
+    "Quel": "La réponse à cette question est : ",
+    "Quels": "Les réponses à cette question sont : "
+}
+
+
+def trouver_amorce(question):
+    """
+    Trouve l'amorce de la question utilisée par formuler_reponse.
+    Paramètres:
+    question (str): La question posée par l'utilisateur.
+    Retourne:
+    str: Première amorce de AMORCES_QUESTION par laquelle commence la question, ou None.
+    """
+    for starter in AMORCES_QUESTION:
+        if question.startswith(starter):# Vérifier si la question commence par une des amorces
+            return starter
+    return None
+
+
+@INSTRUMENTATION.etape('formuler_reponse')
 def formuler_reponse(question, phrase_avec_mot_important):
     """
     Formule une réponse basée sur le début de la question et la phrase contenant le mot important.
@@ -639,30 +1206,193 @@ def formuler_reponse(question, phrase_avec_mot_important):
     Retourne:
     str: Réponse formulée en fonction du début de la question et de la phrase extraite.
     """
-    # Dictionnaire associant les amorces de question à des introductions de réponse
-    question_starters = {
-        "Comment": "Après analyse, ",
-        "Pourquoi": "Il semble que la raison soit : ",
-        "Peux-tu": "Certainement! ",
-        "Qui": "Il semble que cela concerne : ",
-        "Où": "Cela semble se rapporter à : ",
-        "Quand": "Cela semble s'être produit : ",
-        "Quelle": "La réponse à cette question est : ",
-        "Quelles": "Les réponses à cette question sont : ",
-        "Quel": "La réponse à cette question est : ",
-        "Quels": "Les réponses à cette question sont : "
-    }
-
     reponse = phrase_avec_mot_important  # Initialiser la réponse avec la phrase trouvée
     reponse_formulee = ""
-    # Boucle pour associer l'introduction appropriée à la question
-    for starter, replique in question_starters.items():
-
-        if question.startswith(starter):# Vérifier si la question commence par une des amorces
-            reponse_formulee = replique + reponse[0].upper() + reponse[1:]# Mettre une majuscule au début de la réponse extraite
-            break
+    # Associer l'introduction appropriée à la question
+    starter = trouver_amorce(question)
+    if starter is not None:
+        reponse_formulee = AMORCES_QUESTION[starter] + reponse[0].upper() + reponse[1:]# Mettre une majuscule au début de la réponse extraite
 
     if not reponse_formulee:
         reponse_formulee = "Voici ce que j'ai trouvé : " + reponse[0].upper() + reponse[1:]
 
     return reponse_formulee
+
+
+
+def completer_reponse(corpus, question, mots_question, tf_idf_question, nom_document, expressions=None):
+    """
+    Termine le traitement d'une question une fois le document pertinent choisi : mot important, phrase extraite et réponse formulée.
+    Paramètres:
+    corpus (CorpusIndexe): Index du corpus.
+    question (str): Question posée.
+    mots_question (list): Liste des mots tokenisés et filtrés de la question.
+    tf_idf_question (dict): Vecteur TF-IDF de la question.
+    nom_document (str): Nom du fichier le plus pertinent, ou MESSAGE_AUCUN_DOCUMENT.
+    expressions (list): Expressions entre guillemets de la question (voir extraire_expressions), facultatif.
+    Retourne:
+    dict: Question, mots de la question, mots présents dans le corpus, document, mot important, phrase extraite et réponse formulée.
+    """
+    document = None if nom_document == MESSAGE_AUCUN_DOCUMENT else convertir_chemin_cleaned_vers_speeches(nom_document)
+    phrase = extraire_phrase_pertinente(corpus.passages, nom_document, tf_idf_question, mots_question, expressions)
+    return {
+        'question': question,
+        'mots_question': mots_question,
+        'mots_dans_corpus': trouver_mots_dans_corpus(mots_question, corpus.matrice),
+        'document': document,
+        'mot_important': trouver_mot_important(tf_idf_question),
+        'phrase': phrase,
+        'reponse': formuler_reponse(question, phrase),
+    }
+
+
+class CacheReponses:
+    """
+    Cache LRU des réponses du chatbot, borné en nombre d'entrées et éventuellement en durée de vie.
+    La clé est le sac trié des mots filtrés de la question, son amorce (voir trouver_amorce), ses expressions
+    entre guillemets (voir extraire_expressions), le mode de classement des documents et le mot important : deux
+    questions qui ne diffèrent que par l'ordre des mots, les majuscules, les accents, la ponctuation ou les mots vides
+    reçoivent la même réponse, sauf si l'ordre des mots change le mot important (égalité de score TF-IDF, voir
+    trouver_mot_important). Le cache est vidé dès que la version de l'index change (voir CorpusIndexe.version).
+    Il peut être partagé entre threads.
+    """
+
+    CHAMPS = ('document', 'mot_important', 'phrase', 'reponse')    # Parties de la réponse qui ne dépendent que de la clé.
+
+    def __init__(self, taille=1024, duree_vie=None):
+        """
+        Paramètres:
+        taille (int): Nombre maximal de réponses gardées.
+        duree_vie (float): Durée de vie d'une réponse en secondes (None pour ne jamais expirer).
+        """
+        self.taille = taille
+        self.duree_vie = duree_vie
+        self._entrees = OrderedDict()    # Clé -> (date d'enregistrement, parties de la réponse), de la moins à la plus récemment utilisée.
+        self._verrou = threading.Lock()
+        self._version = None
+        self.succes = 0
+        self.echecs = 0
+
+    @staticmethod
+    def cle(question, mots_question, tf_idf_question, classement="cosinus"):
+        """
+        Calcule la clé d'une question.
+        Paramètres:
+        question (str): Question posée.
+        mots_question (list): Liste des mots tokenisés et filtrés de la question.
+        tf_idf_question (dict): Vecteur TF-IDF de la question (voir calculer_tf_idf_question).
+        classement (str): Mode de classement des documents (voir CLASSEMENTS).
+        Retourne:
+        tuple: Mots triés (répétitions comprises), amorce, expressions de la question, mode de classement et mot important.
+        """
+        return (tuple(sorted(mots_question)), trouver_amorce(question), tuple(extraire_expressions(question)), classement,
+                trouver_mot_important(tf_idf_question))
+
+    def _verifier_version(self, corpus):
+        if corpus.version != self._version:
+            self._entrees.clear()
+            self._version = corpus.version
+
+    def obtenir(self, corpus, cle):
+        """
+        Cherche une réponse dans le cache.
+        Paramètres:
+        corpus (CorpusIndexe): Index du corpus utilisé pour répondre.
+        cle (tuple): Clé de la question (voir cle).
+        Retourne:
+        dict: Parties de la réponse (voir CHAMPS), ou None si elle est absente ou expirée.
+        """
+        with self._verrou:
+            self._verifier_version(corpus)
+            entree = self._entrees.get(cle)
+            if entree is not None and self.duree_vie is not None and time.monotonic() - entree[0] > self.duree_vie:
+                del self._entrees[cle]
+                entree = None
+            if entree is None:
+                self.echecs += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self.succes += 1
+            return entree[1]
+
+    def enregistrer(self, corpus, cle, reponse):
+        """
+        Ajoute une réponse au cache, en retirant la moins récemment utilisée si le cache est plein.
+        Paramètres:
+        corpus (CorpusIndexe): Index du corpus utilisé pour répondre.
+        cle (tuple): Clé de la question (voir cle).
+        reponse (dict): Réponse complète (voir completer_reponse).
+        Ne retourne rien car le cache est modifié directement.
+        """
+        if self.taille <= 0:
+            return
+        with self._verrou:
+            self._verifier_version(corpus)
+            self._entrees[cle] = (time.monotonic(), {champ: reponse[champ] for champ in self.CHAMPS})
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille:
+                self._entrees.popitem(last=False)
+
+    def statistiques(self):
+        """
+        Retourne le nombre d'entrées, de succès et d'échecs du cache et son taux de succès.
+        """
+        with self._verrou:
+            total = self.succes + self.echecs
+            return {'entrees': len(self._entrees), 'succes': self.succes, 'echecs': self.echecs,
+                    'taux_succes': self.succes / total if total else 0.0}
+
+
+def reponse_depuis_cache(corpus, question, mots_question, en_cache):
+    """
+    Reconstitue la réponse complète d'une question à partir des parties gardées dans le cache.
+    Retourne:
+    dict: Détail de la réponse (voir completer_reponse).
+    """
+    return {'question': question, 'mots_question': mots_question,
+            'mots_dans_corpus': trouver_mots_dans_corpus(mots_question, corpus.matrice), **en_cache}
+
+
+def verifier_classement(classement):
+    """
+    Vérifie qu'un mode de classement des documents fait partie de CLASSEMENTS, plutôt que de classer silencieusement
+    par similarité cosinus.
+    Lève ValueError si le mode est inconnu.
+    """
+    if classement not in CLASSEMENTS:
+        raise ValueError(f"Classement inconnu : {classement!r}, classements disponibles : {', '.join(CLASSEMENTS)}.")
+
+
+@INSTRUMENTATION.etape('repondre_question', question=True)
+def repondre_question(corpus, question, cache=None, classement="cosinus"):
+    """
+    Répond à une question comme le mode Chatbot, sans rien afficher.
+    Les mots absents du corpus sont corrigés s'ils sont proches d'un mot du corpus (voir corriger_mots), et les expressions
+    entre guillemets de la question (voir extraire_expressions) limitent la recherche aux documents qui les contiennent.
+    Paramètres:
+    corpus (CorpusIndexe): Index du corpus.
+    question (str): Question posée.
+    cache (CacheReponses): Cache des réponses, facultatif.
+    classement (str): Mode de classement des documents : "cosinus" (voir trouver_document_pertinent) ou "bm25" (voir trouver_document_bm25).
+    Retourne:
+    dict: Détail de la réponse (voir completer_reponse), avec les corrections appliquées aux mots de la question.
+    Lève ValueError si le mode de classement est inconnu.
+    """
+    verifier_classement(classement)
+    mots_question, corrections = corriger_mots(tokeniser_question(question), corpus.trigrammes)  # Tokenisation et correction des fautes de frappe.
+    tf_idf_question = calculer_tf_idf_question(question, corpus.matrice, mots_question)  # Calcul du vecteur TF-IDF pour la question.
+    if cache is not None:
+        cle = cache.cle(question, mots_question, tf_idf_question, classement)
+        en_cache = cache.obtenir(corpus, cle)
+        if en_cache is not None:
+            return {**reponse_depuis_cache(corpus, question, mots_question, en_cache), 'corrections': corrections}
+    expressions = extraire_expressions(question)
+    documents_autorises = documents_expressions(corpus.positions, expressions) if expressions else None
+    if classement == "bm25":
+        nom_document = trouver_document_bm25(corpus.bm25, tf_idf_question, documents_autorises)
+    else:
+        nom_document = trouver_document_pertinent(corpus.index_inverse, tf_idf_question, mots_question, documents_autorises)
+    reponse = completer_reponse(corpus, question, mots_question, tf_idf_question, nom_document, expressions)
+    if cache is not None:
+        cache.enregistrer(corpus, cle, reponse)
+    return {**reponse, 'corrections': corrections}
@@ -0,0 +1,412 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient la matrice TF-IDF du corpus et l'index inversé utilisé par le chatbot
+# pour retrouver les documents pertinents sans parcourir tout le vocabulaire du corpus.
+import json
+import math
+import hashlib
+import heapq
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from vocabulaire import VocabulaireCompact
+from postings import PostingsCompresses
+
+
+class MatriceTfIdf:
+    """
+    Matrice TF-IDF creuse du corpus, stockée ligne par ligne (format CSR).
+    Chaque document a un identifiant stable (sa position dans la liste des documents) et chaque mot
+    un identifiant de terme (son rang dans le vocabulaire trié, voir VocabulaireCompact). La ligne d'un document est la tranche
+    [indptr[doc], indptr[doc + 1]) des tableaux indices (identifiants de termes), poids (scores TF-IDF)
+    et comptes (nombre d'occurrences du mot dans le document).
+    """
+
+    def __init__(self, documents, vocabulaire, idf, indptr, indices, poids, comptes, transposee=None, comptes_colonnes=None):
+        """
+        Les tableaux peuvent être des array ou des memoryview sur un fichier d'index projeté en mémoire.
+        Paramètres:
+        documents (list): Noms des fichiers, dans l'ordre des identifiants de documents.
+        vocabulaire (VocabulaireCompact): Mots du corpus, dans l'ordre des identifiants de termes (une liste triée est codée).
+        idf (array): Score IDF de chaque terme.
+        indptr (array): Début de la ligne de chaque document dans indices et poids, suivi de la fin de la dernière ligne.
+        indices (array): Identifiants des termes présents dans chaque ligne.
+        poids (array): Scores TF-IDF correspondants.
+        comptes (array): Nombre d'occurrences correspondants (TF).
+        transposee (tuple): Postings par terme déjà calculés (voir transposer), facultatif.
+        comptes_colonnes (array): Nombres d'occurrences dans l'ordre des postings déjà calculés (voir comptes_transposes), facultatif.
+        """
+        self.documents = list(documents)
+        if not isinstance(vocabulaire, VocabulaireCompact):
+            vocabulaire = VocabulaireCompact.depuis_mots(vocabulaire)
+        self.vocabulaire = vocabulaire
+        self.ids_documents = {nom: doc for doc, nom in enumerate(self.documents)}
+        self.idf = idf
+        self.indptr = indptr
+        self.indices = indices
+        self.poids = poids
+        self.comptes = comptes
+        self._transposee = transposee    # Postings par terme, calculés à la première demande s'ils ne sont pas fournis.
+        self._comptes_colonnes = comptes_colonnes
+
+    @classmethod
+    def depuis_comptages(cls, documents, comptages, idf_scores):
+        """
+        Construit la matrice à partir des fréquences des termes de chaque document.
+        Paramètres:
+        documents (list): Noms des fichiers.
+        comptages (list): Dictionnaire des fréquences des termes (voir calculer_tf) de chaque document, dans le même ordre.
+        idf_scores (dict): Scores IDF de chaque mot.
+        Retourne:
+        MatriceTfIdf: Matrice TF-IDF du corpus.
+        """
+        vocabulaire = sorted(idf_scores)    # Vocabulaire trié pour des identifiants de termes stables.
+        ids_termes = {mot: terme for terme, mot in enumerate(vocabulaire)}
+        indptr, indices, poids, comptes = array('q', [0]), array('i'), array('d'), array('i')
+        for tf_scores in comptages:
+            for terme, mot in sorted((ids_termes[mot], mot) for mot in tf_scores):
+                indices.append(terme)
+                poids.append(tf_scores[mot] * idf_scores[mot])    # Calcul du score TF-IDF.
+                comptes.append(tf_scores[mot])
+            indptr.append(len(indices))
+        idf = array('d', (idf_scores[mot] for mot in vocabulaire))
+        return cls(documents, vocabulaire, idf, indptr, indices, poids, comptes)
+
+    def __contains__(self, mot):
+        return mot in self.vocabulaire
+
+    def __len__(self):
+        return len(self.vocabulaire)
+
+    @property
+    def nb_documents(self):
+        return len(self.documents)
+
+    def id_terme(self, mot):
+        """
+        Retourne l'identifiant de terme d'un mot, ou None s'il est absent du corpus.
+        """
+        return self.vocabulaire.id_terme(mot)
+
+    def mots(self):
+        """
+        Retourne les mots du corpus (VocabulaireCompact, qui se comporte comme une liste).
+        """
+        return self.vocabulaire
+
+    def termes_prefixe(self, prefixe):
+        """
+        Retourne les identifiants des termes qui commencent par un préfixe (voir VocabulaireCompact.prefixe).
+        """
+        return self.vocabulaire.prefixe(prefixe)
+
+    def ligne(self, doc):
+        """
+        Parcourt la ligne d'un document.
+        Paramètres:
+        doc (int): Identifiant du document.
+        Retourne:
+        generator: Couples (identifiant du terme, score TF-IDF) des mots présents dans le document.
+        """
+        for i in range(self.indptr[doc], self.indptr[doc + 1]):
+            yield self.indices[i], self.poids[i]
+
+    def comptage(self, doc):
+        """
+        Retourne les fréquences des termes d'un document, sous la même forme que calculer_tf.
+        Paramètres:
+        doc (int): Identifiant du document.
+        Retourne:
+        dict: Dictionnaire associant chaque mot du document à son nombre d'occurrences.
+        """
+        return {self.vocabulaire[self.indices[i]]: self.comptes[i] for i in range(self.indptr[doc], self.indptr[doc + 1])}
+
+    def norme_ligne(self, doc):
+        """
+        Calcule la norme du vecteur TF-IDF d'un document.
+        """
+        return math.sqrt(sum(self.poids[i] ** 2 for i in range(self.indptr[doc], self.indptr[doc + 1])))
+
+    def transposer(self):
+        """
+        Calcule (une seule fois) les postings de chaque terme en transposant la matrice ; un index chargé les lit dans le fichier.
+        Les scores ne sont pas transposés : ils se retrouvent dans la ligne du document (voir colonne) ou, pour l'index
+        inversé, se recalculent depuis les postings compressés (voir postings.PostingsCompresses).
+        Retourne:
+        tuple: Tableaux (debuts, docs) où les documents contenant le terme t sont la tranche [debuts[t], debuts[t + 1]) de docs.
+        """
+        if self._transposee is None:
+            debuts = array('q', [0] * (len(self.vocabulaire) + 1))
+            for terme in self.indices:    # Comptage des postings de chaque terme.
+                debuts[terme + 1] += 1
+            for terme in range(len(self.vocabulaire)):
+                debuts[terme + 1] += debuts[terme]
+            positions = array('q', debuts[:-1])    # Prochaine case libre de chaque terme.
+            docs = array('i', [0] * len(self.indices))
+            for doc in range(self.nb_documents):    # Les lignes sont parcourues dans l'ordre, les postings sont donc triés par document.
+                for i in range(self.indptr[doc], self.indptr[doc + 1]):
+                    docs[positions[self.indices[i]]] = doc
+                    positions[self.indices[i]] += 1
+            self._transposee = (debuts, docs)
+        return self._transposee
+
+    def comptes_transposes(self):
+        """
+        Calcule (une seule fois) le nombre d'occurrences de chaque posting, dans l'ordre des postings de la matrice transposée.
+        Il sert aux postings compressés, aux impacts BM25 et aux tables d'analyse ; un index chargé le lit dans le fichier.
+        Retourne:
+        array: Nombre d'occurrences du terme t dans le document docs[i], pour chaque posting i de transposer.
+        """
+        if self._comptes_colonnes is None:
+            debuts, docs = self.transposer()
+            comptes = array('i', [0] * len(docs))
+            suivantes = array('q', debuts[:-1])
+            for doc in range(self.nb_documents):    # Même parcours que transposer : mêmes positions.
+                for i in range(self.indptr[doc], self.indptr[doc + 1]):
+                    terme = self.indices[i]
+                    comptes[suivantes[terme]] = self.comptes[i]
+                    suivantes[terme] += 1
+            self._comptes_colonnes = comptes
+        return self._comptes_colonnes
+
+    def score(self, terme, doc):
+        """
+        Retourne le score TF-IDF d'un terme dans un document (0 s'il en est absent), par recherche dichotomique dans la ligne du document.
+        """
+        i = bisect_left(self.indices, terme, self.indptr[doc], self.indptr[doc + 1])    # Les lignes sont triées par terme.
+        return self.poids[i] if i < self.indptr[doc + 1] and self.indices[i] == terme else 0
+
+    def colonne(self, mot):
+        """
+        Retourne les scores TF-IDF d'un mot dans les documents qui le contiennent.
+        Paramètres:
+        mot (str): Mot recherché.
+        Retourne:
+        list: Couples (identifiant du document, score TF-IDF), vide si le mot est absent du corpus.
+        """
+        terme = self.id_terme(mot)
+        if terme is None:
+            return []
+        debuts, docs = self.transposer()
+        return [(docs[i], self.score(terme, docs[i])) for i in range(debuts[terme], debuts[terme + 1])]
+
+    def colonnes(self):
+        """
+        Parcourt les colonnes de la matrice.
+        Retourne:
+        generator: Couples (mot, liste des couples (identifiant du document, score TF-IDF)).
+        """
+        debuts, docs = self.transposer()
+        poids = array('d', [0.0] * len(docs))    # Scores dans l'ordre des postings, le temps du parcours.
+        positions = array('q', debuts[:-1])
+        for doc in range(self.nb_documents):
+            for terme, score in self.ligne(doc):
+                poids[positions[terme]] = score
+                positions[terme] += 1
+        for terme, mot in enumerate(self.vocabulaire):
+            yield mot, [(docs[i], poids[i]) for i in range(debuts[terme], debuts[terme + 1])]
+
+
+class IndexInverse:
+    """
+    Index inversé du corpus : pour chaque mot, la liste des documents qui le contiennent (postings)
+    avec leur score TF-IDF, ainsi que la norme précalculée de chaque document.
+    Les postings sont compressés (voir postings.PostingsCompresses) : le score TF-IDF d'un posting est recalculé
+    comme nombre d'occurrences * IDF du mot.
+    La borne d'un terme est la plus grande contribution possible de ce terme à une similarité cosinus
+    (son plus grand score TF-IDF divisé par la norme du document) : elle permet d'écarter un document
+    sans finir de le noter (voir meilleurs_documents).
+    """
+
+    def __init__(self, matrice, normes=None, bornes=None, postings=None):
+        """
+        Construit l'index à partir de la matrice TF-IDF.
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+        normes (array): Normes des documents déjà calculées (par exemple lues depuis le fichier d'index), facultatif.
+        bornes (array): Bornes des termes déjà calculées, facultatif.
+        postings (PostingsCompresses): Postings compressés déjà calculés, facultatif.
+        """
+        self.matrice = matrice
+        self.documents = matrice.documents
+        self.postings_compresses = postings if postings is not None else PostingsCompresses.depuis_matrice(matrice)
+        if normes is None:
+            normes = array('d', (matrice.norme_ligne(doc) for doc in range(matrice.nb_documents)))
+        self.normes = normes
+        if bornes is None:
+            bornes = array('d', (self.calculer_borne(terme) for terme in range(len(matrice))))
+        self.bornes = bornes
+
+    def calculer_borne(self, terme):
+        """
+        Calcule la borne d'un terme : son plus grand score TF-IDF divisé par la norme du document, 0 s'il n'en a aucun.
+        """
+        debuts, docs = self.matrice.transposer()
+        comptes = self.matrice.comptes_transposes()
+        idf, normes = self.matrice.idf[terme], self.normes
+        debut, fin = debuts[terme], debuts[terme + 1]
+        return max((tf * idf / normes[doc] for doc, tf in zip(docs[debut:fin], comptes[debut:fin]) if normes[doc] > 0), default=0.0)
+
+    def __contains__(self, mot):
+        return mot in self.matrice
+
+    def postings(self, mot):
+        """
+        Parcourt les postings d'un mot.
+        Paramètres:
+        mot (str): Mot recherché.
+        Retourne:
+        generator: Couples (identifiant du document, score TF-IDF), vide si le mot est absent du corpus.
+        """
+        terme = self.matrice.id_terme(mot)
+        if terme is None:
+            return
+        idf = self.matrice.idf[terme]
+        for docs, tfs in self.postings_compresses.blocs(terme):
+            for doc, tf in zip(docs, tfs):
+                yield doc, tf * idf
+
+    def documents_mot(self, mot):
+        """
+        Parcourt les identifiants des documents qui contiennent un mot, sans calculer leurs scores.
+        Retourne:
+        generator: Identifiants des documents, par ordre croissant, vide si le mot est absent du corpus.
+        """
+        terme = self.matrice.id_terme(mot)
+        if terme is None:
+            return
+        for docs, _ in self.postings_compresses.blocs(terme):
+            yield from docs
+
+    def scores_cosinus(self, vecteur_question):
+        """
+        Calcule la similarité cosinus entre la question et chaque document partageant au moins un mot avec elle.
+        Seuls les postings des mots de la question sont parcourus, bloc par bloc.
+        Paramètres:
+        vecteur_question (dict): Scores TF-IDF des mots de la question.
+        Retourne:
+        dict: Dictionnaire associant l'identifiant de chaque document candidat à sa similarité cosinus.
+        """
+        produits = {}    # Produit scalaire accumulé par document.
+        norme_question = 0
+        for mot, poids_question in vecteur_question.items():
+            if poids_question == 0 or mot not in self:
+                continue
+            norme_question += poids_question ** 2
+            terme = self.matrice.id_terme(mot)
+            idf = self.matrice.idf[terme]
+            for docs, tfs in self.postings_compresses.blocs(terme):
+                for doc, tf in zip(docs, tfs):
+                    produits[doc] = produits.get(doc, 0) + poids_question * (tf * idf)
+        norme_question = math.sqrt(norme_question)
+
+        scores = {}
+        for doc, produit in produits.items():
+            if norme_question * self.normes[doc] > 0:    # Vérification pour éviter la division par zéro.
+                scores[doc] = produit / (norme_question * self.normes[doc])
+            else:
+                scores[doc] = 0
+        return scores
+
+    def contient(self, mot, doc):
+        """
+        Indique si un document contient un mot, en ne décodant que le bloc de postings qui peut le contenir.
+        """
+        terme = self.matrice.id_terme(mot)
+        if terme is None:
+            return False
+        return self.postings_compresses.chercher(terme, doc) > 0
+
+    def meilleurs_documents(self, vecteur_question, k=5, elagage=False):
+        """
+        Sélectionne les k documents les plus similaires à la question avec un tas borné.
+        Avec l'élagage, les documents sont parcourus dans l'ordre de leurs identifiants (algorithme MaxScore) :
+        les mots dont la somme des bornes ne suffit pas à dépasser le k-ième meilleur score ne servent plus
+        à proposer des candidats, et un candidat est abandonné dès que ses mots restants ne peuvent plus l'y amener.
+        Le résultat est le même que sans élagage.
+        Paramètres:
+        vecteur_question (dict): Scores TF-IDF des mots de la question.
+        k (int): Nombre de documents à retourner.
+        elagage (bool): Active l'arrêt anticipé MaxScore.
+        Retourne:
+        list: Couples (identifiant du document, similarité cosinus), du plus au moins similaire, à égalité le plus petit identifiant d'abord.
+        """
+        if k <= 0:
+            return []
+        if not elagage:
+            scores = self.scores_cosinus(vecteur_question)
+            return heapq.nlargest(k, scores.items(), key=lambda element: (element[1], -element[0]))
+
+        termes = [(self.matrice.id_terme(mot), poids) for mot, poids in vecteur_question.items() if poids != 0 and mot in self]
+        norme_question = math.sqrt(sum(poids ** 2 for _, poids in termes))
+        listes = []    # Pour chaque mot : [borne, poids normalisé dans la question, curseur sur les postings, IDF].
+        for terme, poids_question in termes:
+            poids_question /= norme_question
+            listes.append([poids_question * self.bornes[terme], poids_question, self.postings_compresses.curseur(terme),
+                           self.matrice.idf[terme]])
+        listes.sort(key=lambda liste: liste[0])    # Bornes croissantes.
+        cumul = list(accumulate(liste[0] for liste in listes))    # cumul[i] : somme des bornes des listes 0 à i.
+
+        tas = []    # Tas des k meilleurs (score, -identifiant), le moins bon en tête.
+        seuil = -1    # Score à dépasser pour entrer dans le tas, une fois celui-ci plein.
+        premiere_essentielle = 0    # Les listes avant celle-ci ne peuvent pas, à elles seules, faire entrer un document.
+        while True:
+            essentielles = listes[premiere_essentielle:]
+            doc = min((liste[2].doc for liste in essentielles if liste[2].doc is not None), default=None)
+            if doc is None:
+                break
+            facteur = 1 / self.normes[doc] if self.normes[doc] > 0 else 0
+            score = 0
+            for liste in essentielles:
+                if liste[2].doc == doc:
+                    score += liste[1] * (liste[2].tf * liste[3]) * facteur
+                    liste[2].suivant()
+            for i in range(premiere_essentielle - 1, -1, -1):    # Listes non essentielles, de la plus grande borne à la plus petite.
+                if score + cumul[i] <= seuil:
+                    break    # Le document ne peut plus entrer dans le tas.
+                liste = listes[i]
+                liste[2].avancer(doc)    # Saut direct au bloc de postings qui peut contenir le document.
+                if liste[2].doc == doc:
+                    score += liste[1] * (liste[2].tf * liste[3]) * facteur
+
+            if len(tas) < k:
+                heapq.heappush(tas, (score, -doc))
+            elif score > seuil:    # À égalité, le document déjà retenu a un plus petit identifiant et reste.
+                heapq.heapreplace(tas, (score, -doc))
+            else:
+                continue
+            if len(tas) == k:
+                seuil = tas[0][0]
+                while premiere_essentielle < len(listes) and cumul[premiere_essentielle] <= seuil:
+                    premiere_essentielle += 1
+        return [(-doc, score) for score, doc in sorted(tas, reverse=True)]
+
+
+class CorpusIndexe:
+    """
+    Ensemble des structures d'index construites sur un même état du corpus, sauvegardées et chargées ensemble.
+    """
+
+    def __init__(self, matrice, index_inverse, passages, sources, metadonnees=None, positions=None, bm25=None):
+        """
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+        index_inverse (IndexInverse): Index inversé construit sur cette matrice.
+        passages (IndexPassages): Index des phrases des discours.
+        sources (dict): Signature des discours indexés (voir persistance.signature_sources).
+        metadonnees (list): Président, prénom et date d'investiture de chaque document (voir function.lire_metadonnees).
+        positions (IndexPositionnel): Positions des mots dans chaque document.
+        bm25 (ScoreurBM25): Impacts BM25 quantifiés des postings de cette matrice (voir bm25.ScoreurBM25).
+        """
+        self.matrice = matrice
+        self.index_inverse = index_inverse
+        self.passages = passages
+        self.sources = sources
+        self.metadonnees = metadonnees
+        self.positions = positions
+        self.bm25 = bm25
+        self.analyses = None    # Tables d'analyse de la Partie I (voir function.construire_analyses), sauvegardées avec l'index.
+        self.trigrammes = None    # Index des trigrammes du vocabulaire (voir trigrammes.IndexTrigrammes), sauvegardé avec l'index.
+        # Empreinte des discours indexés : change dès qu'un discours est ajouté, modifié ou supprimé. Une empreinte de
+        # 128 bits, et non une somme de contrôle de 32 bits, pour qu'une mise à jour ne retombe pas sur la même version.
+        self.version = hashlib.blake2b(json.dumps(sources, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
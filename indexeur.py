@@ -0,0 +1,441 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient l'indexeur incrémental : il permet d'ajouter, de modifier ou de supprimer un discours sans
+# recalculer tout le corpus. Les changements sont gardés à part de l'index de base (projeté depuis le fichier d'index),
+# puis fusionnés avec lui partie par partie : ce qui ne dépend pas des discours retraités est recopié par tranches.
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from operator import mul
+from indexation import MatriceTfIdf, IndexInverse, CorpusIndexe
+from vocabulaire import VocabulaireCompact
+from postings import PostingsCompresses
+from passages import IndexPassages
+from positions import IndexPositionnel
+from bm25 import ScoreurBM25
+from analyses import AnalysesCorpus
+from trigrammes import IndexTrigrammes
+from tableaux import copier, copier_decale, traduire, suites
+
+
+class IndexeurIncremental:
+    """
+    Changements du corpus par rapport à un index de base, qui n'est ni copié ni modifié : fréquences des termes des seuls
+    documents retraités (ajoutés ou modifiés), documents de la base retirés (supprimés, ou modifiés puis retraités) et,
+    pour chaque mot concerné, la variation du nombre de documents qui le contiennent. Ajouter, modifier ou supprimer un
+    document ne touche que les mots de ce document.
+    Les fusions avec la base (voir Fusion) ne sont jamais modifiées une fois retournées. Elles servent à construire le
+    nouvel index complet du corpus (voir charger_ou_construire_index), qui n'est publié qu'une fois terminé, en remplaçant
+    une seule référence (voir Application.recharger et ServeurChatbot.recharger) : une question en cours garde l'index qu'elle a lu.
+    """
+
+    def __init__(self, base):
+        """
+        Paramètres:
+        base (CorpusIndexe): Index de base, en général chargé depuis le fichier d'index, avec ses tables d'analyse et son
+        index des trigrammes.
+        """
+        self._verrou = threading.Lock()
+        self.base = base
+        self._comptages = {}    # Nom du document retraité -> fréquences de ses termes.
+        self._retires = set()    # Noms des documents de la base retirés.
+        self._variations = {}    # Mot -> variation du nombre de documents qui le contiennent (jamais nulle).
+        self.version = 0    # Incrémentée à chaque modification du corpus.
+        self._fusion = None
+        self._version_fusion = None
+
+    @property
+    def documents(self):
+        with self._verrou:
+            return sorted({nom for nom in self.base.matrice.documents if nom not in self._retires} | self._comptages.keys())
+
+    def ajouter_document(self, nom, comptage):
+        """
+        Ajoute un document au corpus, ou remplace ses fréquences s'il y est déjà.
+        Paramètres:
+        nom (str): Nom du fichier.
+        comptage (dict): Fréquences des termes du document (voir calculer_tf).
+        Ne retourne rien car l'indexeur est modifié directement.
+        """
+        with self._verrou:
+            self._retirer(nom)
+            self._comptages[nom] = dict(comptage)
+            self._varier(comptage, 1)
+            self.version += 1
+
+    def mettre_a_jour_document(self, nom, comptage):
+        """
+        Remplace les fréquences des termes d'un document modifié (voir ajouter_document).
+        """
+        self.ajouter_document(nom, comptage)
+
+    def supprimer_document(self, nom):
+        """
+        Retire un document du corpus.
+        Paramètres:
+        nom (str): Nom du fichier.
+        Retourne:
+        bool: True si le document était indexé.
+        """
+        with self._verrou:
+            if not self._retirer(nom):
+                return False
+            self.version += 1
+            return True
+
+    def _retirer(self, nom):
+        comptage = self._comptages.pop(nom, None)
+        if comptage is None:
+            doc = self.base.matrice.ids_documents.get(nom)
+            if doc is None or nom in self._retires:
+                return False
+            self._retires.add(nom)
+            comptage = self.base.matrice.comptage(doc)    # Seule la ligne du document est relue dans la base.
+        self._varier(comptage, -1)
+        return True
+
+    def _varier(self, mots, sens):
+        for mot in mots:    # Seuls les mots du document voient leur nombre de documents changer.
+            variation = self._variations.get(mot, 0) + sens
+            if variation:
+                self._variations[mot] = variation
+            else:
+                del self._variations[mot]
+
+    def idf(self, mot):
+        """
+        Calcule le score IDF actuel d'un mot, comme calculer_idf.
+        Paramètres:
+        mot (str): Mot recherché.
+        Retourne:
+        float: Score IDF du mot, 0 s'il est absent du corpus.
+        """
+        with self._verrou:
+            matrice = self.base.matrice
+            comptage = self._variations.get(mot, 0)
+            terme = matrice.id_terme(mot)
+            if terme is not None:
+                debuts, _ = matrice.transposer()
+                comptage += debuts[terme + 1] - debuts[terme]
+            nb_fichiers = matrice.nb_documents - len(self._retires) + len(self._comptages)
+            return math.log(nb_fichiers / float(comptage)) if comptage > 0 else 0
+
+    def fusion(self):
+        """
+        Retourne la fusion de l'index de base avec les changements actuels (voir Fusion).
+        Elle n'est recalculée que si le corpus a changé depuis la dernière fusion.
+        Retourne:
+        Fusion: Matrice TF-IDF du corpus et correspondance avec la base, qui construit les autres parties de l'index.
+        """
+        with self._verrou:
+            if self._version_fusion != self.version:
+                # Nouvelle fusion, l'ancienne reste valide pour qui la détient.
+                self._fusion = Fusion(self.base, set(self._retires), dict(self._comptages), dict(self._variations))
+                self._version_fusion = self.version
+            return self._fusion
+
+
+class Fusion:
+    """
+    État du corpus après les changements d'un indexeur incrémental, calculé à partir de l'index de base sans le
+    reconstruire. Les documents restent rangés par nom et les termes par ordre alphabétique : chaque tableau est
+    identique à celui d'une reconstruction complète.
+    La correspondance avec la base est calculée une fois, puis sert à chaque partie de l'index (voir corpus) :
+    - docs_base : identifiant dans la base de chaque document, ou -1 pour un document retraité ; docs_nouveaux : l'inverse,
+      -1 pour un document retiré ;
+    - termes_base et termes_nouveaux : la même correspondance pour les termes (-1 pour un mot ajouté ou disparu), None si
+      le vocabulaire n'a pas changé ;
+    - origines : position dans la base de chaque posting de la matrice transposée, -1 pour un document retraité ;
+    - termes_repris : pour chaque terme, le terme de la base dont les postings sont les mêmes (à la numérotation des
+      documents près), -1 si sa liste a changé.
+    Seuls les IDF des mots dont le nombre de documents change sont recalculés, avec les scores TF-IDF, les normes des
+    documents et les bornes des termes qui en dépendent. Quand le nombre de documents change, tous les IDF changent
+    (IDF = log(N / df)) : scores, normes et bornes sont alors recalculés en une passe sur les tableaux.
+    Tous les tableaux sont des copies : la projection du fichier de base peut être libérée avant l'écriture du nouveau fichier.
+    """
+
+    def __init__(self, base, retires, comptages, variations):
+        """
+        Paramètres:
+        base (CorpusIndexe): Index de base.
+        retires (set): Noms des documents de la base retirés (supprimés, ou modifiés puis retraités).
+        comptages (dict): Fréquences des termes de chaque document retraité, par nom.
+        variations (dict): Variation du nombre de documents qui contiennent chaque mot concerné.
+        """
+        self.base = base
+        ancienne = base.matrice
+        self._apparier_documents(ancienne, retires, comptages)
+        self._apparier_termes(ancienne, variations)
+        lignes = {self.ids_documents[nom]: sorted((self.vocabulaire.id_terme(mot), tf) for mot, tf in comptage.items())
+                  for nom, comptage in comptages.items()}    # Lignes des documents retraités : (terme, nombre d'occurrences).
+        self._fusionner_lignes(ancienne, lignes)
+        self._fusionner_colonnes(ancienne, lignes)
+        self._corriger_poids()
+        self.matrice = MatriceTfIdf(self.documents, self.vocabulaire, self.idf, self.indptr, self.indices, self.poids,
+                                    self.comptes, (self.debuts, self.docs), self.comptes_colonnes)
+
+    def _apparier_documents(self, ancienne, retires, comptages):
+        ids_base = ancienne.ids_documents
+        self.documents = sorted({nom for nom in ancienne.documents if nom not in retires} | comptages.keys())
+        self.ids_documents = {nom: doc for doc, nom in enumerate(self.documents)}
+        self.docs_base = array('i', (-1 if nom in comptages else ids_base[nom] for nom in self.documents))
+        self.docs_nouveaux = array('i', [-1]) * ancienne.nb_documents
+        for doc, origine in enumerate(self.docs_base):
+            if origine >= 0:
+                self.docs_nouveaux[origine] = doc
+        self.docs_retires = [origine for origine, doc in enumerate(self.docs_nouveaux) if doc < 0]
+        self.docs_retraites = sorted(self.ids_documents[nom] for nom in comptages)
+        self.docs_renumerotes = any(doc not in (origine, -1) for origine, doc in enumerate(self.docs_nouveaux))
+
+    def _apparier_termes(self, ancienne, variations):
+        debuts_base, _ = ancienne.transposer()
+        frequences = {}    # Mot dont le nombre de documents change -> nouveau nombre de documents.
+        for mot, variation in variations.items():
+            terme = ancienne.id_terme(mot)
+            frequences[mot] = variation + (debuts_base[terme + 1] - debuts_base[terme] if terme is not None else 0)
+        ajoutes = sorted(mot for mot, nombre in frequences.items() if nombre > 0 and mot not in ancienne)
+        disparus = {mot for mot, nombre in frequences.items() if nombre == 0}
+        if not ajoutes and not disparus:
+            self.termes_base = self.termes_nouveaux = None
+            self.vocabulaire = VocabulaireCompact(copier(array('B'), ancienne.vocabulaire.donnees),
+                                                  copier(array('q'), ancienne.vocabulaire.debuts_blocs), len(ancienne))
+            self.frequences = array('q', (debuts_base[terme + 1] - debuts_base[terme] for terme in range(len(ancienne))))
+        else:    # Fusion des mots de la base encore présents et des mots ajoutés, dans l'ordre alphabétique.
+            mots, self.termes_base = [], array('i')
+            suivant = 0    # Prochain mot ajouté.
+            for terme_base, mot in enumerate(ancienne.vocabulaire):
+                while suivant < len(ajoutes) and ajoutes[suivant] < mot:
+                    mots.append(ajoutes[suivant])
+                    self.termes_base.append(-1)
+                    suivant += 1
+                if mot not in disparus:
+                    mots.append(mot)
+                    self.termes_base.append(terme_base)
+            mots.extend(ajoutes[suivant:])
+            self.termes_base.extend([-1] * (len(ajoutes) - suivant))
+            self.vocabulaire = VocabulaireCompact.depuis_mots(mots)
+            self.termes_nouveaux = array('i', [-1]) * len(ancienne)
+            for terme, terme_base in enumerate(self.termes_base):
+                if terme_base >= 0:
+                    self.termes_nouveaux[terme_base] = terme
+            self.frequences = array('q', (debuts_base[terme_base + 1] - debuts_base[terme_base] if terme_base >= 0 else 0
+                                          for terme_base in self.termes_base))
+        self.termes_idf = set()    # Termes dont le nombre de documents, donc l'IDF, change.
+        for mot, nombre in frequences.items():
+            if nombre > 0:
+                terme = self.vocabulaire.id_terme(mot)
+                self.frequences[terme] = nombre
+                self.termes_idf.add(terme)
+
+        nb_fichiers = len(self.documents)
+        self.tous_idf = nb_fichiers != ancienne.nb_documents
+        if self.tous_idf:
+            self.idf = array('d', (math.log(nb_fichiers / float(nombre)) for nombre in self.frequences))
+        else:
+            if self.termes_base is None:
+                self.idf = copier(array('d'), ancienne.idf)
+            else:
+                self.idf = array('d', (ancienne.idf[terme_base] if terme_base >= 0 else 0.0 for terme_base in self.termes_base))
+            for terme in self.termes_idf:
+                self.idf[terme] = math.log(nb_fichiers / float(self.frequences[terme]))
+
+    def terme_base(self, terme):
+        """
+        Retourne l'identifiant dans la base d'un terme, ou -1 pour un mot ajouté.
+        """
+        return terme if self.termes_base is None else self.termes_base[terme]
+
+    def terme_nouveau(self, terme_base):
+        """
+        Retourne l'identifiant d'un terme de la base dans le nouveau vocabulaire, ou -1 pour un mot disparu.
+        """
+        return terme_base if self.termes_nouveaux is None else self.termes_nouveaux[terme_base]
+
+    def _fusionner_lignes(self, ancienne, lignes):
+        """
+        Recopie les lignes des documents inchangés, par suites de documents consécutifs, et ajoute celles des documents retraités.
+        """
+        self.indptr, self.indices, self.comptes, self.poids = array('q', [0]), array('i'), array('i'), array('d')
+        for debut, fin, origine in suites(self.docs_base):
+            if origine < 0:
+                for terme, tf in lignes[debut]:
+                    self.indices.append(terme)
+                    self.comptes.append(tf)
+                    self.poids.append(tf * self.idf[terme])
+                self.indptr.append(len(self.indices))
+                continue
+            premier, dernier = ancienne.indptr[origine], ancienne.indptr[origine + fin - debut]
+            copier_decale(self.indptr, ancienne.indptr[origine + 1:origine + fin - debut + 1], len(self.indices) - premier)
+            traduire(self.indices, self.termes_nouveaux, ancienne.indices[premier:dernier])
+            copier(self.comptes, ancienne.comptes[premier:dernier])
+            copier(self.poids, ancienne.poids[premier:dernier])    # Corrigés ensuite pour les termes dont l'IDF change.
+
+    def _fusionner_colonnes(self, ancienne, lignes):
+        """
+        Recopie les postings des termes qui ne sont dans aucun document retiré ou retraité (en renumérotant les documents),
+        et retire ou insère seulement les postings concernés dans les autres listes.
+        """
+        debuts_base, docs_base = ancienne.transposer()
+        comptes_base = ancienne.comptes_transposes()
+        retraits, ajouts = {}, {}    # Terme -> rangs, dans sa liste de la base, des postings retirés ; postings (doc, tf) ajoutés.
+        for origine in self.docs_retires:
+            for i in range(ancienne.indptr[origine], ancienne.indptr[origine + 1]):
+                terme_base = ancienne.indices[i]
+                terme = self.terme_nouveau(terme_base)
+                if terme >= 0:
+                    debut, fin = debuts_base[terme_base], debuts_base[terme_base + 1]
+                    retraits.setdefault(terme, []).append(bisect_left(docs_base, origine, debut, fin) - debut)
+        for doc in self.docs_retraites:
+            for terme, tf in lignes[doc]:
+                ajouts.setdefault(terme, []).append((doc, tf))
+        self.termes_touches = retraits.keys() | ajouts.keys()
+
+        renumerotation = self.docs_nouveaux if self.docs_renumerotes else None
+        self.debuts = array('q', accumulate(self.frequences, initial=0))
+        self.docs, self.comptes_colonnes, self.origines, self.termes_repris = array('i'), array('i'), array('q'), array('i')
+        for terme in range(len(self.vocabulaire)):
+            terme_base = self.terme_base(terme)
+            debut, fin = (debuts_base[terme_base], debuts_base[terme_base + 1]) if terme_base >= 0 else (0, 0)
+            if terme not in self.termes_touches:
+                traduire(self.docs, renumerotation, docs_base[debut:fin])
+                copier(self.comptes_colonnes, comptes_base[debut:fin])
+                self.origines.extend(range(debut, fin))
+                self.termes_repris.append(terme_base)
+                continue
+            docs = traduire(array('i'), renumerotation, docs_base[debut:fin])
+            comptes = copier(array('i'), comptes_base[debut:fin])
+            origines = array('q', range(debut, fin))
+            for i in sorted(retraits.get(terme, ()), reverse=True):
+                del docs[i], comptes[i], origines[i]
+            for doc, tf in ajouts.get(terme, ()):
+                i = bisect_left(docs, doc)
+                docs.insert(i, doc)
+                comptes.insert(i, tf)
+                origines.insert(i, -1)
+            self.docs.extend(docs)
+            self.comptes_colonnes.extend(comptes)
+            self.origines.extend(origines)
+            self.termes_repris.append(-1)
+
+    def _corriger_poids(self):
+        """
+        Recalcule les scores TF-IDF recopiés de la base dont l'IDF a changé.
+        """
+        if self.tous_idf:
+            self.poids = array('d', map(mul, self.comptes, map(self.idf.__getitem__, self.indices)))
+            return
+        for terme in self.termes_idf:
+            idf = self.idf[terme]
+            for k in range(self.debuts[terme], self.debuts[terme + 1]):
+                if self.origines[k] >= 0:    # Les lignes des documents retraités sont déjà calculées avec le nouvel IDF.
+                    doc = self.docs[k]
+                    i = bisect_left(self.indices, terme, self.indptr[doc], self.indptr[doc + 1])
+                    self.poids[i] = self.comptes[i] * idf
+
+    def termes_identiques(self):
+        """
+        Retourne, pour chaque terme, le terme de la base dont les postings sont exactement les mêmes (documents compris), ou -1.
+        """
+        if not self.docs_renumerotes:
+            return self.termes_repris
+        debuts_base, docs_base = self.base.matrice.transposer()
+        renumerotes = bytes(doc not in (origine, -1) for origine, doc in enumerate(self.docs_nouveaux))
+        return array('i', (terme_base if terme_base >= 0 and not any(map(renumerotes.__getitem__, docs_base[debuts_base[terme_base]:debuts_base[terme_base + 1]]))
+                           else -1 for terme_base in self.termes_repris))
+
+    def index_inverse(self):
+        """
+        Fusionne l'index inversé : postings compressés recopiés pour les listes inchangées ; normes des documents et bornes
+        des termes recalculées seulement là où un score TF-IDF ou une liste a changé.
+        Retourne:
+        IndexInverse: Index inversé de la matrice fusionnée.
+        """
+        ancien, matrice = self.base.index_inverse, self.matrice
+        postings = PostingsCompresses.fusionner(ancien.postings_compresses, matrice, self.termes_identiques())
+        if self.tous_idf:    # Tous les scores ont changé, donc toutes les normes et toutes les bornes.
+            return IndexInverse(matrice, postings=postings)
+        docs_normes = set(self.docs_retraites)    # Documents dont un score TF-IDF a changé.
+        for terme in self.termes_idf:
+            docs_normes.update(self.docs[self.debuts[terme]:self.debuts[terme + 1]])
+        normes = array('d', (ancien.normes[origine] if origine >= 0 else 0.0 for origine in self.docs_base))
+        for doc in docs_normes:
+            normes[doc] = matrice.norme_ligne(doc)
+        if self.termes_base is None:
+            bornes = copier(array('d'), ancien.bornes)
+        else:
+            bornes = array('d', (ancien.bornes[terme_base] if terme_base >= 0 else 0.0 for terme_base in self.termes_base))
+        index = IndexInverse(matrice, normes, bornes, postings)
+        termes_bornes = self.termes_touches | self.termes_idf    # Termes dont un posting, un score ou une norme a changé.
+        for doc in docs_normes:
+            termes_bornes.update(matrice.indices[matrice.indptr[doc]:matrice.indptr[doc + 1]])
+        for terme in termes_bornes:
+            bornes[terme] = index.calculer_borne(terme)
+        return index
+
+    def analyses(self, metadonnees, positions=None):
+        """
+        Fusionne les tables d'analyse : la ligne d'un président dont les discours n'ont pas changé est recopiée ; celle d'un
+        président dont des discours ont changé est corrigée des seuls discours qui l'ont quitté ou rejoint.
+        Paramètres:
+        metadonnees (list): Métadonnées de chaque document de la matrice fusionnée.
+        positions (IndexPositionnel): Index positionnel de la matrice fusionnée, facultatif.
+        Retourne:
+        AnalysesCorpus: Tables d'analyse du corpus.
+        """
+        ancienne, ancienne_matrice, matrice = self.base.analyses, self.base.matrice, self.matrice
+        documents_president = {}
+        for doc, metadonnee in enumerate(metadonnees):
+            documents_president.setdefault(metadonnee['president'], []).append(doc)
+        reprises = {}
+        for president, docs in documents_president.items():
+            p = ancienne.ids_presidents.get(president)
+            docs_base = ancienne.documents_president[p] if p is not None else []
+            debut, fin = (ancienne.indptr[p], ancienne.indptr[p + 1]) if p is not None else (0, 0)
+            termes = traduire(array('i'), self.termes_nouveaux, ancienne.termes[debut:fin])
+            # Un document retiré ou retraité n'a pas d'image (-1) : la liste ne peut alors pas être la même.
+            anciens = [self.docs_nouveaux[doc] for doc in docs_base]
+            if anciens == docs:
+                reprises[president] = (termes, copier(array('i'), ancienne.comptes[debut:fin]))
+                continue
+            # Les mots disparus (-1) ne viennent que de documents retirés : ils sont ignorés des deux côtés.
+            comptage = {terme: compte for terme, compte in zip(termes, ancienne.comptes[debut:fin]) if terme >= 0}
+            gardes, anciens = set(docs), set(anciens)
+            for doc_base in docs_base:
+                if self.docs_nouveaux[doc_base] not in gardes:    # Document retiré, retraité ou passé à un autre président.
+                    for i in range(ancienne_matrice.indptr[doc_base], ancienne_matrice.indptr[doc_base + 1]):
+                        terme = self.terme_nouveau(ancienne_matrice.indices[i])
+                        if terme >= 0:
+                            comptage[terme] -= ancienne_matrice.comptes[i]
+            for doc in docs:
+                if doc not in anciens:    # Document retraité ou venu d'un autre président.
+                    for i in range(matrice.indptr[doc], matrice.indptr[doc + 1]):
+                        comptage[matrice.indices[i]] = comptage.get(matrice.indices[i], 0) + matrice.comptes[i]
+            termes = sorted(terme for terme, compte in comptage.items() if compte)
+            reprises[president] = (array('i', termes), array('i', map(comptage.__getitem__, termes)))
+        return AnalysesCorpus(matrice, metadonnees, positions, reprises=reprises)
+
+    def corpus(self, sources, metadonnees, segmentations, positions_documents, directory):
+        """
+        Fusionne toutes les parties de l'index.
+        Paramètres:
+        sources (dict): Signature des discours indexés (voir persistance.signature_sources).
+        metadonnees (list): Métadonnées de chaque document de la matrice fusionnée (voir function.lire_metadonnees).
+        segmentations (dict): Découpage en phrases de chaque document retraité (voir function.segmenter_discours), par nom.
+        positions_documents (dict): Positions des mots de chaque document retraité (voir function.positions_discours), par nom.
+        directory (str): Chemin du répertoire des discours.
+        Retourne:
+        CorpusIndexe: Index complet du corpus, avec ses tables d'analyse et son index des trigrammes.
+        """
+        base, matrice = self.base, self.matrice
+        index_inverse = self.index_inverse()
+        passages = IndexPassages.fusionner(base.passages, matrice, self.docs_base, self.termes_base, self.termes_nouveaux,
+                                           {self.ids_documents[nom]: phrases for nom, phrases in segmentations.items()}, directory)
+        positions = IndexPositionnel.fusionner(base.positions, matrice, self.origines,
+                                               {self.ids_documents[nom]: mots for nom, mots in positions_documents.items()})
+        bm25 = ScoreurBM25.fusionner(base.bm25, matrice, self.docs_base, self.termes_repris)
+        corpus = CorpusIndexe(matrice, index_inverse, passages, sources, metadonnees, positions, bm25)
+        corpus.analyses = self.analyses(metadonnees, positions)
+        corpus.trigrammes = IndexTrigrammes.fusionner(base.trigrammes, matrice, self.termes_base, self.termes_nouveaux)
+        return corpus
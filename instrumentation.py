@@ -0,0 +1,197 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient l'instrumentation des étapes du chatbot : durée, mémoire allouée et nombre de fichiers ouverts
+# par étape et par question, regroupés en histogrammes. Elle est désactivée par défaut : chaque étape mesurée ne
+# coûte alors qu'un test sur un booléen.
+import sys
+import time
+import threading
+import tracemalloc
+from collections import deque
+from functools import wraps
+
+NB_QUESTIONS_GARDEES = 100    # Nombre de questions dont le détail par étape est gardé (voir dernieres_questions).
+
+
+class _Mesure:
+    """
+    Mesure en cours d'une étape dans un thread.
+    """
+
+    __slots__ = ('nom', 'question', 'debut', 'ouvertures', 'memoire', 'pic')
+
+    def __init__(self, nom, question, ouvertures, memoire):
+        self.nom = nom
+        self.question = question    # L'étape a ouvert le détail d'une question.
+        self.ouvertures = ouvertures
+        self.memoire = memoire
+        self.pic = memoire    # Plus haut niveau de mémoire atteint pendant l'étape, y compris dans ses sous-étapes.
+        self.debut = time.perf_counter()
+
+
+class Instrumentation:
+    """
+    Mesures des étapes du chatbot, activables à la demande.
+    Une étape est une fonction décorée par etape ; une question est une étape décorée avec question=True, dont les
+    étapes appelées pendant son exécution (dans le même thread) forment le détail. Les durées d'une étape comprennent
+    celles de ses sous-étapes. Pour chaque étape sont cumulés le nombre d'appels, la durée (totale, maximale et
+    histogramme en puissances de deux de microsecondes), le nombre de fichiers ouverts (événements d'audit « open »)
+    et, si le suivi de la mémoire est activé, le pic de mémoire allouée pendant l'étape (tracemalloc).
+    """
+
+    def __init__(self):
+        self.actif = False
+        self.memoire = False
+        self._verrou = threading.Lock()
+        self._local = threading.local()    # Pile des mesures en cours et nombre de fichiers ouverts, par thread.
+        self._audit_installe = False
+        self.reinitialiser()
+
+    def activer(self, memoire=False):
+        """
+        Active les mesures.
+        Paramètres:
+        memoire (bool): Suit aussi la mémoire allouée avec tracemalloc, ce qui ralentit nettement le programme.
+        """
+        if not self._audit_installe:
+            sys.addaudithook(self._auditer)    # Un crochet d'audit ne peut pas être retiré : il ne fait rien une fois désactivé.
+            self._audit_installe = True
+        if memoire and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.memoire = memoire
+        self.actif = True
+
+    def desactiver(self):
+        """
+        Désactive les mesures, sans effacer celles déjà faites.
+        """
+        self.actif = False
+        if self.memoire and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.memoire = False
+
+    def reinitialiser(self):
+        """
+        Efface les mesures déjà faites.
+        """
+        with self._verrou:
+            self._etapes = {}
+            self._dernieres_questions = deque(maxlen=NB_QUESTIONS_GARDEES)
+
+    def _auditer(self, evenement, arguments):
+        if evenement == 'open' and self.actif:
+            self._local.ouvertures = getattr(self._local, 'ouvertures', 0) + 1
+
+    def etape(self, nom, question=False):
+        """
+        Décorateur qui mesure chaque appel d'une fonction comme une étape.
+        Paramètres:
+        nom (str): Nom de l'étape.
+        question (bool): L'étape est le traitement complet d'une question : le détail de ses sous-étapes est gardé.
+        Retourne:
+        function: Décorateur.
+        """
+        def decorer(fonction):
+            @wraps(fonction)
+            def mesurer(*arguments, **options):
+                if not self.actif:
+                    return fonction(*arguments, **options)
+                self._commencer(nom, question)
+                try:
+                    return fonction(*arguments, **options)
+                finally:
+                    self._terminer()
+            return mesurer
+        return decorer
+
+    def _commencer(self, nom, question):
+        local = self._local
+        if not hasattr(local, 'pile'):
+            local.pile, local.ouvertures, local.detail = [], 0, None
+        memoire = 0
+        if self.memoire and tracemalloc.is_tracing():
+            memoire = tracemalloc.get_traced_memory()[0]
+            if local.pile:
+                local.pile[-1].pic = max(local.pile[-1].pic, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        question = question and local.detail is None    # Une question appelée pendant une autre en fait partie.
+        if question:
+            local.detail = []
+        local.pile.append(_Mesure(nom, question, local.ouvertures, memoire))
+
+    def _terminer(self):
+        fin = time.perf_counter()
+        local = self._local
+        mesure = local.pile.pop()
+        duree = fin - mesure.debut
+        ouvertures = local.ouvertures - mesure.ouvertures
+        memoire = 0
+        if self.memoire and tracemalloc.is_tracing():
+            mesure.pic = max(mesure.pic, tracemalloc.get_traced_memory()[1])
+            memoire = mesure.pic - mesure.memoire
+            if local.pile:
+                local.pile[-1].pic = max(local.pile[-1].pic, mesure.pic)    # Le pic de l'étape compte pour l'étape englobante.
+        if local.detail is not None:
+            local.detail.append({'etape': mesure.nom, 'duree_ms': duree * 1000, 'memoire_octets': memoire,
+                                 'ouvertures_fichiers': ouvertures})
+        with self._verrou:
+            statistiques = self._etapes.get(mesure.nom)
+            if statistiques is None:
+                statistiques = self._etapes[mesure.nom] = {'nombre': 0, 'duree_totale': 0.0, 'duree_max': 0.0,
+                                                            'histogramme': {}, 'memoire_max': 0, 'ouvertures_fichiers': 0}
+            statistiques['nombre'] += 1
+            statistiques['duree_totale'] += duree
+            statistiques['duree_max'] = max(statistiques['duree_max'], duree)
+            case = int(duree * 1e6).bit_length()    # Case k : durées de 2^(k-1) à 2^k microsecondes.
+            statistiques['histogramme'][case] = statistiques['histogramme'].get(case, 0) + 1
+            statistiques['memoire_max'] = max(statistiques['memoire_max'], memoire)
+            statistiques['ouvertures_fichiers'] += ouvertures
+            if mesure.question:
+                self._dernieres_questions.append(local.detail)
+        if mesure.question:
+            local.detail = None    # Question terminée : les étapes suivantes n'en font plus partie.
+
+    def statistiques(self):
+        """
+        Retourne les mesures cumulées de chaque étape.
+        Retourne:
+        dict: Pour chaque étape, nombre d'appels, durées (totale, moyenne, maximale et centiles 50, 95 et 99 estimés par
+        la borne haute de leur case d'histogramme), histogramme (borne haute de chaque case en microsecondes -> nombre
+        d'appels), pic de mémoire allouée et nombre de fichiers ouverts.
+        """
+        with self._verrou:
+            resultats = {}
+            for nom, statistiques in self._etapes.items():
+                histogramme = sorted(statistiques['histogramme'].items())
+                resultats[nom] = {
+                    'nombre': statistiques['nombre'],
+                    'duree_totale_ms': statistiques['duree_totale'] * 1000,
+                    'duree_moyenne_ms': statistiques['duree_totale'] * 1000 / statistiques['nombre'],
+                    'duree_max_ms': statistiques['duree_max'] * 1000,
+                    **{f'p{p}_ms': self._centile(histogramme, statistiques['nombre'], p) for p in (50, 95, 99)},
+                    'histogramme_us': {str(1 << case): nombre for case, nombre in histogramme},
+                    'memoire_max_octets': statistiques['memoire_max'] if self.memoire else None,
+                    'ouvertures_fichiers': statistiques['ouvertures_fichiers'],
+                }
+            return {'actif': self.actif, 'memoire': self.memoire, 'etapes': resultats}
+
+    @staticmethod
+    def _centile(histogramme, nombre, p):
+        rang, cumul = p / 100 * nombre, 0
+        for case, effectif in histogramme:
+            cumul += effectif
+            if cumul >= rang:
+                return (1 << case) / 1000
+        return None
+
+    def dernieres_questions(self):
+        """
+        Retourne le détail par étape des dernières questions mesurées, de la plus ancienne à la plus récente.
+        Retourne:
+        list: Pour chaque question, liste des étapes dans l'ordre où elles se sont terminées (étape, durée, mémoire, fichiers ouverts).
+        """
+        with self._verrou:
+            return list(self._dernieres_questions)
+
+
+INSTRUMENTATION = Instrumentation()    # Instrumentation partagée par tous les modules, désactivée au démarrage.
@@ -0,0 +1,171 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient le mode « lot » du chatbot : les questions sont lues dans un fichier JSONL ou CSV,
+# traitées par paquets sans interaction, et les réponses sont écrites au fur et à mesure en JSONL.
+# Utilisation : python lot.py questions.jsonl [-o reponses.jsonl] [--format csv] [--taille-lot 256] [--cache 4096]
+#                              [--classement bm25] [--instrumentation] [--memoire]
+import sys
+import csv
+import json
+import time
+import argparse
+from itertools import islice
+from function import (charger_ou_construire_index, tokeniser_question, calculer_tf_idf_question,
+                      trouver_document_pertinent, completer_reponse, MESSAGE_AUCUN_DOCUMENT,
+                      CacheReponses, reponse_depuis_cache, extraire_expressions, repondre_question, corriger_mots,
+                      trouver_document_bm25, verifier_classement, CLASSEMENTS)
+from calcul_numpy import NUMPY_DISPONIBLE, ScoreurNumpy
+from instrumentation import INSTRUMENTATION
+
+
+def lire_questions(file, format_fichier="jsonl"):
+    """
+    Lit les questions d'un fichier ligne par ligne, sans le charger en entier.
+    En JSONL, chaque ligne est soit un objet avec un champ "question", soit une simple chaîne.
+    En CSV, la colonne "question" est utilisée si elle existe, sinon la première colonne.
+    Paramètres:
+    file (file): Fichier texte ouvert en lecture.
+    format_fichier (str): "jsonl" ou "csv".
+    Retourne:
+    generator: Les questions, dans l'ordre du fichier (les lignes vides sont ignorées).
+    """
+    if format_fichier == "csv":
+        lignes = csv.reader(file)
+        entete = next(lignes, None)
+        if entete is None:
+            return
+        if "question" in entete:
+            colonne = entete.index("question")
+        else:
+            colonne = 0
+            if entete and entete[0].strip():
+                yield entete[0]    # Pas d'en-tête : la première ligne est déjà une question.
+        for ligne in lignes:
+            if len(ligne) > colonne and ligne[colonne].strip():
+                yield ligne[colonne]
+        return
+
+    for ligne in file:
+        if not ligne.strip():
+            continue
+        element = json.loads(ligne)
+        yield element["question"] if isinstance(element, dict) else str(element)
+
+
+def repondre_questions_lot(corpus, questions, scoreur=None, taille_lot=256, cache=None, classement="cosinus"):
+    """
+    Répond à une suite de questions, paquet par paquet, avec la même règle que le mode Chatbot.
+    Les questions d'un paquet sont tokenisées et vectorisées ensemble ; avec un ScoreurNumpy, leurs documents
+    pertinents sont choisis par un seul produit de matrices creuses, sinon question par question sur l'index inversé.
+    Avec un cache, seules les questions absentes du cache sont calculées. Les questions qui contiennent des expressions
+    entre guillemets sont traitées une par une (voir repondre_question). En classement BM25, le document de chaque
+    question est choisi sur les impacts BM25 du corpus (voir trouver_document_bm25).
+    Paramètres:
+    corpus (CorpusIndexe): Index du corpus.
+    questions (iterable): Questions à traiter (par exemple lire_questions).
+    scoreur (ScoreurNumpy): Calcul vectorisé des similarités, facultatif.
+    taille_lot (int): Nombre de questions traitées ensemble.
+    cache (CacheReponses): Cache des réponses, facultatif.
+    classement (str): Mode de classement des documents, "cosinus" ou "bm25" (voir repondre_question).
+    Retourne:
+    generator: Pour chaque question, dans l'ordre, le dictionnaire retourné par repondre_question.
+    """
+    verifier_classement(classement)
+    questions = iter(questions)
+    while True:
+        paquet = list(islice(questions, taille_lot))
+        if not paquet:
+            return
+        corriges = [corriger_mots(tokeniser_question(question), corpus.trigrammes) for question in paquet]
+        mots_questions = [mots for mots, _ in corriges]
+        vecteurs = [calculer_tf_idf_question(question, corpus.matrice, mots) for question, mots in zip(paquet, mots_questions)]
+        reponses = [None] * len(paquet)
+        if cache is not None:
+            cles = [cache.cle(question, mots, vecteur, classement)
+                    for question, mots, vecteur in zip(paquet, mots_questions, vecteurs)]
+            for i, cle in enumerate(cles):
+                en_cache = cache.obtenir(corpus, cle)
+                if en_cache is not None:
+                    reponses[i] = reponse_depuis_cache(corpus, paquet[i], mots_questions[i], en_cache)
+        a_calculer = [i for i, reponse in enumerate(reponses) if reponse is None]
+        doublons = []    # Questions de même clé qu'une question du paquet déjà à calculer.
+        if cache is not None:
+            premieres = {}
+            for i in a_calculer:
+                premieres.setdefault(cles[i], i)
+            doublons = [(i, premieres[cles[i]]) for i in a_calculer if premieres[cles[i]] != i]
+            a_calculer = sorted(premieres.values())
+        for i in [i for i in a_calculer if extraire_expressions(paquet[i])]:
+            reponses[i] = repondre_question(corpus, paquet[i], classement=classement)
+            if cache is not None:
+                cache.enregistrer(corpus, cles[i], reponses[i])
+        a_calculer = [i for i in a_calculer if reponses[i] is None]
+
+        vecteurs = [vecteurs[i] for i in a_calculer]
+        if classement == "bm25":
+            documents = [trouver_document_bm25(corpus.bm25, vecteur) for vecteur in vecteurs]
+        elif scoreur is not None:
+            documents = [MESSAGE_AUCUN_DOCUMENT if doc is None else corpus.matrice.documents[doc]
+                         for doc in scoreur.documents_pertinents_lot(vecteurs, [mots_questions[i] for i in a_calculer])]
+        else:
+            documents = [trouver_document_pertinent(corpus.index_inverse, vecteur, mots_questions[i])
+                         for i, vecteur in zip(a_calculer, vecteurs)]
+        for i, vecteur, document in zip(a_calculer, vecteurs, documents):
+            reponses[i] = completer_reponse(corpus, paquet[i], mots_questions[i], vecteur, document)
+            if cache is not None:
+                cache.enregistrer(corpus, cles[i], reponses[i])
+        for i, premiere in doublons:
+            en_cache = {champ: reponses[premiere][champ] for champ in CacheReponses.CHAMPS}
+            reponses[i] = reponse_depuis_cache(corpus, paquet[i], mots_questions[i], en_cache)
+        for reponse, (_, corrections) in zip(reponses, corriges):
+            yield {**reponse, 'corrections': corrections}
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Répond sans interaction aux questions d'un fichier JSONL ou CSV.")
+    parser.add_argument("questions", help="Fichier des questions ('-' pour l'entrée standard).")
+    parser.add_argument("-o", "--sortie", default="-", help="Fichier JSONL des réponses ('-' pour la sortie standard).")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Format du fichier des questions (déduit de l'extension par défaut).")
+    parser.add_argument("--taille-lot", type=int, default=256, help="Nombre de questions traitées ensemble.")
+    parser.add_argument("--cache", type=int, default=4096, help="Nombre de réponses gardées en cache (0 pour désactiver le cache).")
+    parser.add_argument("--classement", choices=CLASSEMENTS, default="cosinus", help="Classement des documents (similarité cosinus ou BM25).")
+    parser.add_argument("--instrumentation", action="store_true", help="Écrit les mesures de chaque étape en JSON sur la sortie d'erreur.")
+    parser.add_argument("--memoire", action="store_true", help="Mesure aussi la mémoire allouée par étape (plus lent).")
+    parser.add_argument("--speeches", default="./speeches", help="Répertoire des discours.")
+    parser.add_argument("--cleaned", default=None, help="Répertoire où exporter les discours nettoyés (aucun export par défaut).")
+    parser.add_argument("--index", default="./index_tfidf.bin", help="Fichier d'index.")
+    args = parser.parse_args(arguments)
+    format_fichier = args.format or ("csv" if args.questions.endswith(".csv") else "jsonl")
+
+    corpus = charger_ou_construire_index(args.speeches, args.cleaned, args.index)
+    scoreur = ScoreurNumpy(corpus.matrice) if NUMPY_DISPONIBLE else None
+    cache = CacheReponses(args.cache) if args.cache > 0 else None
+    if args.instrumentation or args.memoire:
+        INSTRUMENTATION.activer(args.memoire)
+
+    entree = sys.stdin if args.questions == "-" else open(args.questions, encoding="utf-8", newline="")
+    sortie = sys.stdout if args.sortie == "-" else open(args.sortie, "w", encoding="utf-8")
+    debut = time.perf_counter()
+    nb_questions = 0
+    try:
+        for reponse in repondre_questions_lot(corpus, lire_questions(entree, format_fichier), scoreur, args.taille_lot, cache,
+                                              args.classement):
+            sortie.write(json.dumps(reponse, ensure_ascii=False) + "\n")
+            nb_questions += 1
+    finally:
+        if entree is not sys.stdin:
+            entree.close()
+        if sortie is not sys.stdout:
+            sortie.close()
+    duree = time.perf_counter() - debut
+    debit = nb_questions / duree if duree > 0 else 0.0
+    print(f"{nb_questions} questions traitées en {duree:.2f} s ({debit:.1f} questions/s)", file=sys.stderr)
+    if cache is not None:
+        statistiques = cache.statistiques()
+        print(f"Cache : {statistiques['succes']} succès, {statistiques['echecs']} échecs", file=sys.stderr)
+    if INSTRUMENTATION.actif:
+        print(json.dumps(INSTRUMENTATION.statistiques()['etapes'], indent=2, ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
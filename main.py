@@ -6,32 +6,27 @@ Ce fichier 'main.py' . Il gère l'interface utilisateur pour naviguer entre les
 """
 # Importation des fonctions du module function.py
 from function import *
+from application import Application
 
 # Définition des chemins des répertoires pour les fichiers d'entrée et de sortie
 directory_speeches = "./speeches"
-target_directory_cleaned = "./cleaned"
+target_directory_cleaned = None    # Répertoire où exporter les discours nettoyés (par exemple "./cleaned"), None pour ne rien écrire
+chemin_index = "./index_tfidf.bin"
 file_extension = ".txt"
-
-# Initialisation et traitement des fichiers de discours
-files_names = list_of_files(directory_speeches, file_extension)
-presidents = extraire_noms_presidents(files_names)
-presidents_avec_prenoms = associer_prenoms_presidents(presidents)
-
-# Affichage des noms des présidents
-print("Liste des présidents :")
-afficher_presidents(presidents_avec_prenoms)
-
-# Conversion des fichiers en minuscules et suppression de la ponctuation
-convertir_en_minuscules(directory_speeches, target_directory_cleaned)
-supprimer_ponctuation_et_accents(target_directory_cleaned)
-# Calcul de la matrice TF-IDF pour l'analyse des discours
-tf_idf_matrice = calculer_tf_idf(target_directory_cleaned)
+nb_processus_indexation = 1    # Processus utilisés pour reconstruire l'index (None pour un par cœur, utile sur un gros corpus)
+classement_chatbot = "cosinus"    # Classement des documents du chatbot : "cosinus" ou "bm25" (impacts BM25 précalculés)
 
 
+# Attente de l'index pour les fonctionnalités qui en ont besoin : l'index et le scoreur sont lus ensemble, une seule fois,
+# pour qu'un rechargement (voir Application.recharger) ne les mélange pas
+def attendre_index(application):
+    if not application.est_pret():
+        print("Chargement de l'index du corpus en cours...")
+    return application.etat()
 
 
 # Définition du menu principal
-def main_menu():
+def main_menu(application):
     while True:
         # Affichage des options du menu
         print("\nMenu Principal:")
@@ -41,16 +36,16 @@ def main_menu():
         choice = input("Entrez votre choix (1-3) : ")
         # Traitement du choix de l'utilisateur
         if choice == '1':
-            partie_un_menu()
+            partie_un_menu(application)
         elif choice == '2':
-            chatbot()
+            chatbot(application)
         elif choice == '3':
             print("Quitter le programme.")
             break
         else:
             print("Choix invalide. Veuillez entrer un nombre entre 1 et 3.")
 # Menu pour les fonctionnalités d'analyse textuelle
-def partie_un_menu():
+def partie_un_menu(application):
 
     while True:
         # Affichage des options de la Partie I
@@ -67,20 +62,23 @@ def partie_un_menu():
         if not choice.isdigit() or not 1 <= int(choice) <= 7:
             print("Veuillez entrer un nombre entre 1 et 7.")
             continue
+        if choice == '7':
+            print("Retourner au menu principal.")
+            break
+        corpus, _ = attendre_index(application)
         # Appel des fonctions correspondantes en fonction du choix
         if choice == '1':
-            mots = trouver_mots_moins_importants(tf_idf_matrice)
+            mots = trouver_mots_moins_importants(corpus.matrice)
             print(f"Mots les moins importants : {', '.join(mots)}")
         elif choice == '2':
-            mots, score = trouver_mots_avec_tf_idf_le_plus_eleve(tf_idf_matrice)
+            mots, score = trouver_mots_avec_tf_idf_le_plus_eleve(corpus.matrice)
             print(f"Mots avec le score TF-IDF le plus élevé : {', '.join(mots)} (Score: {score})")
         elif choice == '3':
-            mots_les_plus_repetes = mots_les_plus_repetes_par_president(tf_idf_matrice, target_directory_cleaned,
-                                                                        "Chirac")
+            mots_les_plus_repetes = mots_les_plus_repetes_par_president(corpus.analyses, "Chirac")
             print(
                 f"Les mots les plus répétés par Chirac (importants selon TF-IDF) sont : {', '.join([f'{mot} ({count})' for mot, count in mots_les_plus_repetes])}")
         elif choice == '4':
-            mentions_nation = compter_mentions_nation(target_directory_cleaned)
+            mentions_nation = compter_mentions_nation(corpus.analyses)
             president_le_plus_mentionne = max(mentions_nation, key=mentions_nation.get)
             print(
                 f"Président(s) ayant parlé de la 'Nation': {', '.join([p for p, m in mentions_nation.items() if m > 0])}")  # Modifiez cette ligne
@@ -88,22 +86,19 @@ def partie_un_menu():
                 f"Président l'ayant le plus mentionné : {president_le_plus_mentionne} ({mentions_nation[president_le_plus_mentionne]} fois)")
 
         elif choice == '5':
-            president, fichier = trouver_premier_president_climat_ecologie(target_directory_cleaned)
+            president, fichier = trouver_premier_president_climat_ecologie(corpus.analyses)
             print(f"Le premier président à parler du climat et/ou de l’écologie est {president}, trouvé dans le fichier {fichier}.")
         elif choice == '6':
-            mots_communs = mots_communs_tous_presidents(target_directory_cleaned, tf_idf_matrice)
+            mots_communs = mots_communs_tous_presidents(corpus.analyses)
             print(f"Mots communs à tous les présidents (hors mots non importants) : {', '.join(mots_communs)}")
-        elif choice == '7':
-            print("Retourner au menu principal.")
-            break
         else:
             print("Choix invalide.Entrer un nombre entre 1 et 7:")
 
 # Fonction pour le mode Chatbot
-def chatbot():
+def chatbot(application):
     while True:
         print("\nMode Chatbot:")
-        print("Posez votre question (ou tapez 'quitter' pour revenir au menu principal):")
+        print("Posez votre question (ou tapez 'quitter' pour revenir au menu principal, ou terminez un mot par * pour le compléter):")
         question = input("Votre question : ")
         # Validation de la question
         while question[0].isdigit():
@@ -112,36 +107,43 @@ def chatbot():
         if question.lower() == 'quitter':
             print("Retour au menu principal.")
             break
-        # Traitement de la question
-        mots_question = tokeniser_question(question)  # Tokenisation de la question.
-        print("Mots de la question après tokenisation et filtrage :", mots_question)
-
-        mots_dans_corpus = trouver_mots_dans_corpus(mots_question, tf_idf_matrice)  # Identification des mots de la question présents dans le corpus.
-        print("Mots de la question présents dans le corpus :", mots_dans_corpus)
-
-        tf_idf_question = calculer_tf_idf_question(question, tf_idf_matrice)  # Calcul du vecteur TF-IDF pour la question.
-
-        # Trouver le document le plus pertinent dans 'cleaned'
-        nom_document_pertinent_cleaned = trouver_document_pertinent(tf_idf_matrice, tf_idf_question, files_names, mots_question)
-
-        if nom_document_pertinent_cleaned == "Aucun document pertinent trouvé pour la question posée.":
-            print(nom_document_pertinent_cleaned)
+        # Autocomplétion : une question terminée par * affiche les mots du corpus qui complètent son dernier mot
+        if question.endswith('*'):
+            corpus, _ = attendre_index(application)
+            suggestions = completer_mot(corpus.matrice, question[:-1])
+            print(f"Mots du corpus qui complètent la question : {', '.join(suggestions) if suggestions else 'aucun'}")
+            continue
+        # Traitement de la question : tokenisation, document le plus pertinent, mot important et phrase extraite
+        corpus, scoreur = attendre_index(application)
+        reponse = repondre_question(corpus, question, application.cache_reponses, classement_chatbot)
+        print("Mots de la question après tokenisation et filtrage :", reponse['mots_question'])
+        if reponse['corrections']:
+            print(f"Mots corrigés : {', '.join(f'{mot} -> {correction}' for mot, correction in reponse['corrections'].items())}")
+        print("Mots de la question présents dans le corpus :", reponse['mots_dans_corpus'])
+
+        if reponse['document'] is None:
+            print(MESSAGE_AUCUN_DOCUMENT)
         else:
-            # Convertir le chemin du fichier de 'cleaned' à 'speeches'
-            nom_document_pertinent_speeches = convertir_chemin_cleaned_vers_speeches(nom_document_pertinent_cleaned)
-            print(f"Document pertinent retourné : {nom_document_pertinent_speeches}")
-
-        # Trouver le mot avec le score TF-IDF le plus élevé dans la question
-        mot_important = trouver_mot_important(tf_idf_question)
-        print(f"Mot ayant le score TF-IDF le plus élevé : {mot_important} ")
+            print(f"Document pertinent retourné : {reponse['document']}")
+            # Autres documents proches de la question, classés comme le document pertinent (similarité cosinus ou BM25)
+            documents_proches = rechercher_documents(corpus.index_inverse, question, k=4, scoreur=scoreur,
+                                                     index_positions=corpus.positions, index_trigrammes=corpus.trigrammes,
+                                                     bm25=corpus.bm25 if classement_chatbot == "bm25" else None)
+            autres_documents = [f"{nom} ({score:.3f})" for nom, score, _ in documents_proches if nom != reponse['document']][:3]
+            if autres_documents:
+                print(f"Autres documents pertinents : {', '.join(autres_documents)}")
+
+        print(f"Mot ayant le score TF-IDF le plus élevé : {reponse['mot_important']} ")
         print()
-        nom_document_pertinent_speeches = convertir_chemin_cleaned_vers_speeches(nom_document_pertinent_cleaned)
-        # Utiliser le chemin du document pertinent dans 'speeches' pour extraire la phrase
-        chemin_document_pertinent = os.path.join(directory_speeches, nom_document_pertinent_speeches)
-        phrase_avec_mot_important = extraire_phrase_avec_mot(chemin_document_pertinent, mot_important)
-        # Formuler la réponse en fonction du début de la question
-        reponse_formulee = formuler_reponse(question, phrase_avec_mot_important)
-        print("Réponse :", reponse_formulee)
+        print("Réponse :", reponse['reponse'])
 
 if __name__ == "__main__":
-    main_menu()
+    application = Application(directory_speeches, target_directory_cleaned, chemin_index, file_extension, nb_processus_indexation)
+    # Chargement de l'index en arrière-plan : depuis le fichier d'index, ou nettoyage des discours et reconstruction
+    # si un discours a changé depuis le dernier lancement. Le menu est disponible sans attendre.
+    application.demarrer()
+
+    # Affichage des noms des présidents
+    print("Liste des présidents :")
+    afficher_presidents(application.presidents())
+    main_menu(application)
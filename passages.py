@@ -0,0 +1,231 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient l'index des phrases des discours : chaque phrase est repérée par sa position
+# en octets dans le discours d'origine, et chaque mot renvoie aux phrases qui le contiennent.
+import os
+from array import array
+from bisect import bisect_left
+from tableaux import copier, copier_decale, traduire, suites
+
+
+class IndexPassages:
+    """
+    Index des phrases du corpus.
+    Les phrases du document doc sont numérotées de debuts_docs[doc] à debuts_docs[doc + 1] - 1 ; la phrase p
+    occupe longueurs[p] octets à partir de l'octet positions[p] du discours d'origine. Les mots de chaque phrase
+    (identifiants de termes de la matrice TF-IDF) sont stockés ligne par ligne (format CSR), et la transposée
+    donne pour chaque terme la liste triée des phrases qui le contiennent.
+    """
+
+    def __init__(self, matrice, debuts_docs, positions, longueurs, indptr, termes, transposee=None, directory=None):
+        """
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus, qui fournit les documents et le vocabulaire.
+        debuts_docs (array): Première phrase de chaque document, suivie du nombre total de phrases.
+        positions (array): Position en octets de chaque phrase dans son discours.
+        longueurs (array): Longueur en octets de chaque phrase.
+        indptr (array): Début des mots de chaque phrase dans termes, suivi de la fin des mots de la dernière phrase.
+        termes (array): Identifiants des termes distincts de chaque phrase.
+        transposee (tuple): Phrases de chaque terme déjà calculées (voir transposer), facultatif.
+        directory (str): Chemin du répertoire des discours d'origine.
+        """
+        self.matrice = matrice
+        self.documents = matrice.documents
+        self.debuts_docs = debuts_docs
+        self.positions = positions
+        self.longueurs = longueurs
+        self.indptr = indptr
+        self.termes = termes
+        self.directory = directory
+        self._transposee = transposee
+
+    @classmethod
+    def depuis_segmentations(cls, matrice, segmentations, directory):
+        """
+        Construit l'index à partir du découpage en phrases de chaque document.
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+        segmentations (list): Pour chaque document de la matrice, la liste de ses phrases (position, longueur, mots).
+        directory (str): Chemin du répertoire des discours d'origine.
+        Retourne:
+        IndexPassages: Index des phrases du corpus.
+        """
+        debuts_docs, positions, longueurs = array('q', [0]), array('q'), array('i')
+        indptr, termes = array('q', [0]), array('i')
+        ids_termes = {mot: terme for terme, mot in enumerate(matrice.vocabulaire)}    # Table temporaire, le temps de la construction.
+        for phrases in segmentations:
+            for position, longueur, mots in phrases:
+                positions.append(position)
+                longueurs.append(longueur)
+                termes.extend(sorted({ids_termes[mot] for mot in mots if mot in ids_termes}))
+                indptr.append(len(termes))
+            debuts_docs.append(len(positions))
+        index = cls(matrice, debuts_docs, positions, longueurs, indptr, termes, directory=directory)
+        index.transposer()
+        return index
+
+    @classmethod
+    def fusionner(cls, ancien, matrice, docs_base, termes_base, termes_nouveaux, segmentations, directory):
+        """
+        Reprend l'index des phrases de l'index de base pour les documents inchangés : seuls les documents retraités sont
+        découpés, et seules les listes de phrases des termes des documents retraités ou retirés sont modifiées, les autres
+        étant recopiées (renumérotées si les numéros de phrases ont changé).
+        Paramètres:
+        ancien (IndexPassages): Index des phrases de la base.
+        matrice (MatriceTfIdf): Nouvelle matrice TF-IDF.
+        docs_base (array): Identifiant dans la base de chaque document de la matrice, ou -1 pour un document retraité.
+        termes_base (array): Identifiant dans la base de chaque terme de la matrice, ou -1 pour un mot ajouté (None si le
+        vocabulaire n'a pas changé).
+        termes_nouveaux (array): Identifiant dans la matrice de chaque terme de la base, ou -1 pour un mot disparu (None si le
+        vocabulaire n'a pas changé).
+        segmentations (dict): Découpage en phrases de chaque document retraité (voir depuis_segmentations), par identifiant de document.
+        directory (str): Chemin du répertoire des discours d'origine.
+        Retourne:
+        IndexPassages: Index des phrases du corpus, identique à celui de depuis_segmentations.
+        """
+        debuts_docs, positions, longueurs = array('q', [0]), array('q'), array('i')
+        indptr, termes = array('q', [0]), array('i')
+        phrases_nouvelles = array('i', [-1]) * ancien.nb_phrases    # Numéro dans le nouvel index de chaque phrase de la base.
+        ajouts = {}    # Terme -> phrases de chaque document retraité qui le contiennent.
+        ids_termes = {mot: matrice.id_terme(mot) for phrases in segmentations.values() for _, _, mots in phrases for mot in mots}
+        for debut, fin, origine in suites(docs_base):
+            if origine < 0:    # Document retraité.
+                phrases_termes = {}
+                for position, longueur, mots in segmentations[debut]:
+                    termes_phrase = sorted({ids_termes[mot] for mot in mots if ids_termes[mot] is not None})
+                    for terme in termes_phrase:
+                        phrases_termes.setdefault(terme, []).append(len(positions))
+                    positions.append(position)
+                    longueurs.append(longueur)
+                    termes.extend(termes_phrase)
+                    indptr.append(len(termes))
+                debuts_docs.append(len(positions))
+                for terme, phrases in phrases_termes.items():
+                    ajouts.setdefault(terme, []).append(phrases)
+                continue
+            premiere, derniere = ancien.debuts_docs[origine], ancien.debuts_docs[origine + fin - debut]
+            phrases_nouvelles[premiere:derniere] = array('i', range(len(positions), len(positions) + derniere - premiere))
+            copier_decale(debuts_docs, ancien.debuts_docs[origine + 1:origine + fin - debut + 1], len(positions) - premiere)
+            copier(positions, ancien.positions[premiere:derniere])
+            copier(longueurs, ancien.longueurs[premiere:derniere])
+            debut_termes = len(termes)
+            copier_decale(indptr, ancien.indptr[premiere + 1:derniere + 1], len(termes) - ancien.indptr[premiere])
+            traduire(termes, termes_nouveaux, ancien.termes[ancien.indptr[premiere]:ancien.indptr[derniere]])
+            if termes_nouveaux is not None and -1 in termes[debut_termes:]:
+                # Un mot disparu n'est plus dans aucun document inchangé ; si une phrase en contient un quand même (découpage
+                # différent de celui du discours entier), il en est retiré comme dans depuis_segmentations.
+                del termes[debut_termes:], indptr[len(indptr) - (derniere - premiere):]
+                for phrase in range(premiere, derniere):
+                    tranche = traduire(array('i'), termes_nouveaux, ancien.termes[ancien.indptr[phrase]:ancien.indptr[phrase + 1]])
+                    termes.extend(terme for terme in tranche if terme >= 0)
+                    indptr.append(len(termes))
+
+        # Phrases de chaque terme : seules les listes des termes des documents retirés ou retraités changent de contenu.
+        debuts_base, phrases_base = ancien.transposer()
+        renumerotees = any(nouvelle not in (phrase, -1) for phrase, nouvelle in enumerate(phrases_nouvelles))
+        retraits = {}    # Terme -> tranches [premiere, derniere) de phrases de la base retirées de sa liste.
+        docs_repris = set(docs_base)
+        for origine in range(len(ancien.debuts_docs) - 1):
+            if origine not in docs_repris:
+                premiere, derniere = ancien.debuts_docs[origine], ancien.debuts_docs[origine + 1]
+                for terme_base in set(ancien.termes[ancien.indptr[premiere]:ancien.indptr[derniere]]):
+                    terme = terme_base if termes_nouveaux is None else termes_nouveaux[terme_base]
+                    if terme >= 0:
+                        retraits.setdefault(terme, []).append((premiere, derniere))
+        debuts, phrases = array('q', [0]), array('i')
+        for terme in range(len(matrice)):
+            terme_base = terme if termes_base is None else termes_base[terme]
+            debut, fin = (debuts_base[terme_base], debuts_base[terme_base + 1]) if terme_base >= 0 else (0, 0)
+            liste = phrases if terme not in retraits and terme not in ajouts else array('i')
+            traduire(liste, phrases_nouvelles if renumerotees else None, phrases_base[debut:fin])
+            if liste is not phrases:
+                for premiere, derniere in sorted(retraits.get(terme, ()), reverse=True):
+                    del liste[bisect_left(phrases_base, premiere, debut, fin) - debut:bisect_left(phrases_base, derniere, debut, fin) - debut]
+                for phrases_doc in ajouts.get(terme, ()):    # Les phrases d'un document sont contiguës : elles s'insèrent d'un bloc.
+                    i = bisect_left(liste, phrases_doc[0])
+                    liste[i:i] = array('i', phrases_doc)
+                phrases.extend(liste)
+            debuts.append(len(phrases))
+        return cls(matrice, debuts_docs, positions, longueurs, indptr, termes, (debuts, phrases), directory)
+
+    @property
+    def nb_phrases(self):
+        return len(self.positions)
+
+    def transposer(self):
+        """
+        Calcule (une seule fois) les phrases de chaque terme.
+        Retourne:
+        tuple: Tableaux (debuts, phrases) où les phrases du terme t sont la tranche [debuts[t], debuts[t + 1]), triée.
+        """
+        if self._transposee is None:
+            debuts = array('q', [0] * (len(self.matrice) + 1))
+            for terme in self.termes:
+                debuts[terme + 1] += 1
+            for terme in range(len(self.matrice)):
+                debuts[terme + 1] += debuts[terme]
+            suivantes = array('q', debuts[:-1])
+            phrases = array('i', [0] * len(self.termes))
+            for phrase in range(self.nb_phrases):
+                for i in range(self.indptr[phrase], self.indptr[phrase + 1]):
+                    terme = self.termes[i]
+                    phrases[suivantes[terme]] = phrase
+                    suivantes[terme] += 1
+            self._transposee = (debuts, phrases)
+        return self._transposee
+
+    def phrases_du_mot(self, mot, doc):
+        """
+        Retourne les phrases d'un document qui contiennent un mot.
+        Paramètres:
+        mot (str): Mot recherché.
+        doc (int): Identifiant du document.
+        Retourne:
+        range: Positions, dans le tableau des phrases du terme, des phrases du document qui le contiennent.
+        """
+        terme = self.matrice.id_terme(mot)
+        if terme is None:
+            return range(0)
+        debuts, phrases = self.transposer()
+        debut = bisect_left(phrases, self.debuts_docs[doc], debuts[terme], debuts[terme + 1])    # Les phrases d'un document sont contiguës.
+        fin = bisect_left(phrases, self.debuts_docs[doc + 1], debut, debuts[terme + 1])
+        return range(debut, fin)
+
+    def premiere_phrase(self, doc, mot):
+        """
+        Retourne la première phrase d'un document contenant un mot, ou None s'il n'y en a pas.
+        """
+        _, phrases = self.transposer()
+        candidates = self.phrases_du_mot(mot, doc)
+        return phrases[candidates[0]] if candidates else None
+
+    def meilleures_phrases(self, doc, vecteur_question, k=1):
+        """
+        Classe les phrases d'un document selon les mots de la question qu'elles contiennent,
+        chaque mot comptant pour son score TF-IDF dans la question.
+        Paramètres:
+        doc (int): Identifiant du document.
+        vecteur_question (dict): Scores TF-IDF des mots de la question.
+        k (int): Nombre de phrases à retourner.
+        Retourne:
+        list: Couples (numéro de la phrase, score), du meilleur au moins bon, à égalité la première phrase du discours d'abord.
+        """
+        _, phrases = self.transposer()
+        scores = {}
+        for mot, poids in vecteur_question.items():
+            for i in self.phrases_du_mot(mot, doc):
+                scores[phrases[i]] = scores.get(phrases[i], 0) + poids
+        return sorted(scores.items(), key=lambda element: (-element[1], element[0]))[:k]
+
+    def lire_phrase(self, phrase):
+        """
+        Lit une phrase directement à sa position dans le discours d'origine.
+        Paramètres:
+        phrase (int): Numéro de la phrase.
+        Retourne:
+        str: Texte de la phrase.
+        """
+        doc = bisect_left(self.debuts_docs, phrase + 1) - 1    # Document dont la tranche de phrases contient ce numéro.
+        with open(os.path.join(self.directory, self.documents[doc]), 'rb') as file:
+            file.seek(self.positions[phrase])
+            return file.read(self.longueurs[phrase]).decode('utf-8')
@@ -0,0 +1,219 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient la sauvegarde de l'index TF-IDF dans un fichier binaire versionné,
+# son chargement par projection en mémoire (mmap) et la vérification de sa fraîcheur.
+import os
+import sys
+import json
+import mmap
+import struct
+from array import array
+from indexation import MatriceTfIdf, IndexInverse, CorpusIndexe
+from passages import IndexPassages
+from positions import IndexPositionnel
+from vocabulaire import VocabulaireCompact
+from bm25 import ScoreurBM25
+from postings import PostingsCompresses
+from analyses import AnalysesCorpus
+from trigrammes import IndexTrigrammes
+
+MAGIC = b'PYCHATBT'    # Signature en tête du fichier d'index.
+VERSION_FORMAT = 14    # À incrémenter à chaque changement du format du fichier.
+PREFIXE = struct.Struct('<8sII')    # Signature, version du format, taille de l'en-tête JSON.
+ALIGNEMENT = 8    # Alignement des sections, pour pouvoir les lire directement comme des tableaux.
+
+
+def signature_sources(directory, extension=".txt"):
+    """
+    Relève la date de modification et la taille de chaque fichier source.
+    Paramètres:
+    directory (str): Chemin du répertoire des discours.
+    extension (str): Extension des fichiers à prendre en compte.
+    Retourne:
+    dict: Dictionnaire associant à chaque nom de fichier la liste [date de modification en ns, taille en octets].
+    """
+    sources = {}
+    for filename in os.listdir(directory):
+        if filename.endswith(extension):
+            stat = os.stat(os.path.join(directory, filename))
+            sources[filename] = [stat.st_mtime_ns, stat.st_size]
+    return sources
+
+
+def _aligner(position):
+    return (position + ALIGNEMENT - 1) // ALIGNEMENT * ALIGNEMENT
+
+
+def sauvegarder_index(chemin, corpus):
+    """
+    Écrit la matrice TF-IDF, l'index inversé, l'index des phrases, l'index positionnel, les impacts BM25, les tables d'analyse
+    et l'index des trigrammes dans un fichier binaire.
+    Le fichier est d'abord écrit à côté puis renommé, pour qu'un lecteur ne voie jamais un index à moitié écrit.
+    Paramètres:
+    chemin (str): Chemin du fichier d'index.
+    corpus (CorpusIndexe): Index du corpus, avec la signature des fichiers sources (voir signature_sources), les métadonnées
+    des discours, les tables d'analyse et l'index des trigrammes.
+    Ne retourne rien car le fichier est écrit directement.
+    """
+    matrice, index_inverse, passages = corpus.matrice, corpus.index_inverse, corpus.passages
+    analyses, trigrammes = corpus.analyses, corpus.trigrammes
+    debuts, docs = matrice.transposer()
+    postings = index_inverse.postings_compresses
+    debuts_termes, phrases_par_terme = passages.transposer()
+    tableaux = {
+        'vocabulaire': array('B', bytes(matrice.vocabulaire.donnees)),
+        'vocabulaire_blocs': array('q', matrice.vocabulaire.debuts_blocs),
+        'idf': array('d', matrice.idf),
+        'indptr': array('q', matrice.indptr),
+        'indices': array('i', matrice.indices),
+        'poids': array('d', matrice.poids),
+        'comptes': array('i', matrice.comptes),
+        'debuts': array('q', debuts),
+        'docs': array('i', docs),
+        'comptes_colonnes': array('i', matrice.comptes_transposes()),
+        'postings': array('B', bytes(postings.donnees)),
+        'postings_debuts_termes': array('q', postings.debuts_termes),
+        'postings_debuts_blocs': array('q', postings.debuts_blocs),
+        'postings_derniers_docs': array('i', postings.derniers_docs),
+        'normes': array('d', index_inverse.normes),
+        'bornes': array('d', index_inverse.bornes),
+        'phrases_debuts_docs': array('q', passages.debuts_docs),
+        'phrases_positions': array('q', passages.positions),
+        'phrases_longueurs': array('i', passages.longueurs),
+        'phrases_indptr': array('q', passages.indptr),
+        'phrases_termes': array('i', passages.termes),
+        'phrases_debuts_termes': array('q', debuts_termes),
+        'phrases_par_terme': array('i', phrases_par_terme),
+        'positions_debuts': array('q', corpus.positions.debuts),
+        'positions': array('i', corpus.positions.positions),
+        'bm25_longueurs': array('i', corpus.bm25.longueurs),
+        'bm25_impacts': array('B', corpus.bm25.impacts),
+        'bm25_debuts_ordre': array('q', corpus.bm25.debuts_ordre),
+        'bm25_ordre': array('i', corpus.bm25.ordre),
+        'analyses_indptr': array('q', analyses.indptr),
+        'analyses_termes': array('i', analyses.termes),
+        'analyses_comptes': array('i', analyses.comptes),
+        'analyses_nb_presidents': array('i', analyses.nb_presidents_terme),
+        'analyses_poids_max': array('d', analyses.poids_max),
+        'trigrammes_cles': array('q', trigrammes.cles),
+        'trigrammes_debuts': array('q', trigrammes.debuts),
+        'trigrammes_termes': array('i', trigrammes.termes),
+        'trigrammes_longueurs': array('i', trigrammes.longueurs),
+        'trigrammes_nb': array('i', trigrammes.nb_trigrammes),
+    }
+    sections = {}    # Nom de la section -> [type, décalage depuis le début des données, nombre d'éléments].
+    position = 0
+    for nom, tableau in tableaux.items():
+        sections[nom] = [tableau.typecode, position, len(tableau)]
+        position = _aligner(position + len(tableau) * tableau.itemsize)
+    entete = json.dumps({
+        'ordre_octets': sys.byteorder,
+        'documents': matrice.documents,
+        'sources': corpus.sources,
+        'metadonnees': corpus.metadonnees,
+        'bm25': {'k1': corpus.bm25.k1, 'b': corpus.bm25.b, 'echelle': corpus.bm25.echelle},
+        'sections': sections,
+    }).encode('utf-8')
+
+    chemin_temporaire = chemin + '.tmp'
+    with open(chemin_temporaire, 'wb') as file:
+        file.write(PREFIXE.pack(MAGIC, VERSION_FORMAT, len(entete)))
+        file.write(entete)
+        debut_donnees = _aligner(PREFIXE.size + len(entete))
+        for nom, tableau in tableaux.items():
+            file.write(b'\0' * (debut_donnees + sections[nom][1] - file.tell()))    # Remplissage jusqu'au début de la section.
+            tableau.tofile(file)
+    os.replace(chemin_temporaire, chemin)
+
+
+def charger_index(chemin, directory_speeches=None):
+    """
+    Charge un fichier d'index en le projetant en mémoire : les tableaux ne sont pas copiés mais lus directement dans le fichier.
+    Paramètres:
+    chemin (str): Chemin du fichier d'index.
+    directory_speeches (str): Chemin du répertoire des discours, où l'index des phrases lit le texte des phrases.
+    Retourne:
+    CorpusIndexe: Index du corpus, ou None si le fichier est absent, illisible ou d'une autre version.
+    """
+    try:
+        with open(chemin, 'rb') as file:
+            tampon = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)    # La projection reste valide après la fermeture du fichier.
+    except (OSError, ValueError):
+        return None
+    if len(tampon) < PREFIXE.size:
+        return None
+    magic, version, taille_entete = PREFIXE.unpack_from(tampon)
+    if magic != MAGIC or version != VERSION_FORMAT:
+        return None
+    # Un fichier tronqué ou abîmé (en-tête illisible, section incomplète ou absente) est traité comme absent :
+    # l'appelant reconstruit alors l'index au lieu d'échouer à chaque lancement.
+    try:
+        entete, tableaux = _lire_sections(tampon, taille_entete)
+        if entete is None:
+            return None
+        return _construire_corpus(entete, tableaux, directory_speeches)
+    except (ValueError, TypeError, KeyError, IndexError, UnicodeDecodeError):    # json.JSONDecodeError hérite de ValueError.
+        return None
+
+
+def _lire_sections(tampon, taille_entete):
+    """
+    Lit l'en-tête JSON et projette chaque section du fichier d'index sous forme de tableau.
+    Retourne:
+    tuple: En-tête et dictionnaire des tableaux, ou (None, None) si le fichier ne peut pas être lu sur cette machine.
+    """
+    if PREFIXE.size + taille_entete > len(tampon):
+        return None, None
+    entete = json.loads(tampon[PREFIXE.size:PREFIXE.size + taille_entete].decode('utf-8'))
+    if entete['ordre_octets'] != sys.byteorder:
+        return None, None
+    vue = memoryview(tampon)
+    debut_donnees = _aligner(PREFIXE.size + taille_entete)
+    tableaux = {}
+    for nom, (typecode, decalage, nombre) in entete['sections'].items():
+        debut = debut_donnees + decalage
+        fin = debut + nombre * array(typecode).itemsize
+        if decalage < 0 or nombre < 0 or fin > len(tampon):    # Section coupée par la fin du fichier.
+            return None, None
+        tableaux[nom] = vue[debut:fin].cast(typecode)
+    return entete, tableaux
+
+
+def _construire_corpus(entete, tableaux, directory_speeches):
+    """
+    Assemble l'index du corpus à partir des tableaux projetés d'un fichier d'index.
+    """
+    vocabulaire = VocabulaireCompact(tableaux['vocabulaire'], tableaux['vocabulaire_blocs'], len(tableaux['idf']))
+    transposee = (tableaux['debuts'], tableaux['docs'])
+    matrice = MatriceTfIdf(entete['documents'], vocabulaire, tableaux['idf'], tableaux['indptr'],
+                           tableaux['indices'], tableaux['poids'], tableaux['comptes'], transposee, tableaux['comptes_colonnes'])
+    postings = PostingsCompresses(tableaux['debuts'], tableaux['postings'], tableaux['postings_debuts_termes'],
+                                  tableaux['postings_debuts_blocs'], tableaux['postings_derniers_docs'])
+    index_inverse = IndexInverse(matrice, tableaux['normes'], tableaux['bornes'], postings)
+    passages = IndexPassages(matrice, tableaux['phrases_debuts_docs'], tableaux['phrases_positions'], tableaux['phrases_longueurs'],
+                             tableaux['phrases_indptr'], tableaux['phrases_termes'],
+                             (tableaux['phrases_debuts_termes'], tableaux['phrases_par_terme']), directory_speeches)
+    positions = IndexPositionnel(matrice, tableaux['positions_debuts'], tableaux['positions'])
+    bm25 = ScoreurBM25(matrice, tableaux['bm25_longueurs'], tableaux['bm25_impacts'],
+                       entete['bm25']['echelle'], entete['bm25']['k1'], entete['bm25']['b'],
+                       (tableaux['bm25_debuts_ordre'], tableaux['bm25_ordre']))
+    corpus = CorpusIndexe(matrice, index_inverse, passages, entete['sources'], entete['metadonnees'], positions, bm25)
+    corpus.analyses = AnalysesCorpus(matrice, entete['metadonnees'], positions,
+                                     (tableaux['analyses_indptr'], tableaux['analyses_termes'], tableaux['analyses_comptes'],
+                                      tableaux['analyses_nb_presidents'], tableaux['analyses_poids_max']))
+    corpus.trigrammes = IndexTrigrammes(matrice, tableaux=(tableaux['trigrammes_cles'], tableaux['trigrammes_debuts'],
+                                                          tableaux['trigrammes_termes'], tableaux['trigrammes_longueurs'],
+                                                          tableaux['trigrammes_nb']))
+    return corpus
+
+
+def index_a_jour(corpus, directory_speeches):
+    """
+    Vérifie qu'un index chargé correspond toujours aux discours sources.
+    Paramètres:
+    corpus (CorpusIndexe): Index chargé depuis le fichier d'index.
+    directory_speeches (str): Chemin du répertoire des discours.
+    Retourne:
+    bool: True si aucun discours n'a été ajouté, supprimé ou modifié depuis la construction de l'index.
+    """
+    return corpus.sources == signature_sources(directory_speeches)
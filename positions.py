@@ -0,0 +1,119 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient l'index positionnel du corpus : pour chaque mot et chaque document qui le contient,
+# la liste des positions du mot dans le discours normalisé. Il permet de chercher une expression exacte
+# ou des mots proches les uns des autres en ne lisant que les postings des mots recherchés.
+from array import array
+from bisect import bisect_left, bisect_right
+from tableaux import copier, copier_decale, suites
+
+
+class IndexPositionnel:
+    """
+    Positions des mots dans chaque document, rangées dans l'ordre des postings de la matrice TF-IDF transposée :
+    les positions du posting i (i-ème couple (terme, document) de MatriceTfIdf.transposer) sont la tranche
+    [debuts[i], debuts[i + 1]) du tableau positions, triée. La position d'un mot est son rang dans la suite
+    des mots du discours normalisé (voir decouper_mots).
+    """
+
+    def __init__(self, matrice, debuts, positions):
+        """
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+        debuts (array): Début des positions de chaque posting, suivi du nombre total de positions.
+        positions (array): Positions des mots, posting par posting.
+        """
+        self.matrice = matrice
+        self.debuts = debuts
+        self.positions = positions
+
+    @classmethod
+    def depuis_positions(cls, matrice, positions_documents):
+        """
+        Construit l'index à partir des positions des mots de chaque document.
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+        positions_documents (list): Pour chaque document de la matrice, dictionnaire associant chaque mot à la liste triée de ses positions.
+        Retourne:
+        IndexPositionnel: Index positionnel du corpus.
+        """
+        debuts_termes, docs = matrice.transposer()
+        debuts, positions = array('q', [0]), array('i')
+        for terme, mot in enumerate(matrice.vocabulaire):
+            for i in range(debuts_termes[terme], debuts_termes[terme + 1]):
+                positions.extend(positions_documents[docs[i]].get(mot, ()))
+                debuts.append(len(positions))
+        return cls(matrice, debuts, positions)
+
+    @classmethod
+    def fusionner(cls, ancien, matrice, origines, positions_documents):
+        """
+        Reprend les positions de l'index de base pour les postings inchangés, par tranches entières : seules les positions
+        des documents retraités sont ajoutées.
+        Paramètres:
+        ancien (IndexPositionnel): Index positionnel de la base.
+        matrice (MatriceTfIdf): Nouvelle matrice TF-IDF.
+        origines (array): Position dans la base de chaque posting de la matrice transposée, ou -1 pour un posting d'un document retraité.
+        positions_documents (dict): Positions des mots de chaque document retraité (voir depuis_positions), par identifiant de document.
+        Retourne:
+        IndexPositionnel: Index positionnel du corpus, identique à celui de depuis_positions.
+        """
+        debuts_termes, docs = matrice.transposer()
+        debuts, positions = array('q', [0]), array('i')
+        for debut, fin, origine in suites(origines):
+            if origine >= 0:
+                premiere, derniere = ancien.debuts[origine], ancien.debuts[origine + fin - debut]
+                copier_decale(debuts, ancien.debuts[origine + 1:origine + fin - debut + 1], len(positions) - premiere)
+                copier(positions, ancien.positions[premiere:derniere])
+            else:
+                terme = bisect_right(debuts_termes, debut) - 1
+                positions.extend(positions_documents[docs[debut]][matrice.vocabulaire[terme]])
+                debuts.append(len(positions))
+        return cls(matrice, debuts, positions)
+
+    def _postings(self, mot):
+        """
+        Retourne, pour chaque document contenant un mot, la tranche de ses positions.
+        """
+        terme = self.matrice.id_terme(mot)
+        if terme is None:
+            return {}
+        debuts_termes, docs = self.matrice.transposer()
+        return {docs[i]: (self.debuts[i], self.debuts[i + 1]) for i in range(debuts_termes[terme], debuts_termes[terme + 1])}
+
+    def occurrences_expression(self, mots, fenetre=None):
+        """
+        Compte, dans chaque document, les occurrences d'une expression exacte ou de mots proches les uns des autres.
+        Seuls les documents présents dans les postings de tous les mots sont examinés.
+        Paramètres:
+        mots (list): Mots de l'expression, normalisés comme les discours.
+        fenetre (int): None pour l'expression exacte (mots consécutifs, dans l'ordre) ; sinon, distance maximale
+        en nombre de mots entre le premier mot et chacun des autres, dans n'importe quel ordre.
+        Retourne:
+        dict: Dictionnaire associant l'identifiant de chaque document où l'expression apparaît à son nombre d'occurrences
+        (nombre de positions du premier mot qui satisfont la contrainte).
+        """
+        if not mots:
+            return {}
+        postings = [self._postings(mot) for mot in mots]
+        candidats = set(min(postings, key=len))    # Intersection en partant de la liste la plus courte.
+        for posting in postings:
+            candidats &= posting.keys()
+        occurrences = {}
+        for doc in sorted(candidats):
+            tranches = [posting[doc] for posting in postings]
+            debut, fin = tranches[0]
+            if fenetre is None:
+                suivants = [set(self.positions[d:f]) for d, f in tranches[1:]]
+                nombre = sum(1 for i in range(debut, fin)
+                             if all(self.positions[i] + decalage + 1 in positions for decalage, positions in enumerate(suivants)))
+            else:
+                nombre = sum(1 for i in range(debut, fin)
+                             if all(self._position_proche(self.positions[i], d, f, fenetre) for d, f in tranches[1:]))
+            if nombre:
+                occurrences[doc] = nombre
+        return occurrences
+
+    def _position_proche(self, position, debut, fin, fenetre):
+        i = bisect_left(self.positions, position - fenetre, debut, fin)    # Première position à moins de fenetre mots avant.
+        return i < fin and self.positions[i] <= position + fenetre
@@ -0,0 +1,328 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient les postings compressés de l'index inversé : pour chaque mot, les identifiants des documents
+# qui le contiennent sont écrits par différence avec le précédent, et leurs nombres d'occurrences à la suite, en
+# entiers de longueur variable (voir vocabulaire.ecrire_varint). Le score TF-IDF n'est pas stocké : il est recalculé
+# comme nombre d'occurrences * IDF du mot, exactement comme dans MatriceTfIdf.depuis_comptages.
+import sys
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from vocabulaire import ecrire_varint, lire_varint
+from tableaux import copier
+
+TAILLE_BLOC = 128    # Nombre de postings par bloc : un bloc est la plus petite unité décodée.
+NB_BLOCS_DECODES = 1024    # Nombre de blocs décodés gardés en cache : les mots d'une question sont relus plusieurs fois.
+
+
+class PostingsCompresses:
+    """
+    Postings de chaque terme, triés par document et découpés en blocs de TAILLE_BLOC postings. Les postings du terme t
+    commencent à l'octet debuts_termes[t]. Un bloc commence par la taille en octets de ses écarts entre documents,
+    suivie de ces écarts puis des nombres d'occurrences.
+    La plupart des termes n'apparaissent que dans quelques documents : une liste d'au plus TAILLE_BLOC postings
+    est un bloc unique, sans table de sauts. Une liste plus longue commence par le numéro de son premier bloc dans
+    les tables de sauts : le bloc g commence à l'octet debuts_blocs[g], et son dernier document (derniers_docs[g])
+    sert de pointeur de saut, qui donne le point de départ des écarts du bloc suivant et permet d'atteindre
+    directement le bloc qui contient un document.
+    Un entier inférieur à 128 s'écrit sur un seul octet : un bloc dont chaque valeur tient sur un octet se décode
+    d'un coup, sans lire les entiers un par un.
+    """
+
+    def __init__(self, debuts, donnees, debuts_termes, debuts_blocs, derniers_docs, taille_cache=NB_BLOCS_DECODES):
+        """
+        Les tableaux peuvent être des array ou des memoryview sur un fichier d'index projeté en mémoire.
+        Paramètres:
+        debuts (array): Début des postings de chaque terme, suivi du nombre total de postings (voir MatriceTfIdf.transposer).
+        donnees (array): Octets des postings codés.
+        debuts_termes (array): Position du début des postings de chaque terme dans donnees, suivie de la taille de donnees.
+        debuts_blocs (array): Position du début de chaque bloc des listes de plus de TAILLE_BLOC postings.
+        derniers_docs (array): Identifiant du dernier document de chacun de ces blocs.
+        taille_cache (int): Nombre de blocs décodés gardés en cache (0 pour désactiver le cache).
+        """
+        self.debuts = debuts
+        self.donnees = memoryview(donnees).cast('B')
+        self.debuts_termes = debuts_termes
+        self.debuts_blocs = debuts_blocs
+        self.derniers_docs = derniers_docs
+        self._bloc = lru_cache(maxsize=taille_cache)(self._decoder) if taille_cache else self._decoder
+
+    @classmethod
+    def depuis_matrice(cls, matrice):
+        """
+        Code les postings de la matrice TF-IDF transposée.
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+        Retourne:
+        PostingsCompresses: Postings compressés du corpus.
+        """
+        debuts, docs = matrice.transposer()
+        comptes = matrice.comptes_transposes()
+        donnees = bytearray()
+        debuts_termes, debuts_blocs, derniers_docs = array('q'), array('q'), array('i')
+        for terme in range(len(debuts) - 1):
+            debuts_termes.append(len(donnees))
+            cls._coder_terme(donnees, debuts_blocs, derniers_docs, docs, comptes, debuts[terme], debuts[terme + 1])
+        debuts_termes.append(len(donnees))
+        return cls(debuts, array('B', donnees), debuts_termes, debuts_blocs, derniers_docs)
+
+    @classmethod
+    def fusionner(cls, ancien, matrice, termes_repris):
+        """
+        Code les postings d'une nouvelle matrice en recopiant tels quels les octets des termes dont les postings n'ont pas
+        changé (mêmes documents, mêmes nombres d'occurrences) : seules leurs positions dans les tables de sauts sont décalées.
+        Paramètres:
+        ancien (PostingsCompresses): Postings compressés de l'index de base.
+        matrice (MatriceTfIdf): Nouvelle matrice TF-IDF.
+        termes_repris (array): Pour chaque terme de la matrice, le terme de la base dont les postings sont identiques, ou -1.
+        Retourne:
+        PostingsCompresses: Postings compressés de la nouvelle matrice, identiques à ceux de depuis_matrice.
+        """
+        debuts, docs = matrice.transposer()
+        comptes = matrice.comptes_transposes()
+        donnees = bytearray()
+        debuts_termes, debuts_blocs, derniers_docs = array('q'), array('q'), array('i')
+        for terme, terme_repris in enumerate(termes_repris):
+            debuts_termes.append(len(donnees))
+            if terme_repris >= 0:
+                ancien._copier_terme(terme_repris, donnees, debuts_blocs, derniers_docs)
+            else:
+                cls._coder_terme(donnees, debuts_blocs, derniers_docs, docs, comptes, debuts[terme], debuts[terme + 1])
+        debuts_termes.append(len(donnees))
+        return cls(debuts, array('B', donnees), debuts_termes, debuts_blocs, derniers_docs)
+
+    @staticmethod
+    def _coder_terme(donnees, debuts_blocs, derniers_docs, docs, comptes, debut_terme, fin_terme):
+        """
+        Code à la suite de donnees les postings [debut_terme, fin_terme) d'un terme, et ajoute ses blocs aux tables de sauts.
+        """
+        longue = fin_terme - debut_terme > TAILLE_BLOC
+        if longue:
+            ecrire_varint(donnees, len(derniers_docs))    # Premier bloc du terme dans les tables de sauts.
+        precedent = -1    # Le premier écart d'un terme part de -1 : tous les écarts sont strictement positifs.
+        for debut in range(debut_terme, fin_terme, TAILLE_BLOC):
+            fin = min(debut + TAILLE_BLOC, fin_terme)
+            ecarts = bytearray()
+            for i in range(debut, fin):
+                ecrire_varint(ecarts, docs[i] - precedent)
+                precedent = docs[i]
+            if longue:
+                debuts_blocs.append(len(donnees))
+                derniers_docs.append(precedent)
+            ecrire_varint(donnees, len(ecarts))
+            donnees += ecarts
+            for i in range(debut, fin):
+                ecrire_varint(donnees, comptes[i])
+
+    def _copier_terme(self, terme, donnees, debuts_blocs, derniers_docs):
+        """
+        Recopie à la suite de donnees les postings codés d'un terme, en récrivant le numéro de son premier bloc s'il en a plusieurs.
+        """
+        debut, fin = self.debuts_termes[terme], self.debuts_termes[terme + 1]
+        saut = self.premier_saut(terme)
+        if saut is None:
+            donnees += self.donnees[debut:fin]
+            return
+        _, debut = lire_varint(self.donnees, debut)    # Début du premier bloc, après son numéro.
+        ecrire_varint(donnees, len(derniers_docs))
+        decalage = len(donnees) - debut
+        donnees += self.donnees[debut:fin]
+        nb_blocs = self.nb_blocs(terme)
+        debuts_blocs.extend(map(decalage.__add__, self.debuts_blocs[saut:saut + nb_blocs]))
+        copier(derniers_docs, self.derniers_docs[saut:saut + nb_blocs])
+
+    def nb_documents(self, terme):
+        """
+        Retourne le nombre de documents qui contiennent un terme.
+        """
+        return self.debuts[terme + 1] - self.debuts[terme]
+
+    def nb_blocs(self, terme):
+        """
+        Retourne le nombre de blocs de postings d'un terme.
+        """
+        return -(-self.nb_documents(terme) // TAILLE_BLOC)
+
+    def premier_saut(self, terme):
+        """
+        Retourne la position du premier bloc d'un terme dans les tables de sauts (debuts_blocs et derniers_docs),
+        ou None si ses postings tiennent dans un seul bloc.
+        """
+        if self.nb_documents(terme) <= TAILLE_BLOC:
+            return None
+        return lire_varint(self.donnees, self.debuts_termes[terme])[0]
+
+    def _lire(self, i, nombre):
+        valeurs = []
+        for _ in range(nombre):
+            valeur, i = lire_varint(self.donnees, i)
+            valeurs.append(valeur)
+        return valeurs
+
+    def bloc(self, terme, bloc):
+        """
+        Décode un bloc de postings (ou le retrouve dans le cache des blocs décodés).
+        Paramètres:
+        terme (int): Identifiant du terme.
+        bloc (int): Numéro du bloc parmi ceux du terme, à partir de 0.
+        Retourne:
+        tuple: Listes des identifiants de documents (croissants) et des nombres d'occurrences correspondants, à ne pas modifier.
+        """
+        return self._bloc(terme, bloc)
+
+    def _decoder(self, terme, bloc):
+        nombre = min(TAILLE_BLOC, self.nb_documents(terme) - bloc * TAILLE_BLOC)
+        saut = self.premier_saut(terme)
+        if saut is None:
+            i, fin, precedent = self.debuts_termes[terme], self.debuts_termes[terme + 1], -1
+        else:
+            i = self.debuts_blocs[saut + bloc]
+            fin = self.debuts_blocs[saut + bloc + 1] if bloc + 1 < self.nb_blocs(terme) else self.debuts_termes[terme + 1]
+            precedent = self.derniers_docs[saut + bloc - 1] if bloc else -1
+        taille_ecarts, debut = lire_varint(self.donnees, i)
+        debut_tf = debut + taille_ecarts
+        ecarts = self.donnees[debut:debut_tf] if debut_tf - debut == nombre else self._lire(debut, nombre)
+        docs = list(accumulate(ecarts, initial=precedent))
+        del docs[0]
+        tfs = list(self.donnees[debut_tf:fin]) if fin - debut_tf == nombre else self._lire(debut_tf, nombre)
+        return docs, tfs
+
+    def blocs(self, terme):
+        """
+        Parcourt les blocs de postings d'un terme.
+        Retourne:
+        generator: Pour chaque bloc, listes des documents et des nombres d'occurrences (voir bloc).
+        """
+        for bloc in range(self.nb_blocs(terme)):
+            yield self.bloc(terme, bloc)
+
+    def postings(self, terme):
+        """
+        Parcourt les postings d'un terme.
+        Retourne:
+        generator: Couples (identifiant du document, nombre d'occurrences), par document croissant.
+        """
+        for docs, tfs in self.blocs(terme):
+            yield from zip(docs, tfs)
+
+    def chercher(self, terme, doc):
+        """
+        Retourne le nombre d'occurrences d'un terme dans un document (0 s'il en est absent), en ne décodant que le bloc
+        qui peut contenir le document.
+        """
+        saut = self.premier_saut(terme)
+        if saut is None:
+            bloc = 0
+        else:
+            bloc = bisect_left(self.derniers_docs, doc, saut, saut + self.nb_blocs(terme)) - saut    # Premier bloc qui va jusqu'au document.
+        if bloc == self.nb_blocs(terme):
+            return 0
+        docs, tfs = self.bloc(terme, bloc)
+        i = bisect_left(docs, doc)
+        return tfs[i] if i < len(docs) and docs[i] == doc else 0
+
+    def curseur(self, terme):
+        """
+        Retourne un curseur sur les postings d'un terme (voir CurseurPostings).
+        """
+        return CurseurPostings(self, terme)
+
+    def taille_octets(self):
+        """
+        Retourne la mémoire occupée par les postings codés et leurs tables (débuts des termes et tables de sauts), en octets.
+        Les débuts des postings de chaque terme, partagés avec la matrice transposée, ne sont pas comptés.
+        """
+        return len(self.donnees) + 8 * len(self.debuts_termes) + 8 * len(self.debuts_blocs) + 4 * len(self.derniers_docs)
+
+
+class CurseurPostings:
+    """
+    Position courante dans les postings d'un terme, qui avance par document croissant. Seul le bloc courant est décodé ;
+    avancer jusqu'à un document saute directement au bloc qui peut le contenir.
+    Les attributs doc et tf donnent le posting courant (doc vaut None une fois les postings épuisés).
+    """
+
+    __slots__ = ('postings', 'terme', 'saut', 'bloc', 'fin_blocs', 'docs', 'tfs', 'i', 'doc', 'tf')
+
+    def __init__(self, postings, terme):
+        self.postings = postings
+        self.terme = terme
+        self.saut = postings.premier_saut(terme)    # None pour une liste d'un seul bloc.
+        self.fin_blocs = postings.nb_blocs(terme)
+        self._charger(0, 0)
+
+    def _charger(self, bloc, i):
+        self.bloc = bloc
+        if bloc < self.fin_blocs:
+            self.docs, self.tfs = self.postings.bloc(self.terme, bloc)
+            self._placer(i)
+        else:
+            self.docs, self.tfs = (), ()
+            self.i, self.doc, self.tf = 0, None, None
+
+    def _placer(self, i):
+        self.i = i
+        if i < len(self.docs):
+            self.doc, self.tf = self.docs[i], self.tfs[i]
+        else:
+            self._charger(self.bloc + 1, 0)
+
+    def suivant(self):
+        """
+        Passe au posting suivant.
+        """
+        self._placer(self.i + 1)
+
+    def avancer(self, doc):
+        """
+        Avance jusqu'au premier posting dont le document est supérieur ou égal à doc.
+        """
+        if self.doc is None or self.doc >= doc:
+            return
+        saut = self.saut
+        if saut is not None and self.postings.derniers_docs[saut + self.bloc] < doc:
+            # Le document est après le bloc courant : saut au bloc qui peut le contenir.
+            bloc = bisect_left(self.postings.derniers_docs, doc, saut + self.bloc + 1, saut + self.fin_blocs) - saut
+            self._charger(bloc, 0)
+            if self.doc is None or self.doc >= doc:
+                return
+        self._placer(bisect_left(self.docs, doc, self.i))
+
+
+def rapport_memoire(matrice, postings, taille_index=None):
+    """
+    Compare la mémoire des postings compressés à celle des autres représentations de la matrice TF-IDF transposée.
+    La représentation en dictionnaire est celle de MatriceTfIdf.colonnes rassemblée en un dictionnaire
+    {mot: [(document, score TF-IDF), ...]} : elle est mesurée colonne par colonne avec sys.getsizeof, sans être
+    construite en entier.
+    Paramètres:
+    matrice (MatriceTfIdf): Matrice TF-IDF du corpus.
+    postings (PostingsCompresses): Postings compressés de cette matrice.
+    taille_index (int): Taille du fichier d'index complet en octets (toutes les structures du corpus), facultative.
+    Retourne:
+    dict: Nombre de postings, taille en octets de chaque représentation (dictionnaire, tableaux documents + scores
+    de la matrice transposée, postings compressés), octets par posting, rapport de taille au dictionnaire et, si elle
+    est donnée, taille du fichier d'index complet rapportée au nombre de postings.
+    """
+    nb_postings = len(matrice.indices)
+    taille_dictionnaire = sys.getsizeof(dict.fromkeys(range(len(matrice))))
+    for mot, colonne in matrice.colonnes():
+        taille_dictionnaire += sys.getsizeof(mot) + sys.getsizeof(colonne)
+        for doc, score in colonne:
+            taille_dictionnaire += sys.getsizeof((doc, score)) + sys.getsizeof(score)
+            if doc > 256:    # Les entiers de -5 à 256 sont partagés par Python.
+                taille_dictionnaire += sys.getsizeof(doc)
+    taille_tableaux = 8 * (len(matrice) + 1) + (4 + 8) * nb_postings    # debuts ('q'), docs ('i') et scores ('d').
+    taille_compresses = postings.taille_octets()
+    return {
+        'postings': nb_postings,
+        'dictionnaire_octets': taille_dictionnaire,
+        'tableaux_octets': taille_tableaux,
+        'compresses_octets': taille_compresses,
+        'octets_par_posting': taille_compresses / nb_postings if nb_postings else 0.0,
+        'reduction_dictionnaire': taille_dictionnaire / taille_compresses if taille_compresses else None,
+        'reduction_tableaux': taille_tableaux / taille_compresses if taille_compresses else None,
+        'index_octets': taille_index,
+        'index_octets_par_posting': taille_index / nb_postings if taille_index is not None and nb_postings else None,
+    }
@@ -0,0 +1,456 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient le serveur HTTP/JSON du chatbot (asyncio, bibliothèque standard uniquement) : l'index est
+# chargé une seule fois et partagé par toutes les requêtes, au lieu d'un processus main.py par utilisateur.
+# Utilisation : python serveur.py [--hote 127.0.0.1] [--port 8000] [--concurrence 32] [--delai 5] [--processus 1]
+#                                 [--cache 4096] [--duree-cache 600] [--instrumentation] [--memoire]
+#   GET /sante                             état du serveur
+#   GET /statistiques[?reinitialiser=1]    durées, mémoire et fichiers ouverts par étape du chatbot (avec --instrumentation)
+#   GET /recherche?q=...&k=5[&classement=bm25]   documents les plus similaires à la question
+#   GET /completion?q=...&k=10             mots du corpus qui complètent le dernier mot de la question
+#   GET /reponse?q=...[&classement=bm25]  (ou POST /reponse avec {"question": ...})   réponse du chatbot
+#   GET /analyse/<nom>[?president=Chirac]  fonctionnalités de la Partie I (voir ANALYSES)
+#   GET /analyse/mentions?mots=nation,patrie[&par=document]   occurrences de mots par président ou par discours
+#   GET /analyse/orateur?mots=climat[&dernier=1]              premier (ou dernier) président à employer ces mots
+#   POST /recharger                        met l'index à jour d'après les discours ajoutés, modifiés ou supprimés
+#                                          (en mode pre-fork, seul le processus qui reçoit la requête est mis à jour)
+import os
+import gc
+import json
+import time
+import signal
+import threading
+import socket
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from function import (charger_ou_construire_index, rechercher_documents, repondre_question,
+                      trouver_mots_moins_importants, trouver_mots_avec_tf_idf_le_plus_eleve,
+                      mots_les_plus_repetes_par_president, compter_mentions_nation,
+                      trouver_premier_president_climat_ecologie, mots_communs_tous_presidents, CacheReponses,
+                      compter_mentions, trouver_orateur, completer_mot, CLASSEMENTS)
+from calcul_numpy import NUMPY_DISPONIBLE, ScoreurNumpy
+from instrumentation import INSTRUMENTATION
+
+TAILLE_MAX_CORPS = 1 << 16    # Taille maximale du corps d'une requête POST, en octets.
+K_MAX = 100    # Nombre maximal de documents demandés à /recherche.
+STATUTS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           414: "URI Too Long", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           504: "Gateway Timeout"}
+ANALYSES = ['mots-moins-importants', 'mots-plus-importants', 'mots-plus-repetes', 'nation', 'climat', 'mots-communs',
+            'mentions', 'orateur']
+
+
+class ErreurRequete(Exception):
+    """
+    Erreur renvoyée au client avec un code HTTP et un message.
+    """
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class ServeurChatbot:
+    """
+    Serveur HTTP/1.1 minimal : chaque connexion est une coroutine qui peut enchaîner plusieurs requêtes (keep-alive).
+    Les calculs (recherche, réponse, analyses) s'exécutent dans un groupe de threads pour ne pas bloquer la boucle
+    asyncio ; un sémaphore borne le nombre de calculs simultanés, les requêtes suivantes attendent leur tour.
+    Une requête qui dépasse le délai reçoit une erreur 504 (le calcul en cours se termine en arrière-plan).
+    L'index et le scoreur sont publiés ensemble dans l'attribut etat : chaque requête le lit une seule fois, et un
+    rechargement le remplace d'un bloc, sans interrompre les requêtes en cours.
+    """
+
+    def __init__(self, corpus, scoreur=None, concurrence=32, delai_requete=5.0, delai_inactivite=30.0, cache=None,
+                 charger=None):
+        """
+        Paramètres:
+        corpus (CorpusIndexe): Index du corpus, partagé par toutes les requêtes.
+        scoreur (ScoreurNumpy): Calcul vectorisé des similarités, facultatif.
+        concurrence (int): Nombre maximal de calculs simultanés.
+        delai_requete (float): Délai maximal de traitement d'une requête, en secondes.
+        delai_inactivite (float): Délai après lequel une connexion sans requête est fermée, en secondes.
+        cache (CacheReponses): Cache des réponses de /reponse, facultatif (un par processus en mode pre-fork).
+        charger (callable): Fonction sans argument qui retourne l'index à jour du corpus, utilisée par /recharger
+        (par exemple charger_ou_construire_index sur les chemins du serveur), facultative.
+        """
+        self.etat = (corpus, scoreur)    # Index du corpus et scoreur, remplacés ensemble (voir recharger).
+        self.charger = charger
+        self._verrou_rechargement = threading.Lock()
+        self.concurrence = concurrence
+        self.delai_requete = delai_requete
+        self.delai_inactivite = delai_inactivite
+        self.cache = cache
+        self._executeur = ThreadPoolExecutor(max_workers=concurrence)
+        self._semaphore = None    # Créé dans la boucle asyncio du serveur (voir demarrer).
+        self.requetes_en_cours = 0
+        self.requetes_traitees = 0
+        self.debut = time.time()
+
+    async def demarrer(self, hote="127.0.0.1", port=8000, sock=None):
+        """
+        Démarre l'écoute des connexions.
+        Paramètres:
+        hote (str): Adresse d'écoute.
+        port (int): Port d'écoute.
+        sock (socket.socket): Socket déjà à l'écoute, partagé entre processus (voir servir_prefork), facultatif.
+        Retourne:
+        asyncio.AbstractServer: Serveur asyncio (voir serve_forever).
+        """
+        self._semaphore = asyncio.Semaphore(self.concurrence)
+        if sock is not None:
+            return await asyncio.start_server(self.traiter_connexion, sock=sock, limit=TAILLE_MAX_CORPS)
+        return await asyncio.start_server(self.traiter_connexion, hote, port, limit=TAILLE_MAX_CORPS)
+
+    def servir(self, hote="127.0.0.1", port=8000, sock=None):
+        """
+        Sert les requêtes jusqu'à l'interruption du processus.
+        """
+        async def servir():
+            ecoute = await self.demarrer(hote, port, sock)
+            async with ecoute:
+                await ecoute.serve_forever()
+
+        try:
+            asyncio.run(servir())
+        except KeyboardInterrupt:
+            pass
+
+    async def traiter_connexion(self, reader, writer):
+        """
+        Traite les requêtes successives d'une connexion jusqu'à sa fermeture.
+        """
+        try:
+            while True:
+                try:
+                    requete = await asyncio.wait_for(self._lire_requete(reader), self.delai_inactivite)
+                except ErreurRequete as erreur:
+                    await self._envoyer(writer, erreur.code, {'erreur': erreur.message}, garder_connexion=False)
+                    break
+                if requete is None:
+                    break
+                methode, chemin, parametres, corps, garder_connexion = requete
+                self.requetes_en_cours += 1
+                try:
+                    code, contenu = 200, await self._traiter_requete(methode, chemin, parametres, corps)
+                except ErreurRequete as erreur:
+                    code, contenu = erreur.code, {'erreur': erreur.message}
+                except asyncio.TimeoutError:
+                    code, contenu = 504, {'erreur': "Délai de traitement dépassé."}
+                except Exception as erreur:
+                    code, contenu = 500, {'erreur': str(erreur)}
+                finally:
+                    self.requetes_en_cours -= 1
+                    self.requetes_traitees += 1
+                await self._envoyer(writer, code, contenu, garder_connexion)
+                if not garder_connexion:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass    # Connexion inactive ou fermée par le client.
+        finally:
+            writer.close()
+
+    async def _lire_requete(self, reader):
+        """
+        Lit la ligne de requête, les en-têtes et le corps d'une requête HTTP.
+        Retourne:
+        tuple: (méthode, chemin, paramètres de l'URL, corps, garder la connexion), ou None si le client a fermé la connexion.
+        """
+        try:
+            ligne = await reader.readline()
+        except (asyncio.LimitOverrunError, ValueError):
+            raise ErreurRequete(414, "Ligne de requête trop longue.")
+        if not ligne:
+            return None
+        morceaux = ligne.decode('latin-1').split()
+        if len(morceaux) != 3:
+            raise ErreurRequete(400, "Ligne de requête invalide.")
+        methode, cible, version = morceaux
+        entetes = {}
+        while True:
+            try:
+                ligne = await reader.readline()
+            except (asyncio.LimitOverrunError, ValueError):
+                raise ErreurRequete(431, "En-tête de la requête trop long.")
+            if ligne in (b'\r\n', b'\n', b''):
+                break
+            nom, _, valeur = ligne.decode('latin-1').partition(':')
+            entetes[nom.strip().lower()] = valeur.strip()
+        try:
+            taille = int(entetes.get('content-length', 0) or 0)
+        except ValueError:
+            taille = -1    # Valeur non numérique : rejetée comme une taille négative.
+        if taille < 0:
+            raise ErreurRequete(400, "En-tête Content-Length invalide.")
+        if taille > TAILLE_MAX_CORPS:
+            raise ErreurRequete(413, "Corps de la requête trop volumineux.")
+        corps = await reader.readexactly(taille) if taille > 0 else b''
+        connexion = entetes.get('connection', '').lower()
+        garder_connexion = connexion != 'close' if version == 'HTTP/1.1' else connexion == 'keep-alive'
+        url = urlsplit(cible)
+        parametres = {nom: valeurs[-1] for nom, valeurs in parse_qs(url.query).items()}
+        return methode, url.path, parametres, corps, garder_connexion
+
+    async def _envoyer(self, writer, code, contenu, garder_connexion):
+        corps = json.dumps(contenu, ensure_ascii=False).encode('utf-8')
+        entete = (f"HTTP/1.1 {code} {STATUTS.get(code, '')}\r\n"
+                  f"Content-Type: application/json; charset=utf-8\r\n"
+                  f"Content-Length: {len(corps)}\r\n"
+                  f"Connection: {'keep-alive' if garder_connexion else 'close'}\r\n\r\n")
+        writer.write(entete.encode('latin-1') + corps)
+        await writer.drain()
+
+    async def _executer(self, fonction, *arguments):
+        """
+        Exécute un calcul dans le groupe de threads, en respectant la limite de concurrence et le délai par requête.
+        """
+        async def calculer():
+            async with self._semaphore:
+                return await asyncio.get_running_loop().run_in_executor(self._executeur, fonction, *arguments)
+        return await asyncio.wait_for(calculer(), self.delai_requete)    # Le délai compte aussi l'attente du sémaphore.
+
+    async def _traiter_requete(self, methode, chemin, parametres, corps):
+        """
+        Aiguille une requête vers le traitement correspondant à son chemin.
+        Retourne:
+        dict: Contenu JSON de la réponse.
+        """
+        if chemin == '/sante':
+            return self.sante()
+        if chemin == '/statistiques':
+            return self.statistiques(parametres)
+        if chemin == '/recharger':
+            if methode != 'POST':
+                raise ErreurRequete(405, "Méthode non autorisée.")
+            if self.charger is None:
+                raise ErreurRequete(404, "Rechargement de l'index non disponible.")
+            # Hors du délai par requête : une mise à jour peut retraiter plusieurs discours.
+            return await asyncio.get_running_loop().run_in_executor(self._executeur, self.recharger)
+        corpus, scoreur = self.etat    # Un seul index pour toute la requête, même si un rechargement le remplace entre-temps.
+        if chemin == '/recherche':
+            if methode != 'GET':
+                raise ErreurRequete(405, "Méthode non autorisée.")
+            question = self._question(parametres, corps)
+            try:
+                k = min(max(int(parametres.get('k', 5)), 1), K_MAX)
+            except ValueError:
+                raise ErreurRequete(400, "Le paramètre k doit être un entier.")
+            bm25 = corpus.bm25 if self._classement(parametres) == "bm25" else None
+            resultats = await self._executer(rechercher_documents, corpus.index_inverse, question, k, False, scoreur,
+                                             corpus.positions, corpus.trigrammes, bm25)
+            return {'question': question,
+                    'documents': [{'document': nom, 'score': score, 'mots': mots} for nom, score, mots in resultats]}
+        if chemin == '/completion':
+            if methode != 'GET':
+                raise ErreurRequete(405, "Méthode non autorisée.")
+            question = self._question(parametres, corps)
+            try:
+                k = min(max(int(parametres.get('k', 10)), 1), K_MAX)
+            except ValueError:
+                raise ErreurRequete(400, "Le paramètre k doit être un entier.")
+            return {'question': question, 'mots': await self._executer(completer_mot, corpus.matrice, question, k)}
+        if chemin == '/reponse':
+            if methode not in ('GET', 'POST'):
+                raise ErreurRequete(405, "Méthode non autorisée.")
+            return await self._executer(repondre_question, corpus, self._question(parametres, corps), self.cache,
+                                        self._classement(parametres))
+        if chemin.startswith('/analyse/'):
+            if methode != 'GET':
+                raise ErreurRequete(405, "Méthode non autorisée.")
+            nom = chemin[len('/analyse/'):]
+            if nom not in ANALYSES:
+                raise ErreurRequete(404, f"Analyse inconnue, analyses disponibles : {', '.join(ANALYSES)}.")
+            return await self._executer(self.analyser, corpus, nom, parametres)
+        raise ErreurRequete(404, "Chemin inconnu.")
+
+    def _classement(self, parametres):
+        classement = parametres.get('classement', 'cosinus')
+        if classement not in CLASSEMENTS:
+            raise ErreurRequete(400, f"Classement inconnu, classements disponibles : {', '.join(CLASSEMENTS)}.")
+        return classement
+
+    def _question(self, parametres, corps):
+        question = parametres.get('q')
+        if question is None and corps:
+            try:
+                question = json.loads(corps.decode('utf-8')).get('question')
+            except (ValueError, AttributeError):
+                raise ErreurRequete(400, "Corps JSON invalide.")
+        if question is not None and not isinstance(question, str):
+            raise ErreurRequete(400, "Le champ \"question\" doit être une chaîne de caractères.")
+        if not question or not question.strip():
+            raise ErreurRequete(400, "Question manquante (paramètre q ou champ \"question\").")
+        return question
+
+    def sante(self):
+        """
+        Retourne l'état du serveur : nombre de documents indexés, requêtes en cours et traitées, durée de fonctionnement
+        et statistiques du cache.
+        """
+        corpus = self.etat[0]
+        return {'statut': 'ok',
+                'processus': os.getpid(),
+                'documents': corpus.matrice.nb_documents,
+                'termes': len(corpus.matrice),
+                'requetes_en_cours': self.requetes_en_cours,
+                'requetes_traitees': self.requetes_traitees,
+                'duree_fonctionnement': round(time.time() - self.debut, 3),
+                'cache': self.cache.statistiques() if self.cache is not None else None}
+
+    def statistiques(self, parametres):
+        """
+        Retourne les mesures des étapes du chatbot (voir Instrumentation.statistiques) et le détail des dernières questions
+        de ce processus, puis les efface si le paramètre reinitialiser est donné.
+        """
+        resultats = {'processus': os.getpid(), **INSTRUMENTATION.statistiques(),
+                     'dernieres_questions': INSTRUMENTATION.dernieres_questions()}
+        if parametres.get('reinitialiser', '0') not in ('0', 'false', ''):
+            INSTRUMENTATION.reinitialiser()
+        return resultats
+
+    def recharger(self):
+        """
+        Charge l'index à jour du corpus (seuls les discours ajoutés, modifiés ou supprimés sont retraités, voir
+        charger_ou_construire_index), puis le publie avec son scoreur en remplaçant l'attribut etat.
+        Retourne:
+        dict: Nombre de documents et de termes du nouvel index et sa version.
+        """
+        with self._verrou_rechargement:    # Un seul rechargement à la fois.
+            corpus = self.charger()
+            scoreur = ScoreurNumpy(corpus.matrice) if self.etat[1] is not None else None
+            self.etat = (corpus, scoreur)    # Publication : une seule affectation, l'ancien index reste valide pour qui le détient.
+        return {'processus': os.getpid(), 'documents': corpus.matrice.nb_documents, 'termes': len(corpus.matrice),
+                'version': corpus.version}
+
+    def analyser(self, corpus, nom, parametres):
+        """
+        Exécute une fonctionnalité de la Partie I.
+        Paramètres:
+        corpus (CorpusIndexe): Index du corpus.
+        nom (str): Nom de l'analyse (voir ANALYSES).
+        parametres (dict): Paramètres de l'URL (president pour mots-plus-repetes ; mots, par et dernier pour mentions et orateur).
+        Retourne:
+        dict: Résultat de l'analyse.
+        """
+        matrice = corpus.matrice
+        if nom == 'mots-moins-importants':
+            return {'mots': trouver_mots_moins_importants(matrice)}
+        elif nom == 'mots-plus-importants':
+            mots, score = trouver_mots_avec_tf_idf_le_plus_eleve(matrice)
+            return {'mots': mots, 'score': score}
+        elif nom == 'mots-plus-repetes':
+            president = parametres.get('president', 'Chirac')
+            mots = mots_les_plus_repetes_par_president(corpus.analyses, president)
+            return {'president': president, 'mots': [{'mot': mot, 'occurrences': nombre} for mot, nombre in mots]}
+        elif nom == 'nation':
+            return {'mentions': compter_mentions_nation(corpus.analyses)}
+        elif nom == 'climat':
+            president, fichier = trouver_premier_president_climat_ecologie(corpus.analyses)
+            return {'president': president, 'fichier': fichier}
+        elif nom == 'mots-communs':
+            return {'mots': mots_communs_tous_presidents(corpus.analyses)}
+        mots = [mot for mot in parametres.get('mots', '').split(',') if mot.strip()]
+        if not mots:
+            raise ErreurRequete(400, "Paramètre mots manquant (mots séparés par des virgules).")
+        if nom == 'mentions':
+            par_president = parametres.get('par', 'president') != 'document'
+            return {'mots': mots, 'mentions': compter_mentions(corpus.analyses, mots, par_president)}
+        dernier = parametres.get('dernier', '0') not in ('0', 'false', '')
+        president, fichier = trouver_orateur(corpus.analyses, mots, dernier)
+        return {'mots': mots, 'president': president, 'fichier': fichier}
+
+
+def servir_prefork(serveur, hote="127.0.0.1", port=8000, nb_processus=2):
+    """
+    Sert les requêtes avec plusieurs processus (pre-fork) qui partagent le même socket d'écoute et le même index.
+    Le processus parent charge l'index puis crée les processus fils avec os.fork : tous les tableaux de l'index (matrice,
+    transposée, postings, impacts BM25, tables d'analyse, trigrammes...) sont lus dans le fichier d'index projeté en
+    mémoire (voir charger_index), dont les pages physiques sont communes à tous les processus ; aucun n'est recalculé
+    après la création des processus fils. Chaque processus a son propre interpréteur, donc son propre GIL : le calcul
+    des scores passe à l'échelle avec le nombre de cœurs.
+    Les autres objets créés avant os.fork (listes des documents, métadonnées, tableaux de ScoreurNumpy) ne sont partagés
+    qu'en copie sur écriture : le compteur de références d'un objet Python est modifié dès qu'il est lu, donc chaque page
+    d'objets lue par un processus fils finit par être copiée dans ce processus. Ces objets restent petits (de l'ordre du
+    nombre de documents) ; les objets existants sont gelés (gc.freeze) avant os.fork pour que le ramasse-miettes des fils ne
+    parcoure pas, et donc ne copie pas, tout le tas du parent. Les caches (réponses, vocabulaire, corrections, blocs de
+    postings décodés) sont propres à chaque processus, comme un rechargement par POST /recharger.
+    Sans os.fork (Windows), le serveur reste sur un seul processus.
+    Paramètres:
+    serveur (ServeurChatbot): Serveur, construit avant la création des processus fils.
+    hote (str): Adresse d'écoute.
+    port (int): Port d'écoute.
+    nb_processus (int): Nombre de processus fils.
+    Ne retourne rien : attend la fin des processus fils.
+    """
+    if not hasattr(os, 'fork') or nb_processus <= 1:
+        serveur.servir(hote, port)
+        return
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((hote, port))
+    sock.listen(1024)
+    sock.setblocking(False)    # Le noyau répartit les connexions entre les processus qui attendent sur ce socket.
+
+    gc.freeze()    # Les objets déjà créés ne sont plus parcourus par le ramasse-miettes des processus fils.
+    fils = []
+    for _ in range(nb_processus):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            serveur.servir(sock=sock)
+            os._exit(0)
+        fils.append(pid)
+    sock.close()
+
+    def arreter(signum, frame):
+        for pid in fils:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    signal.signal(signal.SIGTERM, arreter)
+    signal.signal(signal.SIGINT, arreter)
+    for pid in fils:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Serveur HTTP/JSON du chatbot.")
+    parser.add_argument("--hote", default="127.0.0.1", help="Adresse d'écoute.")
+    parser.add_argument("--port", type=int, default=8000, help="Port d'écoute.")
+    parser.add_argument("--concurrence", type=int, default=32, help="Nombre maximal de calculs simultanés.")
+    parser.add_argument("--delai", type=float, default=5.0, help="Délai maximal de traitement d'une requête, en secondes.")
+    parser.add_argument("--processus", type=int, default=1, help="Nombre de processus (pre-fork), un par cœur par exemple.")
+    parser.add_argument("--cache", type=int, default=4096, help="Nombre de réponses gardées en cache (0 pour désactiver le cache).")
+    parser.add_argument("--duree-cache", type=float, default=600.0, help="Durée de vie d'une réponse en cache, en secondes.")
+    parser.add_argument("--instrumentation", action="store_true", help="Mesure chaque étape du chatbot (voir /statistiques).")
+    parser.add_argument("--memoire", action="store_true", help="Mesure aussi la mémoire allouée par étape (plus lent).")
+    parser.add_argument("--speeches", default="./speeches", help="Répertoire des discours.")
+    parser.add_argument("--cleaned", default=None, help="Répertoire où exporter les discours nettoyés (aucun export par défaut).")
+    parser.add_argument("--index", default="./index_tfidf.bin", help="Fichier d'index.")
+    args = parser.parse_args(arguments)
+
+    corpus = charger_ou_construire_index(args.speeches, args.cleaned, args.index)
+    scoreur = ScoreurNumpy(corpus.matrice) if NUMPY_DISPONIBLE else None
+    cache = CacheReponses(args.cache, args.duree_cache) if args.cache > 0 else None
+    serveur = ServeurChatbot(corpus, scoreur, args.concurrence, args.delai, cache=cache,
+                             charger=lambda: charger_ou_construire_index(args.speeches, args.cleaned, args.index))
+    if args.instrumentation or args.memoire:
+        INSTRUMENTATION.activer(args.memoire)
+    print(f"Serveur du chatbot à l'écoute sur http://{args.hote}:{args.port} ({args.processus} processus)", flush=True)
+    servir_prefork(serveur, args.hote, args.port, args.processus)
+    print("Arrêt du serveur.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient les fonctions de copie de tableaux partagées par les fusions de l'index (voir indexeur.Fusion) :
+# les parties d'un index qui ne changent pas sont recopiées par tranches entières depuis l'index de base, sans être
+# relues élément par élément.
+
+
+def copier(tableau, tranche):
+    """
+    Ajoute une tranche d'un tableau (array ou memoryview sur un fichier d'index projeté) à la fin d'un array du même type,
+    en copiant directement les octets.
+    Retourne:
+    array: Le tableau complété.
+    """
+    tableau.frombytes(memoryview(tranche).cast('B'))
+    return tableau
+
+
+def copier_decale(tableau, tranche, decalage):
+    """
+    Ajoute une tranche de positions à la fin d'un array, en ajoutant un décalage à chacune.
+    """
+    if decalage:
+        tableau.extend(map(decalage.__add__, tranche))
+    else:
+        copier(tableau, tranche)
+
+
+def traduire(tableau, correspondance, tranche):
+    """
+    Ajoute à la fin d'un array les images des éléments d'une tranche par une correspondance (ancien identifiant -> nouveau),
+    ou les éléments eux-mêmes si la correspondance est None.
+    Retourne:
+    array: Le tableau complété.
+    """
+    if correspondance is None:
+        copier(tableau, tranche)
+    else:
+        tableau.extend(map(correspondance.__getitem__, tranche))
+    return tableau
+
+
+def suites(correspondance):
+    """
+    Découpe une correspondance (nouvel identifiant -> identifiant dans la base, ou -1 pour un élément nouveau) en suites.
+    Paramètres:
+    correspondance (array): Identifiant dans la base de chaque nouvel élément, ou -1.
+    Retourne:
+    generator: Triplets (debut, fin, origine) : les éléments [debut, fin) reprennent, dans l'ordre, les éléments de la base
+    à partir de origine ; un élément nouveau forme une suite à lui seul, d'origine -1.
+    """
+    debut, nombre = 0, len(correspondance)
+    while debut < nombre:
+        origine = correspondance[debut]
+        fin = debut + 1
+        if origine >= 0:
+            while fin < nombre and correspondance[fin] == origine + fin - debut:
+                fin += 1
+        yield debut, fin, origine
+        debut = fin
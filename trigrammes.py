@@ -0,0 +1,244 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient l'index des trigrammes du vocabulaire, qui retrouve les mots du corpus proches d'un mot mal
+# orthographié (« ecolgie », « nationn ») sans calculer la distance d'édition avec tout le vocabulaire : seuls les
+# mots qui partagent assez de trigrammes avec le mot cherché sont comparés.
+import heapq
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from tableaux import copier, traduire
+
+NB_CANDIDATS = 20    # Nombre maximal de mots comparés par distance d'édition pour une correction.
+
+
+def trigrammes(mot):
+    """
+    Retourne les trigrammes distincts d'un mot entouré des marqueurs de début (^) et de fin ($).
+    """
+    mot = f"^{mot}$"
+    return {mot[i:i + 3] for i in range(len(mot) - 2)}
+
+
+def cle_trigramme(trigramme):
+    """
+    Code un trigramme par un entier (21 bits par caractère, assez pour tout point de code Unicode), pour ranger les
+    trigrammes dans un tableau trié.
+    """
+    return ord(trigramme[0]) << 42 | ord(trigramme[1]) << 21 | ord(trigramme[2])
+
+
+def distance_edition(a, b, maximum):
+    """
+    Calcule la distance d'édition entre deux mots (insertions, suppressions, substitutions et inversions de deux
+    lettres voisines), en abandonnant dès qu'elle dépasse un maximum.
+    Paramètres:
+    a (str): Premier mot.
+    b (str): Deuxième mot.
+    maximum (int): Distance au-delà de laquelle le calcul s'arrête.
+    Retourne:
+    int: Distance d'édition, ou maximum + 1 si elle dépasse le maximum.
+    """
+    if abs(len(a) - len(b)) > maximum:
+        return maximum + 1
+    infini = maximum + 1    # Toute distance supérieure au maximum est ramenée à maximum + 1.
+    avant_precedente, precedente = None, [min(j, infini) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ligne = [infini] * (len(b) + 1)
+        ligne[0] = min(i, infini)
+        # Seules les cases à moins de maximum de la diagonale peuvent rester sous le maximum.
+        for j in range(max(1, i - maximum), min(len(b), i + maximum) + 1):
+            cout = a[i - 1] != b[j - 1]
+            ligne[j] = min(precedente[j] + 1, ligne[j - 1] + 1, precedente[j - 1] + cout, infini)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                ligne[j] = min(ligne[j], avant_precedente[j - 2] + 1)    # Inversion de deux lettres voisines.
+        if min(ligne) > maximum:
+            return infini
+        avant_precedente, precedente = precedente, ligne
+    return precedente[-1]
+
+
+def distance_maximale(mot):
+    """
+    Retourne la distance d'édition tolérée pour un mot : aucune faute sous 4 lettres, une jusqu'à 5 lettres, deux au-delà.
+    """
+    if len(mot) < 4:
+        return 0
+    return 1 if len(mot) <= 5 else 2
+
+
+class IndexTrigrammes:
+    """
+    Pour chaque trigramme, liste triée des identifiants des termes qui le contiennent (voir trigrammes). Les trigrammes
+    sont rangés par clé croissante (voir cle_trigramme) : les termes du i-ème sont la tranche [debuts[i], debuts[i + 1])
+    de termes. Ces tableaux sont sauvegardés dans le fichier d'index.
+    Une faute de frappe ne détruit qu'au plus quatre trigrammes (trois pour une lettre ajoutée, retirée ou remplacée,
+    quatre pour deux lettres inversées) : deux mots à distance d l'un de l'autre ont donc chacun au plus 4 * d trigrammes
+    que l'autre n'a pas. Cette borne écarte presque tout le vocabulaire avant le calcul des distances d'édition.
+    """
+
+    def __init__(self, matrice, taille_cache=4096, tableaux=None):
+        """
+        Les tableaux peuvent être des array ou des memoryview sur un fichier d'index projeté en mémoire.
+        Paramètres:
+        matrice (MatriceTfIdf): Matrice TF-IDF du corpus, qui fournit le vocabulaire et le nombre de documents de chaque terme.
+        taille_cache (int): Nombre de corrections gardées en cache (0 pour désactiver le cache).
+        tableaux (tuple): Tableaux (cles, debuts, termes, longueurs, nb_trigrammes) déjà calculés (voir indexer), facultatif.
+        """
+        self.matrice = matrice
+        if tableaux is None:
+            tableaux = self.indexer()
+        # longueurs : nombre de lettres de chaque terme, pour écarter les mots trop courts ou trop longs ;
+        # nb_trigrammes : nombre de trigrammes distincts de chaque terme.
+        self.cles, self.debuts, self.termes, self.longueurs, self.nb_trigrammes = tableaux
+        if taille_cache:
+            self._corriger = lru_cache(maxsize=taille_cache)(self._corriger_sans_cache)
+        else:
+            self._corriger = self._corriger_sans_cache
+
+    @classmethod
+    def fusionner(cls, ancien, matrice, termes_base, termes_nouveaux, taille_cache=4096):
+        """
+        Reprend l'index des trigrammes de l'index de base : seules les listes des trigrammes des mots ajoutés ou disparus
+        changent de contenu, les autres sont recopiées (renumérotées si le vocabulaire a changé).
+        Paramètres:
+        ancien (IndexTrigrammes): Index des trigrammes de la base.
+        matrice (MatriceTfIdf): Nouvelle matrice TF-IDF.
+        termes_base (array): Identifiant dans la base de chaque terme de la matrice, ou -1 pour un mot ajouté (None si le
+        vocabulaire n'a pas changé).
+        termes_nouveaux (array): Identifiant dans la matrice de chaque terme de la base, ou -1 pour un mot disparu (None si
+        le vocabulaire n'a pas changé).
+        taille_cache (int): Nombre de corrections gardées en cache (0 pour désactiver le cache).
+        Retourne:
+        IndexTrigrammes: Index des trigrammes du vocabulaire, identique à celui de indexer.
+        """
+        if termes_base is None:    # Même vocabulaire : l'index est recopié tel quel.
+            tableaux = tuple(copier(array(typecode), tableau) for tableau, typecode in
+                             zip((ancien.cles, ancien.debuts, ancien.termes, ancien.longueurs, ancien.nb_trigrammes), 'qqiii'))
+            return cls(matrice, taille_cache, tableaux)
+
+        longueurs, nb_trigrammes = array('i'), array('i')
+        ajouts = {}    # Clé du trigramme -> mots ajoutés qui le contiennent, dans l'ordre.
+        for terme, terme_base in enumerate(termes_base):
+            if terme_base >= 0:
+                longueurs.append(ancien.longueurs[terme_base])
+                nb_trigrammes.append(ancien.nb_trigrammes[terme_base])
+                continue
+            mot = matrice.vocabulaire[terme]
+            trigrammes_terme = trigrammes(mot)
+            longueurs.append(len(mot))
+            nb_trigrammes.append(len(trigrammes_terme))
+            for trigramme in trigrammes_terme:
+                ajouts.setdefault(cle_trigramme(trigramme), []).append(terme)
+        retraits = set()    # Clés des trigrammes des mots disparus.
+        for terme_base, terme in enumerate(termes_nouveaux):
+            if terme < 0:
+                retraits.update(cle_trigramme(trigramme) for trigramme in trigrammes(ancien.matrice.vocabulaire[terme_base]))
+
+        cles, debuts, termes = array('q'), array('q', [0]), array('i')
+        for cle in sorted(set(ancien.cles) | ajouts.keys()):
+            i = bisect_left(ancien.cles, cle)
+            if i < len(ancien.cles) and ancien.cles[i] == cle:
+                liste = traduire(array('i'), termes_nouveaux, ancien.termes[ancien.debuts[i]:ancien.debuts[i + 1]])
+            else:
+                liste = array('i')
+            if cle in retraits:
+                liste = array('i', (terme for terme in liste if terme >= 0))
+            for terme in ajouts.get(cle, ()):
+                liste.insert(bisect_left(liste, terme), terme)
+            if liste:
+                cles.append(cle)
+                termes.extend(liste)
+                debuts.append(len(termes))
+        return cls(matrice, taille_cache, (cles, debuts, termes, longueurs, nb_trigrammes))
+
+    def indexer(self):
+        """
+        Relève les trigrammes de chaque terme du vocabulaire.
+        Retourne:
+        tuple: Tableaux (cles, debuts, termes, longueurs, nb_trigrammes).
+        """
+        postings = {}    # Clé du trigramme -> termes qui le contiennent, dans l'ordre.
+        longueurs, nb_trigrammes = array('i'), array('i')
+        for terme, mot in enumerate(self.matrice.vocabulaire):
+            longueurs.append(len(mot))
+            trigrammes_terme = trigrammes(mot)
+            nb_trigrammes.append(len(trigrammes_terme))
+            for trigramme in trigrammes_terme:
+                cle = cle_trigramme(trigramme)
+                termes = postings.get(cle)
+                if termes is None:
+                    termes = postings[cle] = array('i')
+                termes.append(terme)
+        cles, debuts, termes = array('q', sorted(postings)), array('q', [0]), array('i')
+        for cle in cles:
+            termes.extend(postings[cle])
+            debuts.append(len(termes))
+        return cles, debuts, termes, longueurs, nb_trigrammes
+
+    def termes_trigramme(self, trigramme):
+        """
+        Retourne les identifiants des termes qui contiennent un trigramme (une séquence vide si aucun).
+        """
+        cle = cle_trigramme(trigramme)
+        i = bisect_left(self.cles, cle)
+        if i == len(self.cles) or self.cles[i] != cle:
+            return ()
+        return self.termes[self.debuts[i]:self.debuts[i + 1]]
+
+    def candidats(self, mot, distance, nb_candidats=NB_CANDIDATS):
+        """
+        Sélectionne les termes qui peuvent être à la distance voulue d'un mot, d'après leurs trigrammes communs.
+        Paramètres:
+        mot (str): Mot cherché.
+        distance (int): Distance d'édition maximale.
+        nb_candidats (int): Nombre maximal de termes retournés.
+        Retourne:
+        list: Couples (identifiant du terme, distance minimale déduite des trigrammes communs), par distance minimale
+        croissante puis du plus au moins grand nombre de trigrammes communs.
+        """
+        trigrammes_mot = trigrammes(mot)
+        communs = {}
+        for trigramme in trigrammes_mot:
+            for terme in self.termes_trigramme(trigramme):
+                communs[terme] = communs.get(terme, 0) + 1
+        bornes = []
+        for terme, nombre in communs.items():
+            if abs(self.longueurs[terme] - len(mot)) <= distance:
+                borne = -(-max(len(trigrammes_mot), self.nb_trigrammes[terme]) + nombre) // 4    # Arrondi supérieur.
+                if borne <= distance:
+                    bornes.append((borne, -nombre, terme))
+        return [(terme, borne) for borne, _, terme in heapq.nsmallest(nb_candidats, bornes)]
+
+    def corriger(self, mot, distance=None, nb_candidats=NB_CANDIDATS):
+        """
+        Trouve le terme du corpus le plus proche d'un mot.
+        Paramètres:
+        mot (str): Mot cherché, normalisé comme les discours.
+        distance (int): Distance d'édition maximale (voir distance_maximale si None).
+        nb_candidats (int): Nombre maximal de termes comparés par distance d'édition.
+        Retourne:
+        str: Le mot lui-même s'il est dans le corpus ; sinon le terme le plus proche (distance la plus faible, puis présent
+        dans le plus de documents, puis premier dans l'ordre alphabétique), ou None si aucun n'est assez proche.
+        """
+        if mot in self.matrice:
+            return mot
+        if distance is None:
+            distance = distance_maximale(mot)
+        return self._corriger(mot, distance, nb_candidats)
+
+    def _corriger_sans_cache(self, mot, distance, nb_candidats):
+        if distance <= 0:
+            return None
+        debuts, _ = self.matrice.transposer()
+        vocabulaire = self.matrice.vocabulaire
+        meilleur, cle_meilleur = None, None
+        for terme, borne in self.candidats(mot, distance, nb_candidats):
+            if cle_meilleur is not None and borne > cle_meilleur[0]:
+                break    # Les bornes croissent : aucun candidat suivant ne peut être plus proche.
+            ecart = distance_edition(mot, vocabulaire[terme], distance if cle_meilleur is None else cle_meilleur[0])
+            if ecart <= distance:
+                cle = (ecart, debuts[terme] - debuts[terme + 1], terme)
+                if cle_meilleur is None or cle < cle_meilleur:
+                    meilleur, cle_meilleur = terme, cle
+        return None if meilleur is None else vocabulaire[meilleur]
@@ -0,0 +1,189 @@
+# Projet : Analyse des Discours Présidentiels avec Chatbot
+# Auteurs : Noam Slezack, Tommy Lim
+# Ce fichier contient le dictionnaire compact des mots du corpus : les mots triés sont codés par blocs en ne gardant,
+# pour chaque mot, que la partie qui le distingue du mot précédent (codage par préfixe). L'identifiant de terme d'un
+# mot est son rang dans l'ordre alphabétique ; les mots qui commencent par un même préfixe ont donc des identifiants
+# consécutifs, ce qui permet l'autocomplétion.
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from os.path import commonprefix
+
+TAILLE_BLOC = 16    # Nombre de mots par bloc : le premier mot d'un bloc est écrit en entier, les suivants par différence.
+NB_BLOCS_DECODES = 256    # Nombre de blocs décodés gardés en cache pour l'accès aux mots par identifiant.
+
+
+def ecrire_varint(tampon, nombre):
+    """
+    Ajoute un entier positif à un tampon, par groupes de 7 bits (le bit de poids fort indique qu'un octet suit).
+    """
+    while nombre >= 0x80:
+        tampon.append((nombre & 0x7F) | 0x80)
+        nombre >>= 7
+    tampon.append(nombre)
+
+
+def lire_varint(donnees, i):
+    """
+    Lit un entier écrit par ecrire_varint à la position i.
+    Retourne:
+    tuple: L'entier et la position qui suit.
+    """
+    nombre, decalage = 0, 0
+    while True:
+        octet = donnees[i]
+        i += 1
+        nombre |= (octet & 0x7F) << decalage
+        if octet < 0x80:
+            return nombre, i
+        decalage += 7
+
+
+class VocabulaireCompact:
+    """
+    Mots du corpus triés (ordre des octets UTF-8, identique à l'ordre des chaînes), rangés par blocs de TAILLE_BLOC mots
+    dans un seul tableau d'octets : le premier mot du bloc b commence à l'octet debuts_blocs[b] (longueur puis octets),
+    chacun des mots suivants est écrit comme la longueur du préfixe commun avec le mot précédent, puis la longueur
+    et les octets du reste. Le premier mot de chaque bloc est gardé en mémoire pour la recherche dichotomique.
+    Le vocabulaire se comporte comme une liste de mots en lecture seule (len, indexation, parcours, in).
+    """
+
+    def __init__(self, donnees, debuts_blocs, nb_mots, taille_cache=4096):
+        """
+        Les tableaux peuvent être des array ou des memoryview sur un fichier d'index projeté en mémoire.
+        Paramètres:
+        donnees (array): Octets des blocs codés.
+        debuts_blocs (array): Position du début de chaque bloc dans donnees.
+        nb_mots (int): Nombre de mots du vocabulaire.
+        taille_cache (int): Nombre de recherches d'identifiants gardées en cache (0 pour désactiver les caches).
+        Les derniers blocs décodés sont aussi gardés en cache (voir NB_BLOCS_DECODES).
+        """
+        self.donnees = memoryview(donnees).cast('B')
+        self.debuts_blocs = debuts_blocs
+        self.nb_mots = nb_mots
+        self._tetes = []    # Premier mot (en octets) de chaque bloc.
+        for debut in debuts_blocs:
+            longueur, i = lire_varint(self.donnees, debut)
+            self._tetes.append(bytes(self.donnees[i:i + longueur]))
+        if taille_cache:
+            self._id_terme = lru_cache(maxsize=taille_cache)(self._id_terme_sans_cache)
+            self._bloc_decode = lru_cache(maxsize=NB_BLOCS_DECODES)(self._bloc)
+        else:
+            self._id_terme = self._id_terme_sans_cache
+            self._bloc_decode = self._bloc
+
+    @classmethod
+    def depuis_mots(cls, mots):
+        """
+        Code une liste de mots triés et distincts.
+        Paramètres:
+        mots (list): Mots du vocabulaire, dans l'ordre des identifiants de termes (ordre alphabétique).
+        Retourne:
+        VocabulaireCompact: Vocabulaire codé.
+        """
+        donnees, debuts_blocs = bytearray(), array('q')
+        precedent = b''
+        nb_mots = 0
+        for rang, mot in enumerate(mots):
+            octets = mot.encode('utf-8')
+            if rang and octets <= precedent:
+                raise ValueError("Les mots du vocabulaire doivent être triés et distincts.")
+            if rang % TAILLE_BLOC == 0:
+                debuts_blocs.append(len(donnees))
+                ecrire_varint(donnees, len(octets))
+                donnees += octets
+            else:
+                commun = len(commonprefix((precedent, octets)))
+                ecrire_varint(donnees, commun)
+                ecrire_varint(donnees, len(octets) - commun)
+                donnees += octets[commun:]
+            precedent = octets
+            nb_mots += 1
+        return cls(array('B', donnees), debuts_blocs, nb_mots)
+
+    def _bloc(self, bloc, fin=TAILLE_BLOC):
+        """
+        Décode les premiers mots d'un bloc.
+        Paramètres:
+        bloc (int): Numéro du bloc.
+        fin (int): Nombre de mots à décoder.
+        Retourne:
+        list: Mots du bloc, en octets.
+        """
+        donnees = self.donnees
+        fin = min(fin, self.nb_mots - bloc * TAILLE_BLOC)
+        mot = self._tetes[bloc]
+        mots = [mot]
+        i = self.debuts_blocs[bloc]
+        _, i = lire_varint(donnees, i)
+        i += len(mot)
+        for _ in range(fin - 1):
+            commun, i = lire_varint(donnees, i)
+            longueur, i = lire_varint(donnees, i)
+            mot = mot[:commun] + bytes(donnees[i:i + longueur])
+            i += longueur
+            mots.append(mot)
+        return mots
+
+    def _rang(self, octets):
+        """
+        Retourne l'identifiant du premier mot supérieur ou égal à une suite d'octets, et ce mot (None s'il n'y en a pas).
+        """
+        bloc = bisect_right(self._tetes, octets) - 1    # Dernier bloc dont le premier mot est inférieur ou égal.
+        if bloc < 0:
+            return 0, (self._tetes[0] if self._tetes else None)
+        for rang, mot in enumerate(self._bloc_decode(bloc)):
+            if mot >= octets:
+                return bloc * TAILLE_BLOC + rang, mot
+        bloc += 1    # Tous les mots du bloc sont inférieurs : le suivant est le premier mot du bloc suivant.
+        if bloc == len(self._tetes):
+            return self.nb_mots, None
+        return bloc * TAILLE_BLOC, self._tetes[bloc]
+
+    def _id_terme_sans_cache(self, mot):
+        octets = mot.encode('utf-8')
+        rang, trouve = self._rang(octets)
+        return rang if trouve == octets else None
+
+    def id_terme(self, mot):
+        """
+        Retourne l'identifiant de terme d'un mot, ou None s'il est absent du vocabulaire.
+        """
+        return self._id_terme(mot)
+
+    def prefixe(self, prefixe):
+        """
+        Retourne les identifiants des mots qui commencent par un préfixe.
+        Paramètres:
+        prefixe (str): Début des mots recherchés.
+        Retourne:
+        range: Identifiants consécutifs des mots commençant par le préfixe, dans l'ordre alphabétique.
+        """
+        octets = prefixe.encode('utf-8')
+        debut, _ = self._rang(octets)
+        fin, _ = self._rang(octets + b'\xff')    # L'octet 0xFF n'apparaît jamais en UTF-8 : il suit tous les mots du préfixe.
+        return range(debut, fin)
+
+    def taille_octets(self):
+        """
+        Retourne la mémoire occupée par les blocs codés, leurs débuts et les premiers mots des blocs, en octets.
+        """
+        return (len(self.donnees) + len(self.debuts_blocs) * 8
+                + sum(len(tete) + 33 for tete in self._tetes) + 8 * len(self._tetes))    # 33 octets d'en-tête par objet bytes.
+
+    def __len__(self):
+        return self.nb_mots
+
+    def __contains__(self, mot):
+        return isinstance(mot, str) and self._id_terme(mot) is not None
+
+    def __getitem__(self, terme):
+        if not 0 <= terme < self.nb_mots:
+            raise IndexError("Identifiant de terme hors du vocabulaire.")
+        bloc, rang = divmod(terme, TAILLE_BLOC)
+        return self._bloc_decode(bloc)[rang].decode('utf-8')
+
+    def __iter__(self):
+        for bloc in range(len(self._tetes)):
+            for mot in self._bloc(bloc):
+                yield mot.decode('utf-8')